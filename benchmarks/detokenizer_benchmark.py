@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+# Run from anywhere in the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.detokenizer import Detokenizer
+
+try:
+    from mosestokenizer import MosesDetokenizer
+except ImportError:
+    raise ImportError("Failed to import mosestokenizer, please run `pip3 install mosestokenizer`")
+
+try:
+    from nltk.tokenize import TreebankWordTokenizer
+except ImportError:
+    raise ImportError("Failed to import nltk, please run `pip3 install nltk`")
+
+# Tokens which exercise every rule of detokenizer.perl
+tokens: list = [
+    "'", "\"", "''", "``", "`", "„", "“", "”", "'s", "'t", "n't", "s", "Jones", "a", "EU:", "n", "ssa", "l'", "amico",
+    "e-", "-", "–", "li", "mail", "3", ".", ",", "!", "?", ":", ";", "%", "\\", "}", "]", ")", "(", "[", "{", "$", "€",
+    "¿", "¡", "中", "文", "한", "&amp;", "&lt;", "@-@", "<x>", "x", "dog", "cat's", "42", "", "²", "ß", "Ä",
+    "Ⅻ", "'Ⅻ", "Ⓐ", "कि", "½", "Ⅻ's"  # Alphabetic but not `str.isalpha`, and a number which isn't alphanumeric
+]
+
+words: list = "I don't think it's the Jones' house , said \"Bob\" ( really ) ! $ 5 100% isn't can't we'll they're it costs €3 . : ; ? 'quoted' [ x ] ¿que? ¡si! cafés naïve".split()
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Check the Python detokenizer against Moses' detokenizer.perl")
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--languages", type=str, nargs="+", default=["en", "fr", "it", "cs", "fi", "de"])
+    parser.add_argument("--seed", type=int, default=0)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    generator: random.Random = random.Random(arguments.seed)
+
+    # Parity, on random tokens for every language
+    for language in arguments.languages:
+        moses: MosesDetokenizer = MosesDetokenizer(language)
+        detokenizer: Detokenizer = Detokenizer(language=language)
+
+        for _ in range(arguments.cases):
+            sentence: list = [generator.choice(tokens) for _ in range(generator.randint(0, 8))]
+            assert detokenizer(sentence) == moses(sentence), (language, sentence)
+
+        moses.close()
+        print(f"{arguments.cases} random sentences matched for `{language}`")
+
+    # Speed, on tokenized English sentences
+    tokenizer: TreebankWordTokenizer = TreebankWordTokenizer()
+    sentences: list = [tokenizer.tokenize(" ".join(generator.choice(words) for _ in range(generator.randint(1, 25)))) for _ in range(arguments.cases)]
+
+    start: float = time.perf_counter()
+    moses: MosesDetokenizer = MosesDetokenizer("en")
+    moses_outputs: list = [moses(sentence) for sentence in sentences]
+    moses.close()
+    moses_seconds: float = time.perf_counter() - start
+
+    start: float = time.perf_counter()
+    detokenizer: Detokenizer = Detokenizer(language="en")
+    outputs: list = [detokenizer(sentence) for sentence in sentences]
+    seconds: float = time.perf_counter() - start
+
+    assert outputs == moses_outputs
+    print(f"{len(sentences)} sentences: moses {moses_seconds:.4f}s, python {seconds:.4f}s, {moses_seconds / seconds:.1f}x")
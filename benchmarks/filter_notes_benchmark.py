@@ -0,0 +1,49 @@
+import os
+import sys
+import random
+import string
+import timeit
+import argparse
+
+# Run from anywhere in the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.filter_notes import FilterNotes
+
+def get_should_filter_note_text_by_loop(text: str, toss_text: list):
+    # The matcher FilterNotes used before the Aho-Corasick automaton
+    for w in text.split():
+        for toss_word in toss_text:
+            if toss_word.lower() in w.lower():
+                return True
+
+    return False
+
+def get_random_word(generator: random.Random, minimum: int, maximum: int):
+    return "".join(generator.choice(string.ascii_letters) for _ in range(generator.randint(minimum, maximum)))
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Compare the FilterNotes toss_text matcher with the old nested loop")
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--toss-words", type=int, nargs="+", default=[10, 100, 500, 1000])
+    parser.add_argument("--seed", type=int, default=0)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    generator: random.Random = random.Random(arguments.seed)
+    texts: list = [" ".join(get_random_word(generator, 2, 9) for _ in range(generator.randint(5, 40))) for _ in range(arguments.notes)]
+
+    print(f"{'toss words':>10} {'loop (s)':>10} {'automaton (s)':>14} {'speedup':>8}")
+    for count in arguments.toss_words:
+        toss_text: list = [get_random_word(generator, 5, 10) for _ in range(count)]
+
+        module: FilterNotes = FilterNotes()
+        module.set_settings(settings={"toss_text": toss_text})
+
+        # Both matchers have to agree before their times mean anything
+        for text in texts:
+            assert module._get_should_filter_note_text(text=text) == get_should_filter_note_text_by_loop(text=text, toss_text=toss_text)
+
+        loop_seconds: float = timeit.timeit(lambda: [get_should_filter_note_text_by_loop(text=text, toss_text=toss_text) for text in texts], number=1)
+        automaton_seconds: float = timeit.timeit(lambda: [module._get_should_filter_note_text(text=text) for text in texts], number=1)
+
+        print(f"{count:>10} {loop_seconds:>10.4f} {automaton_seconds:>14.4f} {loop_seconds / automaton_seconds:>7.1f}x")
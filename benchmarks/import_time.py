@@ -0,0 +1,35 @@
+import os
+import sys
+import statistics
+import subprocess
+import argparse
+
+# Run from anywhere in the repository
+root: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a run has to import before it can start working
+scenarios: dict = {
+    "import modules": "import modules",
+    "download only": "import modules; modules.DownloadNotes()",
+    "every step": "import modules; [getattr(modules, name) for name in modules.registry]"
+}
+
+def get_seconds(code: str):
+    # A fresh interpreter each time, so nothing is already imported
+    output: str = subprocess.run(
+        [sys.executable, "-c", f"import time; start = time.perf_counter(); {code}; print(time.perf_counter() - start)"],
+        cwd=root, capture_output=True, text=True, check=True
+    ).stdout
+
+    return float(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Time how long importing the modules takes in a fresh interpreter")
+    parser.add_argument("--runs", type=int, default=5)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    print(f"{'scenario':>16} {'median (s)':>11} {'min (s)':>8}")
+    for name, code in scenarios.items():
+        seconds: list = [get_seconds(code=code) for _ in range(arguments.runs)]
+
+        print(f"{name:>16} {statistics.median(seconds):>11.4f} {min(seconds):>8.4f}")
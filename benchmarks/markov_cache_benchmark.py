@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# Run from anywhere in the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import markovify
+
+from modules.generate_markov_notes import GenerateMarkov
+from synthetic_corpus import get_synthetic_texts
+
+def get_is_same_model(model: markovify.Text, other_model: markovify.Text):
+    # The same counts in the same order, since the walk picks from them in order
+    if list(model.chain.model.items()) != list(other_model.chain.model.items()):
+        return False
+
+    return model.rejoined_text == other_model.rejoined_text
+
+def get_timed(run: object):
+    start: float = time.perf_counter()
+    result: object = run()
+
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Compare loading and updating the cached Markov model with building it")
+    parser.add_argument("--notes", type=int, default=30000)
+    parser.add_argument("--new-notes", type=int, default=100)
+    parser.add_argument("--updates", type=int, default=3, help="Updates appended one after another")
+    parser.add_argument("--state-size", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    texts: list = get_synthetic_texts(count=arguments.notes + arguments.new_notes * arguments.updates, seed=arguments.seed)
+    corpus: str = "\n".join(texts[:arguments.notes])
+
+    with tempfile.TemporaryDirectory() as directory:
+        generator: GenerateMarkov = GenerateMarkov()
+        generator.state_size = arguments.state_size
+        generator.incremental_training = True
+        generator.model_cache_path = os.path.join(directory, "markov_model.cache")
+
+        generator.cache_model = False
+        built_model, build_seconds = get_timed(run=lambda: generator._get_model(corpus=corpus))
+
+        generator.cache_model = True
+        _, miss_seconds = get_timed(run=lambda: generator._get_model(corpus=corpus))
+        cached_model, hit_seconds = get_timed(run=lambda: generator._get_model(corpus=corpus))
+        assert get_is_same_model(model=built_model, other_model=cached_model)
+
+        print(f"{'run':>8} {'seconds':>9}")
+        print(f"{'build':>8} {build_seconds:>9.3f}")
+        print(f"{'miss':>8} {miss_seconds:>9.3f}")
+        print(f"{'hit':>8} {hit_seconds:>9.3f}")
+
+        # Every update only adds the notes downloaded since the one before it
+        for update in range(arguments.updates):
+            start: int = arguments.notes + arguments.new_notes * update
+            new_corpus: str = "\n".join(texts[start:start + arguments.new_notes])
+
+            updated_model, update_seconds = get_timed(run=lambda: generator._get_model(corpus=corpus, new_corpus=new_corpus))
+            corpus: str = "\n".join([corpus, new_corpus])
+
+            # The updated model and the cache it leaves behind have to match a build of the whole corpus
+            full_model, rebuild_seconds = get_timed(run=lambda: markovify.Text(input_text=corpus, state_size=arguments.state_size))
+            assert get_is_same_model(model=full_model, other_model=updated_model)
+            assert get_is_same_model(model=full_model, other_model=generator._get_model(corpus=corpus))
+
+            print(f"{f'update {update + 1}':>8} {update_seconds:>9.3f} (rebuild {rebuild_seconds:.3f})")
+
+        print(f"Cache of {os.path.getsize(generator.model_cache_path) / 1048576:.1f} MiB, text of {os.path.getsize(f'{generator.model_cache_path}.text') / 1048576:.1f} MiB")
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+# Run from anywhere in the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import markovify
+
+from modules.markov_chain import ArrayChain, BiasedChain
+from modules.model_file import MappedArrayChain, set_model_file_written
+from synthetic_corpus import SyntheticCorpus
+
+def get_built(build: object):
+    # The chain and the memory it holds once it is built
+    tracemalloc.start()
+    chain: object = build()
+    memory: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return chain, memory
+
+def get_walk_seconds(chain: object, walks: int, seed: int):
+    random.seed(seed)
+
+    start: float = time.perf_counter()
+    for _ in range(walks):
+        chain.walk()
+
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Compare the array chain with markovify's dict chain")
+    parser.add_argument("--notes", type=int, default=50000)
+    parser.add_argument("--state-size", type=int, default=3)
+    parser.add_argument("--walks", type=int, default=5000)
+    parser.add_argument("--weighted-words", type=int, default=2000)
+    parser.add_argument("--vocabulary-size", type=int, default=5000, help="Words of the corpus, with a large state size the keys take more than one column")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    model: markovify.Text = markovify.Text(input_text="\n".join(SyntheticCorpus(seed=arguments.seed, vocabulary_size=arguments.vocabulary_size).get_texts(count=arguments.notes)), state_size=arguments.state_size)
+
+    generator: random.Random = random.Random(arguments.seed)
+    words: list = sorted(set(word for follows in model.chain.model.values() for word in follows))
+    word_weights: dict = {word: generator.choice([0.5, 1.5, 2.0]) for word in generator.sample(words, min(arguments.weighted_words, len(words)))}
+
+    dict_chain, dict_memory = get_built(build=lambda: markovify.Chain(model.parsed_sentences, arguments.state_size))
+    array_chain, array_memory = get_built(build=lambda: ArrayChain(chain=dict_chain))
+    print(f"{len(array_chain.words)} words of {array_chain.bits} bits, state keys take {array_chain.key_columns} column(s)")
+    weighted_array_chain: ArrayChain = ArrayChain(chain=dict_chain, word_weights=word_weights)
+
+    # The same arrays read in place from a model file
+    directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+    file_path: str = os.path.join(directory.name, "model.bin")
+    set_model_file_written(file_path=file_path, chain=array_chain, rejoined_text=model.rejoined_text, key="")
+
+    start: float = time.perf_counter()
+    mapped_chain, mapped_memory = get_built(build=lambda: MappedArrayChain(file_path=file_path))
+    print(f"Mapped a {os.path.getsize(file_path) / 1048576:.1f} MiB model file in {time.perf_counter() - start:.4f} seconds")
+
+    # Every kind of chain has to walk the same sentences before their times mean anything
+    for chain, other_chain in ((dict_chain, array_chain), (dict_chain, mapped_chain), (BiasedChain(chain=dict_chain, word_weights=word_weights), weighted_array_chain)):
+        random.seed(arguments.seed)
+        sentences: list = [chain.walk() for _ in range(1000)]
+        random.seed(arguments.seed)
+        assert sentences == [other_chain.walk() for _ in range(1000)]
+
+    print(f"{'chain':>16} {'memory (MiB)':>13} {'walks (s)':>10}")
+    for name, chain, memory in (
+        ("dict", dict_chain, dict_memory),
+        ("array", array_chain, array_memory),
+        ("mapped array", mapped_chain, mapped_memory),  # The arrays are in the page cache, not the heap
+        ("biased dict", BiasedChain(chain=dict_chain, word_weights=word_weights), None),  # Shares the dict chain
+        ("biased array", weighted_array_chain, weighted_array_chain.get_memory_size())
+    ):
+        print(f"{name:>16} {'-' if memory is None else f'{memory / 1048576:.1f}':>13} {get_walk_seconds(chain=chain, walks=arguments.walks, seed=arguments.seed):>10.3f}")
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import argparse
+
+# Run from anywhere in the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import markovify
+
+from modules.markov_chain import get_sharded_text
+from synthetic_corpus import get_synthetic_texts
+
+def get_is_same_model(model: markovify.Text, other_model: markovify.Text):
+    # The same counts in the same order, since the walk picks from them in order
+    if list(model.chain.model.items()) != list(other_model.chain.model.items()):
+        return False
+
+    # Parsed sentences are only there when they were kept
+    if other_model.retain_original and model.parsed_sentences != other_model.parsed_sentences:
+        return False
+
+    return model.rejoined_text == other_model.rejoined_text
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Compare building the Markov model in shards with a single markovify build")
+    parser.add_argument("--notes", type=int, default=200000)
+    parser.add_argument("--state-size", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--shard-size", type=int, default=5000000, help="Characters of the corpus in each piece")
+    parser.add_argument("--retain-original", action="store_true", help="Also send the parsed sentences back, as when the model is cached")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    corpus: str = "\n".join(get_synthetic_texts(count=arguments.notes, seed=arguments.seed))
+
+    start: float = time.perf_counter()
+    serial_model: markovify.Text = markovify.Text(input_text=corpus, state_size=arguments.state_size)
+    serial_seconds: float = time.perf_counter() - start
+
+    # The time spent in this process is what the workers can't take over
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'parent cpu':>11}")
+    print(f"{'serial':>8} {serial_seconds:>9.3f} {1.0:>7.1f}x {serial_seconds:>11.3f}")
+
+    for workers in arguments.workers:
+        start: float = time.perf_counter()
+        start_cpu: float = time.process_time()
+        sharded_model: markovify.Text = get_sharded_text(corpus=corpus, state_size=arguments.state_size, workers=workers, shard_size=arguments.shard_size, retain_original=arguments.retain_original)
+        seconds: float = time.perf_counter() - start
+        cpu_seconds: float = time.process_time() - start_cpu
+
+        # Both builds have to agree before their times mean anything
+        assert get_is_same_model(model=serial_model, other_model=sharded_model)
+
+        print(f"{workers:>8} {seconds:>9.3f} {serial_seconds / seconds:>7.1f}x {cpu_seconds:>11.3f}")
@@ -0,0 +1,75 @@
+import os
+import re
+import sys
+import random
+import timeit
+import argparse
+
+# Run from anywhere in the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.nyaize_transform import NyaizeText, RevertNyaizeText
+
+flags: int = re.IGNORECASE|re.MULTILINE
+
+# The rules as NyaizeText and RevertNyaizeText used to apply them, one scan per rule
+nyaize_patterns: list = [
+    (re.compile(pattern=r"(?<=n)(a)", flags=flags), "ya"),
+    (re.compile(pattern=r"(?<=morn)(ing)", flags=flags), "yan"),
+    (re.compile(pattern=r"(?<=every)(one)", flags=flags), "nyan"),
+    (re.compile(pattern=r"(non)(?=[bcdfghjklmnpqrstvwxyz])", flags=flags), "nyan")
+]
+
+reverse_patterns: list = [
+    (re.compile(pattern=r"(?<=n)(yanya)", flags=flags), "ana"),
+    (re.compile(pattern=r"(nyan)(?=[bcdfghjklmnpqrstvwxyz])", flags=flags), "non"),
+    (re.compile(pattern=r"(?<=every)(nyan)", flags=flags), "one"),
+    (re.compile(pattern=r"(?<=morn)(yan)", flags=flags), "ing"),
+    (re.compile(pattern=r"(?<=n)(ya)", flags=flags), "a")
+]
+
+# Pieces which make the rules run into each other
+nyaize_pieces: list = ["n", "a", "o", "non", "on", "morn", "ing", "every", "one", "y", "b", " ", "e", "i", "na", "N", "ON", "ING"]
+reverse_pieces: list = ["n", "y", "a", "o", "nya", "yan", "nyan", "yanya", "every", "morn", "b", " ", "e", "ya", "ny", "r", "N", "YA", "i", "g"]
+words: list = ["banana", "nonsense", "everyone", "morning", "snack", "good", "night", "bonbon", "nyan", "cat", "and", "the"]
+
+def get_sequential_text(text: str, patterns: list):
+    for pattern, replacement in patterns:
+        text: str = re.sub(pattern=pattern, repl=replacement, string=text)
+
+    return text
+
+def get_random_text(generator: random.Random, pieces: list, count: int, separator: str):
+    return separator.join(generator.choice(pieces) for _ in range(generator.randint(0, count)))
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Check the single scan Nyaize rules against the rules applied one after another")
+    parser.add_argument("--cases", type=int, default=200000)
+    parser.add_argument("--notes", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    generator: random.Random = random.Random(arguments.seed)
+    nyaize: NyaizeText = NyaizeText()
+    reverse: RevertNyaizeText = RevertNyaizeText()
+
+    # Parity, on text built to make the rules overlap
+    for _ in range(arguments.cases):
+        text: str = get_random_text(generator=generator, pieces=nyaize_pieces, count=12, separator="")
+        assert nyaize._get_nyaized_text(text=text) == get_sequential_text(text=text, patterns=nyaize_patterns), text
+
+        text: str = get_random_text(generator=generator, pieces=reverse_pieces, count=12, separator="")
+        assert reverse._get_reverted_nyaized_text(text=text) == get_sequential_text(text=text, patterns=reverse_patterns), text
+
+    print(f"{arguments.cases} random texts matched for both rule sets")
+
+    # Speed, on note sized text
+    texts: list = [get_random_text(generator=generator, pieces=words, count=40, separator=" ") for _ in range(arguments.notes)]
+    nyaized_texts: list = [get_sequential_text(text=text, patterns=nyaize_patterns) for text in texts]
+
+    print(f"{'rules':>8} {'sequential (s)':>15} {'single scan (s)':>16} {'speedup':>8}")
+    for name, patterns, method, inputs in (("nyaize", nyaize_patterns, nyaize._get_nyaized_text, texts), ("revert", reverse_patterns, reverse._get_reverted_nyaized_text, nyaized_texts)):
+        sequential_seconds: float = timeit.timeit(lambda: [get_sequential_text(text=text, patterns=patterns) for text in inputs], number=1)
+        single_seconds: float = timeit.timeit(lambda: [method(text=text) for text in inputs], number=1)
+
+        print(f"{name:>8} {sequential_seconds:>15.4f} {single_seconds:>16.4f} {sequential_seconds / single_seconds:>7.1f}x")
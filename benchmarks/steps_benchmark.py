@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import subprocess
+
+from collections.abc import Iterator
+
+# Run from anywhere in the repository
+root: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import modules
+
+from synthetic_corpus import get_synthetic_texts, get_notes
+
+# The steps of main.py which don't need a server, downloading is replaced by the synthetic corpus
+# NLTK data is never downloaded during a benchmark, a missing resource fails the step instead
+STEPS: list = [
+    {"module": "FilterNotes", "settings": {"toss_text": ["crypto", "nft"]}},
+    {"module": "RevertNyaizeText", "settings": {}},
+    {"module": "CleanText", "settings": {}},
+    {"module": "GenerateMarkov", "settings": {"cache_model": False, "max_seconds": 10, "allow_download": False}},
+    {"module": "RebuildText", "settings": {"allow_download": False}},
+    {"module": "NormalizeText", "settings": {}},
+    {"module": "CleanText", "settings": {}},
+    {"module": "GibberishText", "settings": {"chance_execute": 0.5, "allow_download": False}},
+    {"module": "NormalizeText", "settings": {"should_recase_sentence": False}},
+    {"module": "NyaizeText", "settings": {}},
+    {"module": "AddHashtags", "settings": {}}
+]
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def get_timed_run(run: object, notes: list):
+    # Streamed output is only processed once it is read, so that is timed too
+    start: float = time.perf_counter()
+    try:
+        output: object = run()
+        if isinstance(output, Iterator):
+            output: list = list(output)
+    except (ImportError, LookupError) as e:
+        return {"notes_in": len(notes), "error": str(e)}
+
+    seconds: float = time.perf_counter() - start
+
+    return {
+        "notes_in": len(notes),
+        "notes_out": len(output) if type(output) is list else None,
+        "seconds": seconds,
+        "notes_per_second": len(notes) / seconds if seconds > 0 else None
+    }
+
+def get_step_result(step: dict, texts: list, seed: int):
+    """
+        Time a single step on the whole corpus, every step always runs
+    """
+
+    notes: list = get_notes(texts=texts)
+    settings: dict = dict(step["settings"], chance_execute=1.0)
+
+    try:
+        module: object = getattr(modules, step["module"])()
+        module.set_settings(settings=settings)
+    except (ImportError, LookupError) as e:
+        return {"notes_in": len(notes), "error": str(e)}
+
+    module.set_input(input=notes)
+    random.seed(seed)
+
+    return get_timed_run(run=module.run, notes=notes)
+
+def get_chain_result(texts: list, seed: int, fuse: bool):
+    """
+        Time every step as one chain, the way main.py runs them
+    """
+
+    notes: list = get_notes(texts=texts)
+    random.seed(seed)
+
+    return get_timed_run(run=lambda: modules.run_pipeline(steps=STEPS, input=notes, fuse=fuse), notes=notes)
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Time every step on synthetic corpora of different sizes, and all of them as a chain")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--steps", nargs="+", default=None, help="Only time these modules, such as GibberishText")
+    parser.add_argument("--no-chain", action="store_true", help="Skip timing the whole chain")
+    parser.add_argument("--no-fuse", action="store_true", help="Run the chain without fusing steps")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json", help="JSON file the results are written to")
+    arguments: argparse.Namespace = parser.parse_args()
+
+    # Made once, the smaller corpora are the start of the largest
+    all_texts: list = get_synthetic_texts(count=max(arguments.sizes), seed=arguments.seed)
+
+    results: list = []
+    print(f"{'notes':>8} {'step':>18} {'seconds':>9} {'notes/s':>10} {'out':>8}")
+    for size in sorted(arguments.sizes):
+        texts: list = all_texts[:size]
+
+        timed: list = [(step["module"], lambda step=step: get_step_result(step=step, texts=texts, seed=arguments.seed)) for step in STEPS if arguments.steps is None or step["module"] in arguments.steps]
+
+        # Each module is only timed once even if the chain uses it twice
+        timed: list = [(name, run) for index, (name, run) in enumerate(timed) if name not in [other for other, _ in timed[:index]]]
+
+        if not arguments.no_chain:
+            timed.append(("chain", lambda: get_chain_result(texts=texts, seed=arguments.seed, fuse=not arguments.no_fuse)))
+
+        for name, run in timed:
+            result: dict = dict(run(), size=size, step=name)
+            results.append(result)
+
+            if "error" in result:
+                print(f"{size:>8} {name:>18} failed: {result['error']}")
+            else:
+                print(f"{size:>8} {name:>18} {result['seconds']:>9.3f} {result['notes_per_second']:>10.0f} {str(result['notes_out']):>8}")
+
+    report: dict = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": arguments.seed,
+        "fuse": not arguments.no_fuse,
+        "results": results
+    }
+
+    with open(file=arguments.output, mode="w") as f:
+        json.dump(report, f, indent=4)
+
+    print(f"Wrote {len(results)} results to {arguments.output}")
@@ -0,0 +1,164 @@
+import os
+import csv
+import sys
+import json
+import random
+import argparse
+import itertools
+
+# Run from anywhere in the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.note_history import NoteHistory
+
+# Common words first, so the Zipf weights make them the most frequent
+common_words: list = (
+    "the i to a and is it you that of in this my for be on have just so but not me with was are "
+    "do what like can all at if your get they one out about up its no how more when or people "
+    "think now know good want there time too really some would im dont make been going new day "
+    "love see still lot thing need much only because back gay trans cat fox very feel also going "
+    "happy sad nice bad great cute tired sleepy weird cool fun hate spam lie friends post server "
+    "instance fediverse admin update bug code computer game music art coffee tea sleep eat"
+).split()
+
+syllables: list = ["ka", "mi", "to", "ra", "ne", "su", "lo", "vi", "pe", "da", "zu", "fo", "ri", "an", "el", "or", "ix", "um"]
+
+emojis: list = [
+    ":blobfox_mlem:", ":blobfox_pleading:", ":blobfox_sad:", ":neocat_sad:", ":neofox_happy:",
+    ":blobcat_very_sad:", ":blobcat_sad_reach:", ":neocat_pat:", ":ablobcatwave:", ":verified:"
+]
+
+hosts: list = ["example.com", "mastodon.social", "misskey.io", "fedi.catgirl.cloud", "tech.lgbt", "social.example.org"]
+
+closers: list = [".", ".", ".", "!", "?", "...", " :3", "!!"]
+
+def get_vocabulary(generator: random.Random, size: int):
+    """
+        Get the common words followed by made up words, enough for a long tail
+    """
+
+    words: list = list(common_words)
+    seen: set = set(words)
+    while len(words) < size:
+        word: str = "".join(generator.choice(syllables) for _ in range(generator.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+
+    return words
+
+class SyntheticCorpus:
+    """
+        Deterministic generator of fediverse style notes
+
+        Words follow a Zipf distribution and notes are sprinkled with emoji shortcodes, mentions,
+        hashtags, URLs and markdown links. The same seed gives the same notes, and a smaller
+        corpus is always the start of a larger one
+    """
+
+    # Default
+    seed: int = 0
+    vocabulary_size: int = 5000
+
+    # Non-Configurable
+    generator: random.Random = None
+    words: list = None
+    cumulative_weights: list = None
+    users: list = None
+
+    def __init__(self, seed: int = 0, vocabulary_size: int = 5000):
+        """
+            Initialize the generator
+        """
+
+        self.seed: int = seed
+        self.vocabulary_size: int = vocabulary_size
+
+        self.generator: random.Random = random.Random(seed)
+        self.words: list = get_vocabulary(generator=self.generator, size=vocabulary_size)
+        self.cumulative_weights: list = list(itertools.accumulate(1 / rank for rank in range(1, len(self.words) + 1)))
+        self.users: list = [f"@{self.generator.choice(self.words)}{self.generator.randint(0, 99)}@{self.generator.choice(hosts)}" for _ in range(200)]
+
+    def _get_url(self):
+        generator: random.Random = self.generator
+
+        return f"https://{generator.choice(hosts)}/{'/'.join(generator.choices(self.words[:500], k=generator.randint(1, 3)))}"
+
+    def _get_sentence(self):
+        generator: random.Random = self.generator
+        words: list = generator.choices(self.words, cum_weights=self.cumulative_weights, k=generator.randint(3, 18))
+
+        # Sprinkle in what makes a note look like a note
+        roll: float = generator.random()
+        if roll < 0.15:
+            words.insert(generator.randint(0, len(words)), generator.choice(emojis))
+        elif roll < 0.25:
+            words.insert(0, generator.choice(self.users))
+        elif roll < 0.30:
+            words.append(self._get_url())
+        elif roll < 0.35:
+            words.insert(generator.randint(0, len(words)), f"[{' '.join(generator.choices(self.words[:200], k=2))}]({self._get_url()})")
+        elif roll < 0.40:
+            words.append(f"#{generator.choice(self.words[:300])}")
+
+        sentence: str = " ".join(words) + generator.choice(closers)
+
+        return sentence[0].upper() + sentence[1:]
+
+    def get_text(self):
+        """
+            Get the text of the next note
+        """
+
+        return " ".join(self._get_sentence() for _ in range(self.generator.choice([1, 1, 1, 2, 2, 3, 4])))
+
+    def get_texts(self, count: int):
+        """
+            Get the texts of the next notes
+        """
+
+        return [self.get_text() for _ in range(count)]
+
+def get_synthetic_texts(count: int, seed: int = 0):
+    """
+        Get the texts of a synthetic corpus
+    """
+
+    return SyntheticCorpus(seed=seed).get_texts(count=count)
+
+def get_notes(texts: list):
+    """
+        Wrap texts into notes the way DownloadNotes does
+    """
+
+    notes: list = []
+    for text in texts:
+        tag: dict = {
+            "name": "DownloadNotes",
+            "operation": "create",
+            "show": False,
+            "skipped": False,
+            "new": False
+        }
+
+        notes.append({
+            "note": NoteHistory([{"text": text, "meta": {}, "tag": tag}])
+        })
+
+    return notes
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Write a synthetic corpus.csv, in the format DownloadNotes reads")
+    parser.add_argument("--notes", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="corpus.csv")
+    arguments: argparse.Namespace = parser.parse_args()
+
+    with open(file=arguments.output, mode="w", newline="") as f:
+        corpus: csv.writer = csv.writer(f)
+        corpus.writerow(["id", "text", "meta"])
+
+        for id, text in enumerate(get_synthetic_texts(count=arguments.notes, seed=arguments.seed)):
+            corpus.writerow([f"synthetic{id}", text, json.dumps({})])
+
+    print(f"Wrote {arguments.notes} notes to {arguments.output}")
@@ -0,0 +1,42 @@
+import os
+import logging
+import argparse
+
+# Setup Logger
+logger: logging.Logger = logging.getLogger(__name__)
+
+try:
+    import coloredlogs
+except ImportError:
+    logger.error("Failed to import coloredlogs, please run `pip3 install coloredlogs`")
+    exit(1)
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    logger.error("Failed to import dotenv, please run `pip3 install python-dotenv`")
+    exit(1)
+
+try:
+    from modules.corpus_store import SQLiteCorpusStore
+except ImportError as e:
+    logger.error(e)
+    exit(1)
+
+if __name__ == "__main__":
+    # Load Environment Variables
+    load_dotenv()
+    coloredlogs.install(level=logging.INFO)
+
+    # One-shot import of an existing corpus.csv into the SQLite corpus store
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Import an existing corpus.csv into a SQLite corpus store")
+    parser.add_argument("csv_path", nargs="?", default="corpus.csv")
+    parser.add_argument("database_path", nargs="?", default=os.getenv("CORPUS_DATABASE_PATH", "corpus.db"))
+    arguments: argparse.Namespace = parser.parse_args()
+
+    if not os.path.exists(arguments.csv_path):
+        parser.error(f"`{arguments.csv_path}` does not exist")
+
+    store: SQLiteCorpusStore = SQLiteCorpusStore(file_path=arguments.database_path)
+    store.import_csv(file_path=arguments.csv_path)
+    store.close()
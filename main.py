@@ -1,6 +1,8 @@
 import os
 import logging
 
+from collections.abc import Iterator
+
 # Setup Logger
 logger: logging.Logger = logging.getLogger(__name__)
 LESSERDEBUG: int = 15  # Debug is 10
@@ -64,42 +66,87 @@ if __name__ == "__main__":
     download_host: str = os.getenv("DOWNLOAD_HOST")
     download_api_key: str = os.getenv("DOWNLOAD_API_KEY")
     user_id: str = os.getenv("USER_ID")
+    corpus_storage: str = os.getenv("CORPUS_STORAGE", "csv")
+    corpus_database_path: str = os.getenv("CORPUS_DATABASE_PATH", "corpus.db")
+
+    # Pipeline Settings
+    stream: bool = parse_boolean_from_string(string=os.getenv("STREAM", "false"))
+    workers: int = int(os.getenv("WORKERS", "1"))
+    fuse_steps: bool = parse_boolean_from_string(string=os.getenv("FUSE_STEPS", "true"))
+    metrics: bool = parse_boolean_from_string(string=os.getenv("METRICS", "true"))
+    metrics_trace_memory: bool = parse_boolean_from_string(string=os.getenv("METRICS_TRACE_MEMORY", "false"))
+    metrics_path: str = os.getenv("METRICS_PATH") or None
+    metrics_format: str = os.getenv("METRICS_FORMAT", "json")
+    serve: bool = parse_boolean_from_string(string=os.getenv("SERVE", "false"))
+    server_host: str = os.getenv("SERVER_HOST", "127.0.0.1")
+    server_port: int = int(os.getenv("SERVER_PORT", "8080"))
+    nltk_allow_download: bool = parse_boolean_from_string(string=os.getenv("NLTK_ALLOW_DOWNLOAD", "true"))
 
     # Post Notes Settings
     post_host: str = os.getenv("POST_HOST")
     post_api_key: str = os.getenv("POST_API_KEY")
     content_warning: str = os.getenv("CONTENT_WARNING", "markov generated post")
     dry_run: bool = parse_boolean_from_string(string=os.getenv("DRY_RUN", "true"))
+    post_workers: int = int(os.getenv("POST_WORKERS", "1"))
+    post_rate_limit: float = float(os.getenv("POST_RATE_LIMIT")) if os.getenv("POST_RATE_LIMIT") else None
+
+    # Generate Markov Settings
+    cache_model: bool = parse_boolean_from_string(string=os.getenv("MARKOV_CACHE_MODEL", "true"))
+    model_cache_path: str = os.getenv("MARKOV_MODEL_CACHE_PATH", "markov_model.cache")
+    incremental_training: bool = parse_boolean_from_string(string=os.getenv("MARKOV_INCREMENTAL_TRAINING", "false"))
+    max_attempts: int = int(os.getenv("MARKOV_MAX_ATTEMPTS", "10000"))
+    max_seconds: float = float(os.getenv("MARKOV_MAX_SECONDS", "60"))
+    sentiment_bias: float = float(os.getenv("MARKOV_SENTIMENT_BIAS", "0"))
+    training_workers: int = int(os.getenv("MARKOV_TRAINING_WORKERS", "1"))
+    chain_backend: str = os.getenv("MARKOV_CHAIN_BACKEND", "markovify")
+    model_file_path: str = os.getenv("MARKOV_MODEL_FILE_PATH") or None
+
+    # Rebuild Settings
+    detokenizer_backend: str = os.getenv("DETOKENIZER_BACKEND", "python")
+
+    # Gibberish Settings
+    gibberish_cache_path: str = os.getenv("GIBBERISH_CACHE_PATH") or None
 
     STEPS: list = [
         # Require Meta
-        {"module": modules.DownloadNotes, "settings": {"host": download_host, "api_key": download_api_key, "user_id": user_id}},
-        {"module": modules.FilterNotes, "settings": {"toss_text": os.getenv("FILTER_TOSS_TEXT", [])}},
+        {"module": "DownloadNotes", "settings": {"host": download_host, "api_key": download_api_key, "user_id": user_id, "storage": corpus_storage, "database_path": corpus_database_path, "stream": stream}},
+        {"module": "FilterNotes", "settings": {"toss_text": os.getenv("FILTER_TOSS_TEXT", [])}},
 
         # Support Text Only
-        {"module": modules.RevertNyaizeText, "settings": {}},
-        {"module": modules.CleanText, "settings": {}},
-        {"module": modules.GenerateMarkov, "settings": {}},
-        {"module": modules.RebuildText, "settings": {}},
-        {"module": modules.NormalizeText, "settings": {}},
-        {"module": modules.CleanText, "settings": {}},
-        {"module": modules.GibberishText, "settings": {"chance_execute": 0.5}},
-        {"module": modules.NormalizeText, "settings": {"should_recase_sentence": False}},
-        {"module": modules.NyaizeText, "settings": {}},
-        {"module": modules.AddHashtags, "settings": {}},
-        {"module": modules.PostNotes, "settings": {"host": post_host, "api_key": post_api_key, "content_warning": content_warning, "dry_run": dry_run}}
+        {"module": "RevertNyaizeText", "settings": {}},
+        {"module": "CleanText", "settings": {}},
+        {"module": "GenerateMarkov", "settings": {"cache_model": cache_model, "model_cache_path": model_cache_path, "incremental_training": incremental_training, "max_attempts": max_attempts, "max_seconds": max_seconds, "sentiment_bias": sentiment_bias, "workers": workers, "training_workers": training_workers, "chain_backend": chain_backend, "model_file_path": model_file_path, "allow_download": nltk_allow_download}},
+        {"module": "RebuildText", "settings": {"workers": workers, "detokenizer_backend": detokenizer_backend, "allow_download": nltk_allow_download}},
+        {"module": "NormalizeText", "settings": {}},
+        {"module": "CleanText", "settings": {}},
+        {"module": "GibberishText", "settings": {"chance_execute": 0.5, "workers": workers, "cache_path": gibberish_cache_path, "allow_download": nltk_allow_download}},
+        {"module": "NormalizeText", "settings": {"should_recase_sentence": False}},
+        {"module": "NyaizeText", "settings": {}},
+        {"module": "AddHashtags", "settings": {}},
+        {"module": "PostNotes", "settings": {"host": post_host, "api_key": post_api_key, "content_warning": content_warning, "dry_run": dry_run, "workers": post_workers, "rate_limit": post_rate_limit}}
     ]
 
-    output = None
-    for STEP in STEPS:
-        # Instantiate Module
-        MODULE: object = STEP["module"]()
-
-        # Set Settings
-        MODULE.set_settings(settings=STEP["settings"])
-
-        # Set Input
-        MODULE.set_input(input=output)
-
-        # Run
-        output = MODULE.run()
\ No newline at end of file
+    # Keep the model loaded and generate notes on request instead of running once
+    if serve:
+        server: object = modules.GeneratorServer(steps=STEPS, host=server_host, port=server_port, fuse=fuse_steps)
+
+        try:
+            server.set_warm()
+        except (ImportError, LookupError) as e:
+            logger.error(e)
+            exit(1)
+
+        server.serve_forever()
+        exit(0)
+
+    # Steps are imported and set up as they are created, so missing dependencies and NLTK data show up here
+    try:
+        output = modules.run_pipeline(steps=STEPS, fuse=fuse_steps, metrics=metrics, trace_memory=metrics_trace_memory, metrics_path=metrics_path, metrics_format=metrics_format)
+    except (ImportError, LookupError) as e:
+        logger.error(e)
+        exit(1)
+
+    # Streamed notes only flow through the steps once they are requested
+    if isinstance(output, Iterator):
+        for note_data in output:
+            pass
\ No newline at end of file
@@ -1,10 +1,36 @@
-from .download_notes import DownloadNotes
-from .filter_notes import FilterNotes
-from .nyaize_transform import NyaizeText, RevertNyaizeText
-from .clean_transform import CleanText
-from .generate_markov_notes import GenerateMarkov
-from .rebuild_transform import RebuildText
-from .normalize_transform import NormalizeText
-from .gibberish_transform import GibberishText
-from .add_hashtags import AddHashtags
-from .post_notes import PostNotes
\ No newline at end of file
+import importlib
+
+# Every step and helper, and the module it lives in
+# They are only imported the first time they are used, so a run only pays for
+# the dependencies (nltk, markovify, hyphenate, ...) of the steps it creates
+registry: dict = {
+    "DownloadNotes": ".download_notes",
+    "FilterNotes": ".filter_notes",
+    "NyaizeText": ".nyaize_transform",
+    "RevertNyaizeText": ".nyaize_transform",
+    "CleanText": ".clean_transform",
+    "GenerateMarkov": ".generate_markov_notes",
+    "RebuildText": ".rebuild_transform",
+    "NormalizeText": ".normalize_transform",
+    "GibberishText": ".gibberish_transform",
+    "AddHashtags": ".add_hashtags",
+    "PostNotes": ".post_notes",
+    "SQLiteCorpusStore": ".corpus_store",
+    "FusedText": ".pipeline",
+    "run_pipeline": ".pipeline",
+    "GeneratorServer": ".server"
+}
+
+def __getattr__(name: str):
+    if name not in registry:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value: object = getattr(importlib.import_module(name=registry[name], package=__name__), name)
+
+    # Later lookups find it directly
+    globals()[name] = value
+
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(registry))
\ No newline at end of file
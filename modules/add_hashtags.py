@@ -2,6 +2,8 @@ import re
 import random
 import logging
 
+from collections.abc import Iterator
+
 class AddHashtags:
     # Required
     input: object = None
@@ -50,6 +52,9 @@ class AddHashtags:
             Execute this module as part of a chain of modules
         """
 
+        # A module can run more than once, such as for every request of the server
+        self.skipped: bool = False
+
         # Gives probability of executing module
         if self.chance_execute < random.random():
             self.logger.log(level=self.LESSERDEBUG, msg="Hit random chance of skipping adding hashtags to notes...")
@@ -72,41 +77,52 @@ class AddHashtags:
         if type(self.input) is str:
             return self._get_tagged_text(text=self.input, tags=[tag])
         
-        if type(self.input) is not list:
+        if type(self.input) is not list and not isinstance(self.input, Iterator):
             return
 
-        notes: list = []
-        for note_data in self.input:
-            if "note" not in note_data:
-                continue
+        notes: Iterator = self._get_processed_notes(notes=self.input, tag=tag)
 
-            note: dict = note_data["note"][-1].copy()
+        # Streamed notes are handed on one at a time as they are requested
+        if type(self.input) is list:
+            return list(notes)
 
-            if "text" not in note:
-                continue
+        return notes
 
-            # We only want to add our tag if we add other tags
-            tags: list = []
-            for note_history in note_data["note"]:
-                tag_data: dict = note_history["tag"]
-                if "show" in tag_data and tag_data["show"] == True:
-                    tags.append(tag_data)
+    def _get_processed_notes(self, notes: Iterator, tag: dict):
+        for note_data in notes:
+            note_data: dict = self._get_processed_note(note_data=note_data, tag=tag)
 
-            tag["show"] = self.show_tag
-            if tag["show"] and not modifies_text:
-                tag["show"] = False
+            if note_data is not None:
+                yield note_data
 
-            if not self.skipped:
-                note["text"] = self._get_tagged_text(text=note["text"], tags=tags).strip()
+    def _get_processed_note(self, note_data: dict, tag: dict):
+        if "note" not in note_data:
+            return
 
-            note["tag"] = tag
+        note: dict = note_data["note"][-1].copy()
 
-            # Add Note To List
-            note_data["note"].append(note)
+        if "text" not in note:
+            return
 
-            notes.append(note_data)
+        # We only want to add our tag if we add other tags
+        tags: list = []
+        for tag_data in note_data["note"].get_tags():
+            if "show" in tag_data and tag_data["show"] == True:
+                tags.append(tag_data)
 
-        return notes
+        tag["show"] = self.show_tag
+        if tag["show"] and not modifies_text:
+            tag["show"] = False
+
+        if not self.skipped:
+            note["text"] = self._get_tagged_text(text=note["text"], tags=tags).strip()
+
+        note["tag"] = tag
+
+        # Add Note To List
+        note_data["note"].append(note)
+
+        return note_data
 
     def _get_tagged_text(self, text: str, tags: list):
         # Validate text
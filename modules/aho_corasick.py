@@ -0,0 +1,75 @@
+from collections import deque
+
+class AhoCorasick:
+    """
+        Multi-pattern substring matcher which scans a text once, however many patterns there are
+
+        The automaton is compiled to a full transition table over the characters used by the
+        patterns, any other character (such as whitespace) goes back to the start, so a match
+        can never span two words when the patterns don't contain whitespace
+    """
+
+    # Non-Configurable
+    transitions: list = None
+    outputs: list = None
+    matches_empty: bool = False
+
+    def __init__(self, patterns: list):
+        """
+            Compile the patterns into an automaton
+        """
+
+        # Build the trie
+        goto: list = [{}]
+        outputs: list = [False]
+        for pattern in patterns:
+            node: int = 0
+            for character in pattern:
+                if character not in goto[node]:
+                    goto.append({})
+                    outputs.append(False)
+                    goto[node][character] = len(goto) - 1
+
+                node: int = goto[node][character]
+
+            outputs[node] = True
+
+        self.matches_empty: bool = outputs[0]
+
+        # Breadth first, so every failure link points to a finished node
+        transitions: list = [dict(goto[0])] + [None] * (len(goto) - 1)
+        failures: list = [0] * len(goto)
+        queue: deque = deque(goto[0].values())
+        while len(queue) > 0:
+            node: int = queue.popleft()
+
+            transitions[node] = dict(transitions[failures[node]])
+            outputs[node] = outputs[node] or outputs[failures[node]]
+
+            for character, child in goto[node].items():
+                failures[child] = transitions[failures[node]].get(character, 0)
+                transitions[node][character] = child
+                queue.append(child)
+
+        self.transitions: list = transitions
+        self.outputs: list = outputs
+
+    def search(self, text: str):
+        """
+            Check if any pattern is in the text
+        """
+
+        # An empty pattern is in every word
+        if self.matches_empty:
+            return len(text.split()) > 0
+
+        transitions: list = self.transitions
+        outputs: list = self.outputs
+
+        node: int = 0
+        for character in text:
+            node: int = transitions[node].get(character, 0)
+            if outputs[node]:
+                return True
+
+        return False
@@ -2,6 +2,10 @@ import re
 import random
 import logging
 
+from collections.abc import Iterator
+
+from .parallel import get_processed_texts
+
 class CleanText:
     # Required
     input: object = None
@@ -10,9 +14,12 @@ class CleanText:
     chance_execute: float = 1.0
     show_tag: bool = False
     hard_skip: bool = False
+    workers: int = 1
+    batch_size: int = 1024
 
     # Non-Configurable
     skipped: bool = False
+    text_only: bool = True
     markdown_link_pattern: re.Pattern = re.compile(pattern=r"\[.*\]\(http.+\)", flags=re.IGNORECASE|re.MULTILINE)
     url_pattern: re.Pattern = re.compile(pattern=r"http\S+", flags=re.IGNORECASE|re.MULTILINE)
     logger: logging.Logger = None
@@ -40,6 +47,12 @@ class CleanText:
         if "hard_skip" in settings:
             self.hard_skip = settings["hard_skip"]
 
+        if "workers" in settings:
+            self.workers = settings["workers"]
+
+        if "batch_size" in settings:
+            self.batch_size = settings["batch_size"]
+
     def set_input(self, input: object):
         """
             Set the input used by this module
@@ -47,65 +60,93 @@ class CleanText:
         
         self.input: object = input
 
-    def run(self):
+    def set_skipped(self):
         """
-            Execute this module as part of a chain of modules
+            Roll the chance of executing this module, True means it is left out entirely
         """
 
+        # A module can run more than once, such as for every request of the server
+        self.skipped: bool = False
+
         # Gives probability of executing module
         if self.chance_execute < random.random():
             self.logger.log(level=self.LESSERDEBUG, msg="Hit random chance of skipping cleaning notes...")
 
             if self.hard_skip:
-                return self.input
+                return True
 
             self.skipped: bool = True
         else:
             self.logger.info("Cleaning notes...")
 
+        return False
+
+    def run(self):
+        """
+            Execute this module as part of a chain of modules
+        """
+
+        if self.set_skipped():
+            return self.input
+
         if type(self.input) is str:
             return self._get_cleaned_text(text=self.input)
         
-        if type(self.input) is not list:
+        if type(self.input) is not list and not isinstance(self.input, Iterator):
             return
 
-        notes: list = []
-        for note_data in self.input:
-            if "note" not in note_data:
-                continue
-
-            note: dict = note_data["note"][-1].copy()
+        notes: Iterator = self._get_processed_notes(notes=self.input)
 
-            if "text" not in note:
-                continue
+        # Streamed notes are handed on one at a time as they are requested
+        if type(self.input) is list:
+            return list(notes)
 
-            # Create Operation Tag
-            tag: dict = {
-                "name": "CleanText",
-                "operation": "modify",
-                "show": self.show_tag,
-                "skipped": self.skipped
-            }
+        return notes
 
-            text: str = note["text"]
-            if not self.skipped:
-                text: str = self._get_cleaned_text(text=note["text"])
+    def _get_processed_notes(self, notes: Iterator):
+        # With more than one worker the texts are modified in batches by the process pool
+        for note_data, modified_text in get_processed_texts(module=self, method_name="_get_cleaned_text", notes=notes, workers=self.workers, batch_size=self.batch_size):
+            note_data: dict = self._get_processed_note(note_data=note_data, modified_text=modified_text)
 
-            # If modification did not take effect, then remove tag
-            if self.show_tag and note["text"] == text:
-                tag["show"] = False
+            if note_data is not None:
+                yield note_data
 
-            note["text"] = text.strip()
-            note["tag"] = tag
+    def _get_processed_note(self, note_data: dict, modified_text: str = None):
+        if "note" not in note_data:
+            return
 
-            # Add Note To List
-            note_data["note"].append(note)
+        note: dict = note_data["note"][-1].copy()
 
-            notes.append({
-                "note": note_data["note"]
-            })
+        if "text" not in note:
+            return
 
-        return notes
+        # Create Operation Tag
+        tag: dict = {
+            "name": "CleanText",
+            "operation": "modify",
+            "show": self.show_tag,
+            "skipped": self.skipped
+        }
+
+        text: str = note["text"]
+        if not self.skipped and modified_text is not None:
+            text: str = modified_text
+        elif not self.skipped:
+            text: str = self._get_cleaned_text(text=note["text"])
+
+        # If modification did not take effect, then remove tag
+        if self.show_tag and note["text"] == text:
+            tag["show"] = False
+
+        note["text"] = text.strip()
+        note["tag"] = tag
+
+        # Add Note To List
+        note_data["note"].append(note)
+
+        return {
+            "note": note_data["note"]
+        }
 
     def _get_cleaned_text(self, text: str):
         # Validate text
@@ -0,0 +1,139 @@
+import csv
+import json
+import sqlite3
+import logging
+
+class SQLiteCorpusStore:
+    # Default
+    file_path: str = "corpus.db"
+
+    # Non-Configurable
+    connection: sqlite3.Connection = None
+    meta_flags: list = ["is_renote", "is_reply", "has_cw", "has_mentions", "has_zws"]
+    logger: logging.Logger = None
+    LESSERDEBUG: int = 15
+    VERBOSE: int = 5
+
+    def __init__(self, file_path: str = None):
+        """
+            Open (and create if needed) the corpus database
+        """
+
+        self.logger: logging.Logger = logging.getLogger(type(self).__name__)
+
+        if file_path is not None:
+            self.file_path = file_path
+
+        self.connection: sqlite3.Connection = sqlite3.connect(self.file_path)
+        self._set_schema()
+
+    def _set_schema(self):
+        flag_columns: str = ", ".join(f"{flag} INTEGER NOT NULL DEFAULT 0" for flag in self.meta_flags)
+
+        # The implicit rowid keeps the order notes were downloaded in
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS notes (id TEXT PRIMARY KEY, text TEXT NOT NULL, visibility TEXT, {flag_columns})")
+        # Notes are always read in rowid order, which a meta index can't give, so filtering on it needed a sort
+        # and was slower than scanning the table, an index left by an older version only slows down inserts
+        self.connection.execute("DROP INDEX IF EXISTS notes_meta_index")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.commit()
+
+    def close(self):
+        """
+            Commit pending notes and close the database
+        """
+
+        self.connection.commit()
+        self.connection.close()
+
+    def commit(self):
+        """
+            Commit pending notes to the database
+        """
+
+        self.connection.commit()
+
+    def get_since_id(self):
+        """
+            Get the id of the last downloaded note
+        """
+
+        row: tuple = self.connection.execute("SELECT value FROM state WHERE key = 'since_id'").fetchone()
+        if row is None:
+            return None
+
+        return row[0]
+
+    def get_note_count(self):
+        """
+            Get the number of stored notes
+        """
+
+        return self.connection.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def add_note(self, id: str, text: str, meta: dict):
+        """
+            Store a note and move the high-water mark to it, call commit() to save
+        """
+
+        if meta is None:
+            meta: dict = {}
+
+        columns: list = ["id", "text", "visibility"] + self.meta_flags
+        values: list = [id, text, meta.get("visibility")] + [1 if meta.get(flag) == True else 0 for flag in self.meta_flags]
+
+        self.connection.execute(f"INSERT OR IGNORE INTO notes ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", values)
+        self.connection.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('since_id', ?)", (id,))
+
+    def get_notes(self, banned_visibilities: list = None, banned_flags: list = None):
+        """
+            Get stored notes in download order, optionally leaving out banned meta
+        """
+
+        conditions: list = []
+        parameters: list = []
+        if banned_visibilities is not None and len(banned_visibilities) > 0:
+            conditions.append(f"(visibility IS NULL OR visibility NOT IN ({', '.join('?' * len(banned_visibilities))}))")
+            parameters += banned_visibilities
+
+        if banned_flags is not None:
+            for flag in banned_flags:
+                if flag not in self.meta_flags:
+                    raise ValueError(f"Unknown meta flag `{flag}`")
+
+                conditions.append(f"{flag} = 0")
+
+        query: str = f"SELECT id, text, visibility, {', '.join(self.meta_flags)} FROM notes"
+        if len(conditions) > 0:
+            query += f" WHERE {' AND '.join(conditions)}"
+        query += " ORDER BY rowid"
+
+        for row in self.connection.execute(query, parameters):
+            meta: dict = {"visibility": row[2]}
+            for position, flag in enumerate(self.meta_flags):
+                meta[flag] = row[3 + position] == 1
+
+            yield row[0], row[1], meta
+
+    def import_csv(self, file_path: str):
+        """
+            Import the notes from a corpus.csv written by DownloadNotes
+        """
+
+        count: int = 0
+        with open(file=file_path, mode="r") as f:
+            corpus: csv.reader = csv.reader(f)
+
+            first_loop: bool = True
+            for note_data in corpus:
+                if first_loop:
+                    first_loop: bool = False
+                    continue
+
+                self.add_note(id=note_data[0].strip(), text=note_data[1], meta=json.loads(note_data[2]))
+                count += 1
+
+        self.commit()
+        self.logger.info(f"Imported {count} notes from `{file_path}` into `{self.file_path}`...")
+
+        return count
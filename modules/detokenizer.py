@@ -0,0 +1,194 @@
+import re
+import functools
+import unicodedata
+
+try:
+    import regex
+except ImportError:
+    raise ImportError("Failed to import regex, please run `pip3 install regex`")
+
+# Character classes used by Moses' detokenizer.perl
+right_shift_pattern: re.Pattern = re.compile(pattern=r"^[\(\[\{¿¡]+$")
+left_shift_pattern: re.Pattern = re.compile(pattern=r"^[,.?!:;\\%}\])]+$")
+french_space_pattern: re.Pattern = re.compile(pattern=r"^[?!:;\\%]$")
+quote_pattern: re.Pattern = re.compile(pattern=r"^['\"„“`]+$")
+double_quote_pattern: re.Pattern = re.compile(pattern=r"^[„“”]+$")
+number_pattern: re.Pattern = re.compile(pattern=r"^[0-9]+$")
+czech_dash_pattern: re.Pattern = re.compile(pattern=r"^[-–]$")
+czech_li_pattern: re.Pattern = re.compile(pattern=r"^li$|^mail", flags=re.IGNORECASE)
+alpha_pattern: regex.Pattern = regex.compile(pattern=r"\p{Alphabetic}")
+alnum_pattern: regex.Pattern = regex.compile(pattern=r"[\p{Alphabetic}\p{Nd}]")
+finnish_suffix_pattern: re.Pattern = re.compile(pattern=r"^(N|n|A|a|Ä|ä|ssa|Ssa|ssä|Ssä|sta|stä|Sta|Stä|hun|Hun|hyn|Hyn|han|Han|hän|Hän|hön|Hön|un|Un|yn|Yn|an|An|än|Än|ön|Ön|seen|Seen|lla|Lla|llä|Llä|lta|Lta|ltä|Ltä|lle|Lle|ksi|Ksi|kse|Kse|tta|Tta|ine|Ine)(ni|si|mme|nne|nsa)?(ko|kö|han|hän|pa|pä|kaan|kään|kin)?$")
+escapes: list = [
+    ("&bar;", "|"), ("&#124;", "|"), ("&lt;", "<"), ("&gt;", ">"), ("&bra;", "["), ("&ket;", "]"),
+    ("&quot;", "\""), ("&apos;", "'"), ("&#91;", "["), ("&#93;", "]"), ("&amp;", "&")
+]
+
+# Code point ranges of CJK characters, which are joined without spaces
+cjk_ranges: list = [
+    (0x1100, 0x11FF), (0x2E80, 0xA4CF), (0xA840, 0xA87F), (0xAC00, 0xD7AF),
+    (0xF900, 0xFAFF), (0xFE30, 0xFE4F), (0xFF65, 0xFFDC), (0x20000, 0x2FFFF)
+]
+
+def _get_is_cjk(character: str):
+    codepoint: int = ord(character)
+    if codepoint < 0x1100:
+        return False
+
+    return any(start <= codepoint <= end for start, end in cjk_ranges)
+
+def _get_is_alpha(character: str):
+    # Perl's \p{IsAlpha} is the Alphabetic property, which unlike `str.isalpha` also takes in letter
+    # numbers such as Ⅻ, circled letters and the vowel signs of many scripts
+    return alpha_pattern.match(character) is not None
+
+def _get_is_alnum(character: str):
+    # Perl's \p{IsAlnum} only adds decimal digits to it, not other numbers such as ²
+    return alnum_pattern.match(character) is not None
+
+@functools.lru_cache(maxsize=65536)
+def _get_word_kind(word: str):
+    # Which of the language independent rules a word falls under, words repeat so this is cached
+    if len(word) > 0 and _get_is_cjk(character=word[0]):
+        return "cjk"
+
+    # Currency symbols and opening brackets stick to the next word
+    if len(word) > 0 and all(unicodedata.category(character) == "Sc" or right_shift_pattern.match(character) for character in word):
+        return "right"
+
+    if left_shift_pattern.match(word):
+        return "left"
+
+    if quote_pattern.match(word):
+        return "quote"
+
+    return None
+
+class Detokenizer:
+    """
+        Pure Python port of Moses' detokenizer.perl, without the Perl subprocess
+
+        Called with a list of tokens just like `mosestokenizer.MosesDetokenizer`, and gives
+        the same sentence back
+    """
+
+    # Default
+    language: str = "en"
+
+    def __init__(self, language: str = "en"):
+        """
+            Initialize the detokenizer for a language
+        """
+
+        self.language: str = language
+
+    def __call__(self, tokens: list):
+        """
+            Join the tokens of a single sentence
+        """
+
+        if len(tokens) == 0:
+            return ""
+
+        line: str = " ".join(tokens)
+
+        # Moses passes XML and blank lines through untouched
+        if re.match(pattern=r"^<.+>$", string=line) or line.strip() == "":
+            return line
+
+        return self._get_detokenized_text(text=line)
+
+    def _get_detokenized_text(self, text: str):
+        text: str = f" {text} "
+        text: str = text.replace(" @-@ ", "-")
+        for escaped, character in escapes:
+            text: str = text.replace(escaped, character)
+
+        # Perl's split drops the empty fields at the end
+        words: list = text.split(" ")
+        while len(words) > 0 and words[-1] == "":
+            words.pop()
+
+        language: str = self.language
+        text: str = ""
+        quote_counts: dict = {"'": 0, "\"": 0}
+        prepend_space: str = " "
+        i: int = 0
+        while i < len(words):
+            word: str = words[i]
+            kind: str = _get_word_kind(word=word)
+
+            if kind == "cjk":
+                if i > 0 and len(words[i - 1]) > 0 and _get_is_cjk(character=words[i - 1][-1]):
+                    # Consecutive CJK words are joined
+                    text += word
+                else:
+                    text += prepend_space + word
+
+                prepend_space: str = " "
+            elif kind == "right":
+                text += prepend_space + word
+                prepend_space: str = ""
+            elif kind == "left":
+                # These punctuations are prefixed with a non-breakable space in French
+                if language == "fr" and french_space_pattern.match(word):
+                    text += " "
+
+                text += word
+                prepend_space: str = " "
+            elif language == "en" and i > 0 and len(word) > 1 and word[0] == "'" and _get_is_alpha(character=word[1]) and len(words[i - 1]) > 0 and _get_is_alnum(character=words[i - 1][-1]):
+                # Contractions such as `'s` stick to the word before them
+                text += word
+                prepend_space: str = " "
+            elif language == "cs" and i > 1 and number_pattern.match(words[i - 2]) and words[i - 1] in (".", ",") and number_pattern.match(word):
+                # Floats in Czech
+                text += word
+                prepend_space: str = " "
+            elif language in ("fr", "it") and i <= len(words) - 2 and len(word) > 1 and word[-1] == "'" and _get_is_alpha(character=word[-2]) and len(words[i + 1]) > 0 and _get_is_alpha(character=words[i + 1][0]):
+                # Contractions in French and Italian stick to the word after them
+                text += prepend_space + word
+                prepend_space: str = ""
+            elif language == "cs" and i < len(words) - 3 and len(word) > 0 and _get_is_alpha(character=word[-1]) and czech_dash_pattern.match(words[i + 1]) and czech_li_pattern.match(words[i + 2]):
+                # Dashed Czech words such as `e-mail`
+                text += prepend_space + word + words[i + 1]
+                i += 1
+                prepend_space: str = ""
+            elif kind == "quote":
+                normalized_quote: str = "\"" if double_quote_pattern.match(word) else word
+                quote_counts.setdefault(normalized_quote, 0)
+
+                if language == "cs" and word == "„":
+                    quote_counts[normalized_quote] = 0
+
+                if language == "cs" and word == "“":
+                    quote_counts[normalized_quote] = 1
+
+                if quote_counts[normalized_quote] % 2 == 0:
+                    if language == "en" and word == "'" and i > 0 and words[i - 1].endswith("s"):
+                        # Possessives ending in s, such as `The Jones' house`
+                        text += word
+                        prepend_space: str = " "
+                    else:
+                        # Opening quote
+                        text += prepend_space + word
+                        prepend_space: str = ""
+                        quote_counts[normalized_quote] += 1
+                else:
+                    # Closing quote
+                    text += word
+                    prepend_space: str = " "
+                    quote_counts[normalized_quote] += 1
+            elif language == "fi" and words[i - 1].endswith(":") and finnish_suffix_pattern.match(word):
+                # Finnish case suffixes after a colon, such as `EU:n`
+                text += word.lower()
+                prepend_space: str = " "
+            else:
+                text += prepend_space + word
+                prepend_space: str = " "
+
+            i += 1
+
+        # Clean up spaces at the ends and any double spacing
+        text: str = re.sub(pattern=r" +", repl=" ", string=text)
+
+        return text.strip(" ")
@@ -2,14 +2,22 @@ import os
 import re
 import csv
 import json
+import time
 import random
 import logging
 
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+
 try:
     import requests
 except ImportError:
     raise ImportError("Failed to import requests, please run `pip3 install requests`")
 
+from .corpus_store import SQLiteCorpusStore
+from .note_history import NoteHistory
+from .rate_limit import get_retry_delay
+
 class DownloadNotes:
     # Required
     input: object = None
@@ -22,7 +30,14 @@ class DownloadNotes:
     limit: int = 100
     session: requests.Session = requests.Session()
     file_path: str = "corpus.csv"
+    storage: str = "csv"  # csv, sqlite
+    database_path: str = "corpus.db"
     show_tag: bool = False
+    stream: bool = False
+    max_retries: int = 5
+    backoff_base: float = 1.0
+    backoff_max: float = 60.0
+    timeout: float = 30.0
 
     # Non-Configurable
     setup: bool = False
@@ -32,6 +47,7 @@ class DownloadNotes:
     include_nsfw: bool = False
     since_id: str = None
     processed_notes: int = 0
+    store: SQLiteCorpusStore = None
     logger: logging.Logger = None
     LESSERDEBUG: int = 15
     VERBOSE: int = 5
@@ -67,12 +83,33 @@ class DownloadNotes:
         if "file_path" in settings:
             self.file_path = settings["file_path"]
 
+        if "storage" in settings:
+            self.storage = settings["storage"]
+
+        if "database_path" in settings:
+            self.database_path = settings["database_path"]
+
         if "session" in settings:
             self.session = settings["session"]
 
         if "show_tag" in settings:
             self.show_tag = settings["show_tag"]
 
+        if "stream" in settings:
+            self.stream = settings["stream"]
+
+        if "max_retries" in settings:
+            self.max_retries = settings["max_retries"]
+
+        if "backoff_base" in settings:
+            self.backoff_base = settings["backoff_base"]
+
+        if "backoff_max" in settings:
+            self.backoff_max = settings["backoff_max"]
+
+        if "timeout" in settings:
+            self.timeout = settings["timeout"]
+
         if "chance_execute" in settings:
             self.chance_execute = settings["chance_execute"]
 
@@ -102,43 +139,63 @@ class DownloadNotes:
 
         self.logger.info("Downloading notes...")
 
-        # Import Existing Notes
-        notes: list = []
-        if os.path.exists(self.file_path):
-            with open(file=self.file_path, mode="r") as f:
-                corpus: csv.reader = csv.reader(f)
-
-                first_loop: bool = True
-                for note_data in corpus:
-                    if first_loop:
-                        first_loop: bool = False
-                        continue
-
-                    self.since_id: str = note_data[0].strip()
-
-                    # Create Operation Tag
-                    tag: dict = {
-                        "name": "DownloadNotes",
-                        "operation": "create",
-                        "show": self.show_tag,
-                        "skipped": False
-                    }
-
-                    note: dict = {
-                        "text": note_data[1].strip(),
-                        "meta": json.loads(note_data[2]),
-                        "tag": tag
-                    }
-
-                    notes.append({
-                        "note": [note],  # The list is so versions can be tracked
-                    })
+        notes: Iterator = self._get_all_notes()
+
+        # Streamed notes are handed on one at a time as they are requested
+        if self.stream:
+            return notes
+
+        return list(notes)
+
+    def _get_all_notes(self):
+        # Notes are streamed, so the store is closed once the last one was requested
+        try:
+            # Import Existing Notes
+            if self.storage == "sqlite":
+                self.store: SQLiteCorpusStore = SQLiteCorpusStore(file_path=self.database_path)
+                self.since_id: str = self.store.get_since_id()
+
+                for id, text, meta in self.store.get_notes():
+                    yield self._get_note_data(text=text, meta=meta, new=False)
+            elif os.path.exists(self.file_path):
+                with open(file=self.file_path, mode="r") as f:
+                    corpus: csv.reader = csv.reader(f)
+
+                    first_loop: bool = True
+                    for note_data in corpus:
+                        if first_loop:
+                            first_loop: bool = False
+                            continue
+
+                        self.since_id: str = note_data[0].strip()
+                        yield self._get_note_data(text=note_data[1], meta=json.loads(note_data[2]), new=False)
+
+            # Import New Notes
+            yield from self._update_corpus()
+        finally:
+            if self.store is not None:
+                self.store.close()
+                self.store: SQLiteCorpusStore = None
+
+    def _get_note_data(self, text: str, meta: dict, new: bool):
+        # Create Operation Tag
+        tag: dict = {
+            "name": "DownloadNotes",
+            "operation": "create",
+            "show": self.show_tag,
+            "skipped": False,
+            "new": new
+        }
 
-        # Import New Notes
-        for note in self._update_corpus():
-            notes.append(note)
+        note: dict = {
+            "text": text.strip(),
+            "meta": meta,
+            "tag": tag
+        }
 
-        return notes
+        return {
+            "note": NoteHistory([note]),  # The history is so versions can be tracked
+        }
 
     def _has_header(self):
         reader = open(file=self.file_path, mode="r")
@@ -147,7 +204,7 @@ class DownloadNotes:
 
         return True
 
-    def _get_notes(self):
+    def _get_notes(self, since_id: str):
         base_url: str = f"{self.host}/api/users/notes"
 
         params: dict = {
@@ -160,80 +217,112 @@ class DownloadNotes:
             "excludeNsfw": not self.include_nsfw,
         }
 
-        if self.since_id is not None:
-            params["sinceId"] = self.since_id
+        if since_id is not None:
+            params["sinceId"] = since_id
         else:
             # To force loading from beginning
             params["sinceId"] = "0"
 
-        return self.session.post(url=base_url, json=params)
+        return self.session.post(url=base_url, json=params, timeout=self.timeout)
+
+    def _get_page(self, since_id: str):
+        for attempt in range(self.max_retries + 1):
+            try:
+                response: requests.Response = self._get_notes(since_id=since_id)
+            except requests.RequestException as e:
+                # Nothing is left to wait for after the last attempt
+                if attempt == self.max_retries:
+                    self.logger.warning(f"Failed to download notes ({e})...")
+                    continue
+
+                delay: float = get_retry_delay(response=None, attempt=attempt, backoff_base=self.backoff_base, backoff_max=self.backoff_max)
+                self.logger.warning(f"Failed to download notes ({e})... retrying in {delay:.2f} seconds...")
+                time.sleep(delay)
+                continue
+
+            status: int = response.status_code
+
+            if status == 200:
+                return response.json()
+
+            if status == 403:
+                self.logger.error(f"Downloading notes is unauthorized... returning...")
+                return None
+
+            if status == 429 or status >= 500:
+                if attempt == self.max_retries:
+                    self.logger.warning(f"Status code is {status}...")
+                    continue
+
+                delay: float = get_retry_delay(response=response, attempt=attempt, backoff_base=self.backoff_base, backoff_max=self.backoff_max)
+                self.logger.warning(f"Status code is {status}... retrying in {delay:.2f} seconds...")
+                time.sleep(delay)
+                continue
+
+            self.logger.error(f"Status code is {status}... returning...")
+            return None
+
+        self.logger.error(f"Giving up on downloading notes after {self.max_retries + 1} attempts... returning...")
+        return None
 
     def _update_corpus(self):
         # Setup
-        corpus_writer = open(file=self.file_path, mode="a")
-        corpus: csv.writer = csv.writer(corpus_writer)
         mentions_pattern: re.Pattern = re.compile(pattern=r"(@)([A-Za-z0-9_]+@[A-Za-z0-9_.]+)\w+")
 
-        if not self._has_header():
-            corpus.writerow(["id", "text", "meta"])
-
-        loop: bool = True
-        while loop:
-            response: requests.Response = self._get_notes()
+        corpus_writer: object = None
+        if self.storage != "sqlite":
+            corpus_writer = open(file=self.file_path, mode="a")
+            corpus: csv.writer = csv.writer(corpus_writer)
+
+            if not self._has_header():
+                corpus.writerow(["id", "text", "meta"])
+
+        # The next page is requested while the current one is being written
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1)
+        try:
+            page: Future = executor.submit(self._get_page, self.since_id)
+
+            loop: bool = True
+            while loop:
+                notes: list = page.result()
+
+                if notes is None:
+                    return
+
+                if len(notes) == 0:
+                    loop: bool = False
+                else:
+                    page: Future = executor.submit(self._get_page, notes[-1]["id"])
+
+                for note_data in notes:
+                    self.since_id: str = note_data["id"]
+
+                    meta: dict = {
+                        "visibility": note_data["visibility"],
+                        "is_renote": True if note_data["renoteId"] is not None else False,
+                        "is_reply": True if note_data["replyId"] is not None else False,
+                        "has_cw": True if note_data["cw"] is not None else False,
+                        "has_mentions": True if "mentions" in note_data and len(note_data["mentions"]) > 0 else False,
+                        "has_zws": True if "\u200B" in note_data["text"].strip() else False,
+                    }
 
-            status: int = response.status_code
-            notes: dict = response.json()
+                    if meta["has_mentions"] == False and re.search(mentions_pattern, note_data["text"].strip()) is not None:
+                        meta["has_mentions"] = True
 
-            if status == 429:
-                self.logger.error(f"Hit rate limit... returning...")
-                return
+                    self.processed_notes += 1
 
-            if status == 403:
-                self.logger.error(f"Downloading notes is unauthorized... returning...")
-                return
+                    # Intentionally leaving unstripped here
+                    if self.storage == "sqlite":
+                        self.store.add_note(id=note_data["id"], text=note_data["text"], meta=meta)
+                    else:
+                        corpus.writerow([note_data["id"], note_data["text"], json.dumps(meta)])
 
-            if status == 500:
-                self.logger.error(f"Hit server with internal error... returning...")
-                return
+                    yield self._get_note_data(text=note_data["text"], meta=meta, new=True)
 
-            if status != 200:
-                self.logger.warning(f"Status code is {status}...")
-                continue
+                if self.storage == "sqlite":
+                    self.store.commit()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-            if len(notes) == 0:
-                loop: bool = False
-
-            for note_data in notes:
-                self.since_id: str = note_data["id"]
-
-                meta: dict = {
-                    "visibility": note_data["visibility"],
-                    "is_renote": True if note_data["renoteId"] is not None else False,
-                    "is_reply": True if note_data["replyId"] is not None else False,
-                    "has_cw": True if note_data["cw"] is not None else False,
-                    "has_mentions": True if "mentions" in note_data and len(note_data["mentions"]) > 0 else False,
-                    "has_zws": True if "\u200B" in note_data["text"].strip() else False,
-                }
-
-                if meta["has_mentions"] == False and re.search(mentions_pattern, note_data["text"].strip()) is not None:
-                    meta["has_mentions"] = True
-
-                self.processed_notes += 1
-                corpus.writerow([note_data["id"], note_data["text"], json.dumps(meta)])  # Intentionally leaving unstripped here
-
-                # Create Operation Tag
-                tag: dict = {
-                    "name": "DownloadNotes",
-                    "operation": "create",
-                    "show": self.show_tag
-                }
-
-                note: dict = {
-                    "text": note_data["text"].strip(),
-                    "meta": meta,
-                    "tag": tag
-                }
-
-                yield {
-                    "note": [note],  # The list is so versions can be tracked
-                }
\ No newline at end of file
+            if corpus_writer is not None:
+                corpus_writer.close()
@@ -3,6 +3,10 @@ import json
 import random
 import logging
 
+from collections.abc import Iterator
+
+from .aho_corasick import AhoCorasick
+
 class FilterNotes:
     # Required
     input: object = None
@@ -22,6 +26,7 @@ class FilterNotes:
     banned_cw: bool = True
     banned_mentions: bool = True
     banned_zws: bool = True
+    toss_matcher: AhoCorasick = None
     logger: logging.Logger = None
     LESSERDEBUG: int = 15
     VERBOSE: int = 5
@@ -44,6 +49,10 @@ class FilterNotes:
                 self.toss_text = json.loads(settings["toss_text"])
             else:
                 self.toss_text = settings["toss_text"]
+
+            # Toss words are matched within single words, so ones with whitespace can never match
+            toss_words: list = [toss_word.lower() for toss_word in self.toss_text]
+            self.toss_matcher: AhoCorasick = AhoCorasick(patterns=[toss_word for toss_word in toss_words if not any(character.isspace() for character in toss_word)])
             count += 1
 
         if "show_tag" in settings:
@@ -74,6 +83,9 @@ class FilterNotes:
             self.logger.error("Module not configured...")
             return
 
+        # A module can run more than once, such as for every request of the server
+        self.skipped: bool = False
+
         # Gives probability of executing module
         if self.chance_execute < random.random():
             self.logger.log(level=self.LESSERDEBUG, msg="Hit random chance of skipping filtering notes...")
@@ -88,49 +100,61 @@ class FilterNotes:
         if type(self.input) is str:
             return self._get_should_filter_note_text(text=self.input)
         
-        if type(self.input) is not list:
+        if type(self.input) is not list and not isinstance(self.input, Iterator):
             return
 
-        notes: list = []
-        for note_data in self.input:
-            if "note" not in note_data:
-                continue
+        notes: Iterator = self._get_processed_notes(notes=self.input)
 
-            note: dict = note_data["note"][-1]
+        # Streamed notes are handed on one at a time as they are requested
+        if type(self.input) is list:
+            return list(notes)
 
-            if "text" not in note:
-                continue
+        return notes
 
-            if "meta" not in note:
-                continue
+    def _get_processed_notes(self, notes: Iterator):
+        for note_data in notes:
+            note_data: dict = self._get_processed_note(note_data=note_data)
 
-            if not self.skipped:
-                if self._get_should_filter_note_meta(meta=note["meta"]):
-                    continue
+            if note_data is not None:
+                yield note_data
 
-                if self._get_should_filter_note_text(text=note["text"].strip()):
-                    continue
+    def _get_processed_note(self, note_data: dict):
+        if "note" not in note_data:
+            return
 
-            # Create Operation Tag
-            tag: dict = {
-                "name": "FilterNotes",
-                "operation": "filter",
-                "show": self.show_tag,
-                "skipped": self.skipped
-            }
+        note: dict = note_data["note"][-1]
 
-            # Add Note To List
-            note_data["note"].append({
-                "text": note["text"].strip(),
-                "meta": note["meta"],
-                "tag": tag
-            })
+        if "text" not in note:
+            return
 
-            notes.append({
-                "note": note_data["note"]
-            })
+        if "meta" not in note:
+            return
 
-        return notes
+        if not self.skipped:
+            if self._get_should_filter_note_meta(meta=note["meta"]):
+                return
+
+            if self._get_should_filter_note_text(text=note["text"].strip()):
+                return
+
+        # Create Operation Tag
+        tag: dict = {
+            "name": "FilterNotes",
+            "operation": "filter",
+            "show": self.show_tag,
+            "skipped": self.skipped
+        }
+
+        # Add Note To List
+        note_data["note"].append({
+            "text": note["text"].strip(),
+            "meta": note["meta"],
+            "tag": tag
+        })
+
+        return {
+            "note": note_data["note"]
+        }
 
     def _get_should_filter_note_meta(self, meta: dict):
         # Validate meta
@@ -176,10 +200,4 @@ class FilterNotes:
             text: str = ""
 
         # Check if toss word in text
-        for w in text.split():
-            for toss_word in self.toss_text:
-                if toss_word.lower() in w.lower():
-                    # self.logger.log(level=self.VERBOSE, msg=f"W: `{w}` - Toss Word: `{toss_word}`")
-                    return True
-
-        return False
\ No newline at end of file
+        return self.toss_matcher.search(text=text.lower())
\ No newline at end of file
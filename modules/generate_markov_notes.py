@@ -1,23 +1,34 @@
 import re
-# import json
+import copy
+import json
+import math
+import time
+import string
+import heapq
 import random
+import hashlib
 import logging
 
+from collections import deque
+from collections.abc import Iterator
+
 try:
     import markovify
 except ImportError:
     raise ImportError("Failed to import markovify, please run `pip3 install markovify`")
 
-try:
-    import nltk
-except ImportError:
-    raise ImportError("Failed to import nltk, please run `pip3 install nltk`")
-
 try:
     from nltk.sentiment import SentimentIntensityAnalyzer
 except ImportError:
     raise ImportError("Failed to import nltk.sentiment.SentimentIntensityAnalyzer, please run `pip3 install nltk`")
 
+from .note_history import NoteHistory
+from .parallel import get_module_executor, get_worker_result
+from .markov_chain import ArrayChain, BiasedChain, get_sentence_parser, get_sharded_text, get_split_corpus, set_merged_model, set_subtracted_model
+from .model_file import get_mapped_text, get_model_file_key, set_model_file_written
+from .model_cache import get_cached_model, get_model_cache, set_model_cache_appended, set_model_cache_written
+from .nltk_resources import get_sentiment_analyzer
+
 class GenerateMarkov:
     # Required
     input: object = None
@@ -33,6 +44,20 @@ class GenerateMarkov:
     sentiment_score_minimum: float = 1.0
     show_tag: bool = True
     state_size: int = 3
+    cache_model: bool = True
+    model_cache_path: str = "markov_model.cache"  # The rejoined text is kept next to it, in a .text file
+    incremental_training: bool = False
+    max_cache_updates: int = 32  # Updates appended to the cache before it is written again as a whole
+    max_attempts: int = 10000
+    max_seconds: float = 60.0
+    workers: int = 1
+    batch_size: int = 32
+    sentiment_bias: float = 0.0
+    training_workers: int = 1  # Processes counting the corpus when the model is built
+    training_shard_size: int = 5000000  # Characters of the corpus split and counted by a worker at a time
+    chain_backend: str = "markovify"  # markovify, array
+    model_file_path: str = None  # Optional flat model file which every process maps, always uses the array backend
+    allow_download: bool = True  # Otherwise a missing VADER lexicon fails straight away
     words: dict = {
         # Gay Speak
         'UwU': 0.2,
@@ -80,7 +105,10 @@ class GenerateMarkov:
     LESSERDEBUG: int = 15
     VERBOSE: int = 5
     model: markovify.Text = None
+    walk_model: markovify.Text = None
     sentiment_analyzer: SentimentIntensityAnalyzer = None
+    statistics: dict = None
+    executor: object = None  # Pool with a copy of the model in every worker, kept until the model changes
 
     def __init__(self):
         """
@@ -126,17 +154,54 @@ class GenerateMarkov:
         if "chance_execute" in settings:
             self.chance_execute = settings["chance_execute"]
 
-        # Download VADER lexicon for sentiment analysis
-        # VADER is designed for short, social media posts
-        try:
-            nltk.data.find(self.nltk_sentiment_lexicon_path)
-        except LookupError:
-            self.logger.log(level=self.LESSERDEBUG, msg=f"Failed to find {self.nltk_sentiment_lexicon}. Downloading for you...")
-            nltk.download(self.nltk_sentiment_lexicon)
+        if "cache_model" in settings:
+            self.cache_model = settings["cache_model"]
+
+        if "model_cache_path" in settings:
+            self.model_cache_path = settings["model_cache_path"]
+
+        if "incremental_training" in settings:
+            self.incremental_training = settings["incremental_training"]
+
+        if "max_cache_updates" in settings:
+            self.max_cache_updates = settings["max_cache_updates"]
+
+        if "max_attempts" in settings:
+            self.max_attempts = settings["max_attempts"]
+
+        if "max_seconds" in settings:
+            self.max_seconds = settings["max_seconds"]
+
+        if "workers" in settings:
+            self.workers = settings["workers"]
 
-        # Initialize Sentiment Analyzer
-        self.sentiment_analyzer: SentimentIntensityAnalyzer = SentimentIntensityAnalyzer()
-        self.sentiment_analyzer.lexicon.update(self.words)
+        if "batch_size" in settings:
+            self.batch_size = settings["batch_size"]
+
+        if "sentiment_bias" in settings:
+            self.sentiment_bias = settings["sentiment_bias"]
+
+        if "allow_download" in settings:
+            self.allow_download = settings["allow_download"]
+
+        if "training_workers" in settings:
+            self.training_workers = settings["training_workers"]
+
+        if "training_shard_size" in settings:
+            self.training_shard_size = settings["training_shard_size"]
+
+        if "chain_backend" in settings:
+            self.chain_backend = settings["chain_backend"]
+
+        if "model_file_path" in settings:
+            self.model_file_path = settings["model_file_path"]
+
+        if self.chain_backend not in ("markovify", "array"):
+            raise ValueError(f"Unknown chain backend `{self.chain_backend}`, use markovify or array")
+
+        # Initialize Sentiment Analyzer, the VADER lexicon is only loaded once per process
+        # VADER is designed for short, social media posts
+        self.sentiment_analyzer: SentimentIntensityAnalyzer = get_sentiment_analyzer(words=self.words, path=self.nltk_sentiment_lexicon_path, name=self.nltk_sentiment_lexicon, allow_download=self.allow_download)
 
     def set_input(self, input: object):
         """
@@ -155,16 +220,32 @@ class GenerateMarkov:
             self.logger.log(level=self.LESSERDEBUG, msg="Hit random chance of skipping generating notes...")
             return self.input  # This is a special case, if this was skipped the way other modules are, there would be no data left
 
+        self.set_model_built()
+
+        try:
+            return self.get_generated_notes(count=self.number_of_posts_to_generate)
+        finally:
+            self.set_closed()
+
+    def set_model_built(self):
+        """
+            Build the model from the input notes (or load it from the cache)
+        """
+
         self.logger.info("Markovifying notes...")
+
+        # The workers hold a copy of the previous model
+        self.set_closed()
         # self.logger.log(level=self.VERBOSE, msg=f"Input Notes Data: `{json.dumps(self.input)}`")
 
-        corpus: str = None
-        if type(self.input) is str:
-            corpus: str = self.input
-        
         # Turn list of notes into a single text corpus
+        # Notes which were just downloaded are kept apart so the model can be updated incrementally
         texts: list = []
-        if type(self.input) is list:
+        new_texts: list = []
+        if type(self.input) is str:
+            texts.append(self.input)
+
+        if type(self.input) is list or isinstance(self.input, Iterator):
             for note_data in self.input:
                 if "note" not in note_data:
                     continue
@@ -174,17 +255,42 @@ class GenerateMarkov:
                 if "text" not in note:
                     continue
 
-                texts.append(note["text"])
-        corpus: str = '\n'.join(texts)
+                if self._get_is_new_note(note_data=note_data):
+                    new_texts.append(note["text"])
+                else:
+                    texts.append(note["text"])
 
-        # Build the model from the corpus
-        self.model: markovify.Text = markovify.Text(
-            input_text=corpus, state_size=self.state_size,
-            well_formed=self.well_formed, reject_reg=self.rejection_pattern
-        )
+        corpus: str = '\n'.join(texts)
+        new_corpus: str = '\n'.join(new_texts)
+
+        # A model file written by a run on the same corpus is mapped instead of built
+        model_file_key: str = None
+        if self.model_file_path is not None:
+            model_file_key: str = self._get_model_file_key(corpus=corpus, new_corpus=new_corpus)
+            if get_model_file_key(file_path=self.model_file_path) == model_file_key:
+                self.logger.info("Markov model file hit...")
+                self.model: markovify.Text = self._get_mapped_model(key=model_file_key)
+                self.walk_model: markovify.Text = self.model
+                return
+
+        # Build the model from the corpus (or load it from the cache)
+        self.model: markovify.Text = self._get_model(corpus=corpus, new_corpus=new_corpus)
+        self.walk_model: markovify.Text = self._get_walk_model(model=self.model)
+
+        if self.model_file_path is not None:
+            set_model_file_written(file_path=self.model_file_path, chain=self.walk_model.chain, rejoined_text=self.model.rejoined_text, key=model_file_key)
+
+            # Walk the mapped file as well, so this process shares it with the others
+            self.model: markovify.Text = self._get_mapped_model(key=model_file_key)
+            self.walk_model: markovify.Text = self.model
+
+    def get_generated_notes(self, count: int):
+        """
+            Generate notes from the model which was already built
+        """
 
         notes: list = []
-        for count in range(self.number_of_posts_to_generate):
+        for text in self._get_markov_texts(count=count):
             # Create Operation Tag
             tag: dict = {
                 "name": "GenerateMarkov",
@@ -194,16 +300,231 @@ class GenerateMarkov:
             }
 
             note: dict = {
-                "text": self._get_markov_text().strip(),
+                "text": text.strip(),
                 "tag": tag
             }
 
             notes.append({
-                "note": [note]
+                "note": NoteHistory([note])
             })
 
         return notes
 
+    def set_closed(self):
+        """
+            Stop the process pool of this module, if it has one
+        """
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor: object = None
+
+    def _get_is_new_note(self, note_data: dict):
+        # DownloadNotes marks the notes it fetched during this run
+        tag: dict = note_data["note"][0].get("tag", {})
+
+        return "new" in tag and tag["new"] == True
+
+    def _get_model_keys(self, corpus: str, new_corpus: str):
+        # The pattern may be either compiled or a plain string
+        rejection_pattern: object = self.rejection_pattern
+        if isinstance(rejection_pattern, re.Pattern):
+            rejection_pattern: str = f"{rejection_pattern.pattern}/{rejection_pattern.flags}"
+
+        settings: str = json.dumps([self.state_size, self.well_formed, rejection_pattern])
+
+        key = hashlib.sha256(settings.encode(encoding="utf-8"))
+        key.update(corpus.encode(encoding="utf-8", errors="surrogatepass"))
+        base_key: str = key.hexdigest()
+
+        # Key of the whole corpus, as if it was joined in one go
+        if len(new_corpus) > 0:
+            if len(corpus) > 0:
+                key.update(b"\n")
+
+            key.update(new_corpus.encode(encoding="utf-8", errors="surrogatepass"))
+
+        return base_key, key.hexdigest()
+
+    def _get_model_file_key(self, corpus: str, new_corpus: str):
+        # The sentiment weights are counted into the file, so they are part of its key
+        _, key = self._get_model_keys(corpus=corpus, new_corpus=new_corpus)
+        weights: str = json.dumps([self.sentiment_bias, sorted(self.words.items())] if self.sentiment_bias != 0 else [0])
+
+        return hashlib.sha256(f"{key}/{weights}".encode(encoding="utf-8")).hexdigest()
+
+    def _get_mapped_model(self, key: str):
+        return get_mapped_text(file_path=self.model_file_path, key=key, well_formed=self.well_formed, reject_reg=self.rejection_pattern)
+
+    def _get_built_model(self, corpus: str):
+        # Large corpora are counted in shards by a process pool, the model is the same either way
+        return get_sharded_text(
+            corpus=corpus, state_size=self.state_size,
+            well_formed=self.well_formed, reject_reg=self.rejection_pattern,
+            workers=self.training_workers, shard_size=self.training_shard_size,
+            retain_original=False  # Only the rejoined text is needed, even by the cache
+        )
+
+    def _get_cache(self):
+        # Only the record headers are read, the counts are loaded once the key matches
+        try:
+            return get_model_cache(file_path=self.model_cache_path)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Failed to read Markov model cache `{self.model_cache_path}`: {e}")
+
+        return {}
+
+    def _get_cached_model(self, cache: dict):
+        try:
+            return get_cached_model(file_path=self.model_cache_path, cache=cache)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Failed to read Markov model cache `{self.model_cache_path}`: {e}")
+
+        return None
+
+    def _set_cached_model(self, key: str, chain_model: dict, rejoined_text: str, tail: str):
+        set_model_cache_written(file_path=self.model_cache_path, chain_model=chain_model, rejoined_text=rejoined_text, state_size=self.state_size, key=key, tail=tail)
+
+    def _get_counted_sentences(self, text: str, last: bool):
+        # Only the given sentences are parsed and counted, without the last one unless nothing comes after it
+        parser: markovify.Text = get_sentence_parser(state_size=self.state_size, well_formed=self.well_formed, reject_reg=self.rejection_pattern)
+        sentences: list = parser.sentence_split(text)
+
+        tail: str = ""
+        if not last and len(sentences) > 0:
+            tail: str = sentences.pop()
+
+        runs: list = [parser.word_split(sentence) for sentence in sentences if parser.test_sentence_input(sentence)]
+        partial_model: dict = parser.chain.build(runs, self.state_size) if len(runs) > 0 else {}
+
+        return partial_model, parser.sentence_join(map(parser.word_join, runs)), tail
+
+    def _get_text_model(self, chain_model: dict, rejoined_text: str):
+        chain: markovify.Chain = markovify.Chain(corpus=None, state_size=self.state_size, model=chain_model)
+        model: markovify.Text = markovify.Text(
+            input_text=None, state_size=self.state_size, chain=chain,
+            retain_original=False, well_formed=self.well_formed, reject_reg=self.rejection_pattern
+        )
+
+        # Generated sentences are still checked for overlap with the corpus
+        model.rejoined_text = rejoined_text
+
+        return model
+
+    def _get_model(self, corpus: str, new_corpus: str = ""):
+        full_corpus: str = corpus
+        if len(new_corpus) > 0:
+            full_corpus: str = '\n'.join(filter(None, [corpus, new_corpus]))
+
+        if not self.cache_model:
+            return self._get_built_model(corpus=full_corpus)
+
+        base_key, key = self._get_model_keys(corpus=corpus, new_corpus=new_corpus)
+        cache: dict = self._get_cache()
+
+        cached_model: tuple = None
+        if cache is None:
+            status: str = "miss"
+        elif cache.get("key") == key:
+            status: str = "hit"
+            cached_model: tuple = self._get_cached_model(cache=cache)
+        elif self.incremental_training and len(new_corpus) > 0 and cache.get("key") == base_key:
+            status: str = "update"
+            cached_model: tuple = self._get_cached_model(cache=cache)
+        else:
+            status: str = "rebuild"
+
+        # A cache which can't be loaded is built again
+        if status in ("hit", "update") and cached_model is None:
+            status: str = "rebuild"
+
+        self.logger.info(f"Markov model cache {status}...")
+
+        # The cache leaves out the last sentence of the corpus, the next notes may go on with it
+        if status == "hit":
+            chain_model, rejoined_text = cached_model
+            tail: str = cache["tail"]
+        elif status == "update":
+            chain_model, rejoined_text = cached_model
+
+            # So it is split again along with the new notes, only they are parsed and counted
+            partial_model, new_rejoined_text, tail = self._get_counted_sentences(text='\n'.join([cache["tail"], new_corpus]), last=False)
+            set_merged_model(model=chain_model, partial_model=partial_model)
+            rejoined_text: str = ' '.join(filter(None, [rejoined_text, new_rejoined_text]))
+
+            # Only the new counts and text are appended, until there are enough updates to be worth merging
+            if len(cache["records"]) <= self.max_cache_updates:
+                set_model_cache_appended(file_path=self.model_cache_path, cache=cache, chain_model=partial_model, rejoined_text=new_rejoined_text, key=key, tail=tail)
+            else:
+                self._set_cached_model(key=key, chain_model=chain_model, rejoined_text=rejoined_text, tail=tail)
+        else:
+            model: markovify.Text = self._get_built_model(corpus=full_corpus)
+
+            # The last sentence was counted last, so taking it back out leaves the model of the rest
+            _, tail = get_split_corpus(corpus=full_corpus)
+            tail_model, tail_rejoined_text, _ = self._get_counted_sentences(text=tail, last=True)
+            set_subtracted_model(model=model.chain.model, partial_model=tail_model)
+            rejoined_text: str = model.rejoined_text[:len(model.rejoined_text) - len(tail_rejoined_text)].rstrip(' ')
+
+            self._set_cached_model(key=key, chain_model=model.chain.model, rejoined_text=rejoined_text, tail=tail)
+            set_merged_model(model=model.chain.model, partial_model=tail_model)
+
+            return model
+
+        # The last sentence is only counted in memory
+        tail_model, tail_rejoined_text, _ = self._get_counted_sentences(text=tail, last=True)
+        set_merged_model(model=chain_model, partial_model=tail_model)
+
+        # markovify can't walk a corpus without a sentence, the build fails the way it would uncached
+        if len(chain_model) == 0:
+            return self._get_built_model(corpus=full_corpus)
+
+        return self._get_text_model(chain_model=chain_model, rejoined_text=' '.join(filter(None, [rejoined_text, tail_rejoined_text])))
+
+    def _get_word_valence(self, word: str):
+        # VADER looks words up in lowercase, our own words may not be
+        lexicon: dict = self.sentiment_analyzer.lexicon
+        for candidate in (word, word.lower(), word.strip(string.punctuation).lower()):
+            if candidate in lexicon:
+                return lexicon[candidate]
+
+        return 0.0
+
+    def _get_word_weights(self, chain: markovify.Chain):
+        words: set = set()
+        for follows in chain.model.values():
+            words.update(follows.keys())
+
+        # Only words with a sentiment need a weight
+        weights: dict = {}
+        for word in words:
+            valence: float = self._get_word_valence(word=word)
+            if valence != 0:
+                weights[word] = math.exp(self.sentiment_bias * valence)
+
+        return weights
+
+    def _get_walk_model(self, model: markovify.Text):
+        if self.chain_backend == "array" or self.model_file_path is not None:
+            # The model is already cached by now, so the dict chain is swapped for the arrays to free it
+            word_weights: dict = self._get_word_weights(chain=model.chain) if self.sentiment_bias != 0 else {}
+            model.chain = ArrayChain(chain=model.chain, word_weights=word_weights)
+
+            self.logger.log(level=self.LESSERDEBUG, msg=f"Packed {model.chain.keys.shape[1]} states into {model.chain.get_memory_size() / 1048576:.1f} MiB of arrays, weighting {len(word_weights)} words with a sentiment bias of {self.sentiment_bias}...")
+
+            return model
+
+        if self.sentiment_bias == 0:
+            return model
+
+        # Tilt the walk towards positive words instead of throwing away negative sentences
+        walk_model: markovify.Text = copy.copy(model)
+        walk_model.chain = BiasedChain(chain=model.chain, word_weights=self._get_word_weights(chain=model.chain))
+
+        self.logger.log(level=self.LESSERDEBUG, msg=f"Weighted {len(walk_model.chain.word_weights)} words with a sentiment bias of {self.sentiment_bias}...")
+
+        return walk_model
+
     def _get_sentiment(self, text: str):
         # Validate text
         if text is None:
@@ -216,16 +537,109 @@ class GenerateMarkov:
 
         return positive, negative
 
-    def _get_markov_text(self):
-        while True:
-            text: str = self.model.make_short_sentence(max_chars=self.max_characters)
+    def _get_markov_candidates(self, seed: int, attempts: int, deadline: float):
+        # Seeded per batch so the candidates don't depend on which process made them
+        state: tuple = random.getstate()
+        random.seed(seed)
+
+        candidates: list = []
+        for attempt in range(attempts):
+            if time.time() > deadline:
+                break
+
+            text: str = self.walk_model.make_short_sentence(max_chars=self.max_characters)
+
+            # The chain could not make a sentence this time
+            if text is None:
+                candidates.append((None, 0.0, 0.0))
+                continue
 
-            # We want to keep the notes more positive
             positive_score, negative_score = self._get_sentiment(text=text)
-            self.logger.log(level=self.VERBOSE, msg=f"Positive: {positive_score} - Negative: {negative_score} - Note: `{text}`")
+            candidates.append((text, positive_score, negative_score))
 
-            # Check the sentiment score
-            if positive_score >= self.sentiment_score_minimum:
-                break
+        random.setstate(state)
 
-        return text
\ No newline at end of file
+        return candidates
+
+    def _get_markov_texts(self, count: int):
+        start: float = time.time()
+        deadline: float = start + self.max_seconds
+
+        attempts: int = 0
+        requested_attempts: int = 0
+        accepted: list = []
+        rejected: list = []  # Heap of the best rejected candidates
+
+        # The pool is started once and reused by every later call, such as every request of the server
+        executor: object = None
+        pending: deque = deque()
+        if self.workers > 1:
+            if self.executor is None:
+                self.executor: object = get_module_executor(module=self, workers=self.workers)
+
+            executor: object = self.executor
+
+        try:
+            while len(accepted) < count and attempts < self.max_attempts and time.time() < deadline:
+                # Keep every worker busy, results are still read in the order they were requested
+                while requested_attempts < self.max_attempts and len(pending) < max(self.workers, 1):
+                    batch_size: int = min(self.batch_size, self.max_attempts - requested_attempts)
+                    seed: int = random.getrandbits(64)
+                    requested_attempts += batch_size
+
+                    if executor is None:
+                        pending.append(self._get_markov_candidates(seed=seed, attempts=batch_size, deadline=deadline))
+                    else:
+                        pending.append(executor.submit(get_worker_result, "_get_markov_candidates", seed, batch_size, deadline))
+
+                if len(pending) == 0:
+                    break
+
+                candidates: object = pending.popleft()
+                if executor is not None:
+                    candidates: list = candidates.result()
+
+                for text, positive_score, negative_score in candidates:
+                    attempts += 1
+                    if text is None:
+                        continue
+
+                    # We want to keep the notes more positive
+                    self.logger.log(level=self.VERBOSE, msg=f"Positive: {positive_score} - Negative: {negative_score} - Note: `{text}`")
+
+                    # Check the sentiment score
+                    if positive_score >= self.sentiment_score_minimum:
+                        accepted.append(text)
+                    else:
+                        heapq.heappush(rejected, (positive_score, attempts, text))
+                        if len(rejected) > count:
+                            heapq.heappop(rejected)
+
+                    if len(accepted) >= count:
+                        break
+        finally:
+            # Batches which weren't needed don't hold up the next call
+            if executor is not None:
+                for future in pending:
+                    future.cancel()
+
+        seconds: float = time.time() - start
+        self.statistics: dict = {
+            "attempts": attempts,
+            "accepted": len(accepted),
+            "acceptance_rate": len(accepted) / attempts if attempts > 0 else 0.0,
+            "seconds": seconds,
+            "sentiment_bias": self.sentiment_bias
+        }
+
+        self.logger.info(f"Accepted {len(accepted)} of {attempts} generated notes ({self.statistics['acceptance_rate']:.2%}) in {seconds:.2f} seconds...")
+
+        # Fall back on the most positive notes found when the budget runs out
+        texts: list = accepted[:count]
+        if len(texts) < count:
+            best: list = [text for positive_score, attempt, text in sorted(rejected, reverse=True)]
+            texts += best[:count - len(texts)]
+
+            self.logger.warning(f"Only {len(accepted)} notes passed the sentiment check, using the {len(texts) - len(accepted)} most positive of the rest...")
+
+        return texts
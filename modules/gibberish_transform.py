@@ -1,11 +1,17 @@
+import os
 import re
+import json
+import time
 import random
 import logging
 
-try:
-    import nltk
-except ImportError:
-    raise ImportError("Failed to import nltk, please run `pip3 install nltk`")
+from collections.abc import Iterator
+
+from .parallel import get_module_executor, get_processed_texts
+from .lru_cache import LRUCache
+from .note_history import NoteHistory
+from .tokens import get_tokenized_sentences
+from .nltk_resources import set_punkt_loaded
 
 try:
     import hyphenate
@@ -20,12 +26,24 @@ class GibberishText:
     chance_execute: float = 1.0
     show_tag: bool = True
     hard_skip: bool = False
+    allow_download: bool = True  # Otherwise missing NLTK data fails straight away
+    workers: int = 1
+    batch_size: int = 1024
     tokenizer_language: str = "english"
     word_pattern: re.Pattern = re.compile(pattern=r'^[a-zñáéíóúü]+$', flags=re.IGNORECASE|re.MULTILINE)
     vowels: list = ["a", "e", "i", "o", "u"]
+    cache_size: int = 100000  # Words kept in each cache, 0 turns caching off
+    cache_path: str = None  # Optional JSON snapshot of the caches, reloaded on the next run
+    cache_save_seconds: float = 60  # Least time between snapshots, a server saves the last one when it is closed
 
     # Non-Configurable
     skipped: bool = False
+    text_only: bool = True
+    syllables_cache: LRUCache = None
+    gibberish_cache: LRUCache = None
+    statistics: dict = None
+    cache_saved_time: float = 0.0
+    executor: object = None  # Pool with a copy of this module and its caches in every worker
     nltk_tokenizer_lexicon: str = "punkt"
     nltk_tokenizer_lexicon_path: str = "tokenizers/punkt"
     logger: logging.Logger = None
@@ -39,6 +57,10 @@ class GibberishText:
 
         self.logger: logging.Logger = logging.getLogger(type(self).__name__)
 
+        self.syllables_cache: LRUCache = LRUCache(capacity=self.cache_size)
+        self.gibberish_cache: LRUCache = LRUCache(capacity=self.cache_size)
+        self.statistics: dict = {}
+
     def set_settings(self, settings: dict):
         """
             Configure the settings for this module
@@ -62,13 +84,32 @@ class GibberishText:
         if "hard_skip" in settings:
             self.hard_skip = settings["hard_skip"]
 
-        # Download PUNKT lexicon for rebuilding sentences
+        if "allow_download" in settings:
+            self.allow_download = settings["allow_download"]
+
+        if "workers" in settings:
+            self.workers = settings["workers"]
+
+        if "batch_size" in settings:
+            self.batch_size = settings["batch_size"]
+
+        if "cache_size" in settings:
+            self.cache_size = settings["cache_size"]
+            self.syllables_cache: LRUCache = LRUCache(capacity=self.cache_size)
+            self.gibberish_cache: LRUCache = LRUCache(capacity=self.cache_size)
+
+        if "cache_path" in settings:
+            self.cache_path = settings["cache_path"]
+
+        if "cache_save_seconds" in settings:
+            self.cache_save_seconds = settings["cache_save_seconds"]
+
+        if self.cache_path is not None:
+            self._set_cache_loaded()
+
+        # Load PUNKT lexicon for rebuilding sentences, once per process
         # PUNKT is designed for tokenizing words
-        try:
-            nltk.data.find(self.nltk_tokenizer_lexicon_path)
-        except LookupError:
-            self.logger.log(level=self.LESSERDEBUG, msg=f"Failed to find {self.nltk_tokenizer_lexicon}. Downloading for you...")
-            nltk.download(self.nltk_tokenizer_lexicon)
+        set_punkt_loaded(language=self.tokenizer_language, path=self.nltk_tokenizer_lexicon_path, name=self.nltk_tokenizer_lexicon, allow_download=self.allow_download)
 
     def set_input(self, input: object):
         """
@@ -77,65 +118,167 @@ class GibberishText:
         
         self.input: object = input
 
-    def run(self):
+    def set_skipped(self):
         """
-            Execute this module as part of a chain of modules
+            Roll the chance of executing this module, True means it is left out entirely
         """
 
+        # A module can run more than once, such as for every request of the server
+        self.skipped: bool = False
+
         # Gives probability of executing module
         if self.chance_execute < random.random():
             self.logger.log(level=self.LESSERDEBUG, msg="Hit random chance of skipping gibberishifying notes...")
 
             if self.hard_skip:
-                return self.input
+                return True
 
             self.skipped: bool = True
         else:
             self.logger.info("Gibberishifying notes...")
 
+        return False
+
+    def run(self):
+        """
+            Execute this module as part of a chain of modules
+        """
+
+        if self.set_skipped():
+            return self.input
+
         if type(self.input) is str:
             return self._get_gibberishified_text(text=self.input)
         
-        if type(self.input) is not list:
+        if type(self.input) is not list and not isinstance(self.input, Iterator):
             return
 
-        notes: list = []
-        for note_data in self.input:
-            if "note" not in note_data:
-                continue
+        notes: Iterator = self._get_processed_notes(notes=self.input)
 
-            note: dict = note_data["note"][-1].copy()
+        # Streamed notes are handed on one at a time as they are requested
+        if type(self.input) is list:
+            return list(notes)
 
-            if "text" not in note:
-                continue
+        return notes
 
-            # Create Operation Tag
-            tag: dict = {
-                "name": "GibberishText",
-                "operation": "modify",
-                "show": self.show_tag,
-                "skipped": self.skipped
-            }
+    def _get_processed_notes(self, notes: Iterator):
+        # With more than one worker the texts are modified in batches by this module's own pool
+        # The caches are sent to every worker once when the pool starts and then grow there, so the
+        # statistics and the snapshot only cover the words gibberishified in this process
+        if self.workers > 1 and self.executor is None:
+            self.executor: object = get_module_executor(module=self, workers=self.workers)
 
-            text: str = note["text"]
-            if not self.skipped:
-                text: str = self._get_gibberishified_text(text=note["text"])
+        for note_data, modified_text in get_processed_texts(module=self, method_name="_get_gibberishified_text", notes=notes, workers=self.workers, batch_size=self.batch_size, executor=self.executor):
+            note_data: dict = self._get_processed_note(note_data=note_data, modified_text=modified_text)
 
-            # If modification did not take effect, then remove tag
-            if self.show_tag and note["text"] == text:
-                tag["show"] = False
+            if note_data is not None:
+                yield note_data
 
-            note["text"] = text.strip()
-            note["tag"] = tag
+        self.set_finished()
 
-            # Add Note To List
-            note_data["note"].append(note)
+    def set_finished(self):
+        """
+            Report the cache statistics and save the caches once every note is processed
 
-            notes.append({
-                "note": note_data["note"]
-            })
+            Runs which follow each other quickly, such as the requests of a server, only save now and then
+        """
 
-        return notes
+        self.statistics: dict = {
+            "syllables": self.syllables_cache.get_statistics(),
+            "gibberish": self.gibberish_cache.get_statistics(),
+            "tokens": NoteHistory.get_token_statistics()
+        }
+
+        self.logger.log(level=self.LESSERDEBUG, msg=f"Gibberish cache hit rate {self.statistics['gibberish']['hit_rate']:.1%}, syllables cache hit rate {self.statistics['syllables']['hit_rate']:.1%}, token cache hit rate {self.statistics['tokens']['hit_rate']:.1%}")
+
+        if self.cache_path is not None and time.time() - self.cache_saved_time >= self.cache_save_seconds:
+            self._set_cache_saved()
+
+    def set_closed(self):
+        """
+            Stop the process pool and save the caches one last time, as the latest runs may not have
+        """
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor: object = None
+
+        if self.cache_path is not None:
+            self._set_cache_saved()
+
+    def _set_cache_loaded(self):
+        if not os.path.exists(self.cache_path):
+            return
+
+        try:
+            with open(file=self.cache_path, mode="r") as f:
+                cache: dict = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Failed to read gibberish cache `{self.cache_path}`: {e}")
+            return
+
+        # Syllables don't depend on the settings, the gibberish words only hold for the same vowels
+        for word, syllables in cache.get("syllables", {}).items():
+            self.syllables_cache.set(key=word, value=syllables)
+
+        if cache.get("vowels") == list(self.vowels):
+            for word, gibberish in cache.get("gibberish", {}).items():
+                self.gibberish_cache.set(key=word, value=gibberish)
+
+        self.logger.log(level=self.LESSERDEBUG, msg=f"Loaded {len(self.syllables_cache)} syllables and {len(self.gibberish_cache)} gibberish words from `{self.cache_path}`")
+
+    def _set_cache_saved(self):
+        cache: dict = {
+            "vowels": list(self.vowels),
+            "syllables": dict(self.syllables_cache.entries),
+            "gibberish": dict(self.gibberish_cache.entries)
+        }
+
+        # Write to a temporary file first so an interrupted run can't leave a corrupt cache
+        temporary_path: str = f"{self.cache_path}.tmp"
+        with open(file=temporary_path, mode="w") as f:
+            json.dump(cache, f)
+
+        os.replace(temporary_path, self.cache_path)
+
+        self.cache_saved_time: float = time.time()
+
+    def _get_processed_note(self, note_data: dict, modified_text: str = None):
+        if "note" not in note_data:
+            return
+
+        note: dict = note_data["note"][-1].copy()
+
+        if "text" not in note:
+            return
+
+        # Create Operation Tag
+        tag: dict = {
+            "name": "GibberishText",
+            "operation": "modify",
+            "show": self.show_tag,
+            "skipped": self.skipped
+        }
+
+        text: str = note["text"]
+        if not self.skipped and modified_text is not None:
+            text: str = modified_text
+        elif not self.skipped:
+            text: str = self._get_gibberishified_text(text=note["text"], history=note_data["note"])
+
+        # If modification did not take effect, then remove tag
+        if self.show_tag and note["text"] == text:
+            tag["show"] = False
+
+        note["text"] = text.strip()
+        note["tag"] = tag
+
+        # Add Note To List
+        note_data["note"].append(note)
+
+        return {
+            "note": note_data["note"]
+        }
 
     def _get_gibberishified_word_from_syllables(self, syllables: list):
         if len(syllables) == 0:
@@ -158,23 +301,37 @@ class GibberishText:
 
         return word
 
-    def _get_gibberishified_text(self, text: str):
+    def _get_gibberishified_word(self, word: str):
+        # Natural text repeats the same words a lot, so most words are only looked up
+        gibberish: str = self.gibberish_cache.get(key=word)
+        if gibberish is not None:
+            return gibberish
+
+        syllables: list = self.syllables_cache.get(key=word)
+        if syllables is None:
+            syllables: list = hyphenate.hyphenate_word(word=word)
+            self.syllables_cache.set(key=word, value=syllables)
+
+        gibberish: str = self._get_gibberishified_word_from_syllables(syllables=syllables)
+        self.gibberish_cache.set(key=word, value=gibberish)
+
+        return gibberish
+
+    def _get_gibberishified_text(self, text: str, history: object = None):
         # Validate text
         if text is None:
             text: str = ""
 
         sentences: list[str] = []
-        for sentence in nltk.sent_tokenize(text=text, language=self.tokenizer_language):
+        for words in get_tokenized_sentences(text=text, language=self.tokenizer_language, history=history):
             # Breaks on `I'm` or `Cute!`
-            words: list[str] = nltk.word_tokenize(text=sentence, language=self.tokenizer_language)
             # words: list[str] = sentence.split()
+            words: list[str] = list(words)  # The tokens are shared with the note's cache
 
             word_pos: int = 0
             for word in words:
                 if self.word_pattern.match(string=word):
-                    syllables: list = hyphenate.hyphenate_word(word=word)
-
-                    word: str = self._get_gibberishified_word_from_syllables(syllables=syllables)
+                    word: str = self._get_gibberishified_word(word=word)
                 elif any(c.isalpha() for c in word):
                     # When a word contains both letters and something else
                     self.logger.log(level=self.LESSERDEBUG, msg=f"The word, `{word}`, contains characters which can't be processed right now. Skipping gibberishifying this text...")
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+class LRUCache:
+    """
+        Dictionary holding at most `capacity` entries, the least recently used entry is dropped first
+
+        Hits and misses are counted so callers can report how well the cache works
+    """
+
+    # Default
+    capacity: int = 100000  # 0 turns the cache off
+
+    # Non-Configurable
+    entries: OrderedDict = None
+    hits: int = 0
+    misses: int = 0
+
+    def __init__(self, capacity: int = 100000):
+        """
+            Initialize an empty cache
+        """
+
+        self.capacity: int = capacity
+        self.entries: OrderedDict = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: object):
+        """
+            Get the value of a key, None when it isn't cached
+        """
+
+        value: object = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+
+        return value
+
+    def set(self, key: object, value: object):
+        """
+            Cache the value of a key, dropping the oldest entry when full
+        """
+
+        if self.capacity <= 0:
+            return
+
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def get_statistics(self):
+        """
+            Get the number of entries, hits and misses and the hit rate
+        """
+
+        lookups: int = self.hits + self.misses
+
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0.0
+        }
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,456 @@
+import re
+import bisect
+import random
+import itertools
+
+try:
+    import markovify
+except ImportError:
+    raise ImportError("Failed to import markovify, please run `pip3 install markovify`")
+
+try:
+    import numpy
+except ImportError:
+    # Only needed by the `array` chain backend
+    numpy = None
+
+from .parallel import get_executor
+
+# The bits of a state key kept in each of its columns
+KEY_COLUMN_MASK: int = (1 << 64) - 1
+
+# The end of a word followed by whitespace, where the corpus is cut into pieces
+CUT_PATTERN: re.Pattern = re.compile(pattern=r"\S\s")
+
+class BiasedChain:
+    """
+        Walks a markovify chain with every next word's count scaled by a weight
+
+        Words without a weight keep their count, so a chain with no weights walks
+        exactly like the markovify chain it wraps
+    """
+
+    # Non-Configurable
+    chain: markovify.Chain = None
+    state_size: int = None
+    word_weights: dict = None
+    cumulative_weights: dict = None
+
+    def __init__(self, chain: markovify.Chain, word_weights: dict):
+        """
+            Initialize the chain
+        """
+
+        self.chain: markovify.Chain = chain
+        self.state_size: int = chain.state_size
+        self.word_weights: dict = word_weights
+        self.cumulative_weights: dict = {}  # Filled in as states are visited
+
+    def _get_choices(self, state: tuple):
+        if state not in self.cumulative_weights:
+            choices, counts = zip(*self.chain.model[state].items())
+            weights: list = [count * self.word_weights.get(choice, 1.0) for choice, count in zip(choices, counts)]
+
+            self.cumulative_weights[state] = (choices, list(itertools.accumulate(weights)))
+
+        return self.cumulative_weights[state]
+
+    def move(self, state: tuple):
+        """
+            Choose the next word at random, leaning towards weighted words
+        """
+
+        choices, cumulative_weights = self._get_choices(state=state)
+
+        r: float = random.random() * cumulative_weights[-1]
+        return choices[bisect.bisect(cumulative_weights, r)]
+
+    def gen(self, init_state: tuple = None):
+        """
+            Generate words until the chain reaches the end of a sentence
+        """
+
+        state: tuple = init_state or (markovify.chain.BEGIN,) * self.state_size
+        while True:
+            next_word: str = self.move(state=state)
+            if next_word == markovify.chain.END:
+                break
+
+            yield next_word
+            state: tuple = tuple(state[1:]) + (next_word,)
+
+    def walk(self, init_state: tuple = None):
+        """
+            Get the words of a single sentence
+        """
+
+        return list(self.gen(init_state=init_state))
+
+class ArrayChain:
+    """
+        Read-only copy of a markovify chain kept in a few NumPy arrays instead of nested dicts
+
+        Every word is given an integer ID and a state is packed into an unsigned 64-bit key, or
+        into several columns of them compared one after the other when the state doesn't fit in
+        one. The keys are sorted and looked up with a binary search, and the next words of
+        each state are stored back to back with their cumulative counts. The next words keep
+        markovify's order and are picked with the same `random.random()` draw and right
+        bisection, so a seeded walk gives the same sentences as the chain it was made from
+
+        With word weights, every next word's count is scaled like `BiasedChain` does
+    """
+
+    # Non-Configurable
+    state_size: int = None
+    words: list = None
+    word_ids: dict = None
+    bits: int = None
+    key_columns: int = None
+    mask: int = None
+    begin_key: int = None
+    end_id: int = None
+    keys: object = None  # Sorted state keys, one row per column with the highest bits first
+    offsets: object = None  # Where the next words of each state start
+    next_words: object = None  # Next word IDs of every state, back to back
+    cumulative_weights: object = None  # Cumulative counts of the next words of each state
+    word_weights: dict = None
+    views: tuple = None  # Memoryviews of the arrays, reading them gives plain Python numbers
+
+    def __init__(self, chain: markovify.Chain, word_weights: dict = None):
+        """
+            Convert a markovify chain, which can then be thrown away
+        """
+
+        if numpy is None:
+            raise ImportError("Failed to import numpy, please run `pip3 install numpy`")
+
+        if chain.compiled:
+            raise ValueError("Compiled markovify chains can't be converted, use the chain before compiling it")
+
+        self.state_size: int = chain.state_size
+        self.word_weights: dict = word_weights or {}
+
+        # Intern every word, the ends of a sentence come first
+        self.words: list = [markovify.chain.BEGIN, markovify.chain.END]
+        self.word_ids: dict = {markovify.chain.BEGIN: 0, markovify.chain.END: 1}
+        for state, follows in chain.model.items():
+            for word in itertools.chain(state, follows):
+                if word not in self.word_ids:
+                    self.word_ids[word] = len(self.words)
+                    self.words.append(word)
+
+        self.bits: int = max((len(self.words) - 1).bit_length(), 1)
+        self.key_columns: int = -(-self.bits * self.state_size // 64)
+
+        self.mask: int = (1 << (self.bits * self.state_size)) - 1
+        self.begin_key: int = self._get_key(state=(markovify.chain.BEGIN,) * self.state_size)
+        self.end_id: int = self.word_ids[markovify.chain.END]
+
+        # States sorted by key, so a state is found with a binary search
+        states: list = sorted(((self._get_key(state=state), follows) for state, follows in chain.model.items()), key=lambda item: item[0])
+        lengths: list = [len(follows) for _, follows in states]
+
+        self.keys = numpy.zeros((self.key_columns, len(states)), dtype=numpy.uint64)
+        for column in range(self.key_columns):
+            shift: int = 64 * (self.key_columns - 1 - column)
+            self.keys[column] = numpy.fromiter(((key >> shift) & KEY_COLUMN_MASK for key, _ in states), dtype=numpy.uint64, count=len(states))
+        self.offsets = numpy.zeros(len(states) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=self.offsets[1:])
+
+        word_ids: dict = self.word_ids
+        self.next_words = numpy.fromiter((word_ids[word] for _, follows in states for word in follows), dtype=numpy.uint32, count=int(self.offsets[-1]))
+
+        # Accumulated one state at a time in Python, so the sums match markovify's exactly
+        self.cumulative_weights = numpy.fromiter(
+            itertools.chain.from_iterable(itertools.accumulate(self._get_weights(follows=follows)) for _, follows in states),
+            dtype=numpy.float64, count=int(self.offsets[-1])
+        )
+
+        self._set_views()
+
+    def __getstate__(self):
+        # Memoryviews can't be pickled, workers make their own
+        state: dict = self.__dict__.copy()
+        state["views"] = None
+
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._set_views()
+
+    def _set_views(self):
+        # Indexing an array gives NumPy scalars, which are a lot slower to work with one at a time
+        self.views: tuple = (tuple(memoryview(column) for column in self.keys), memoryview(self.offsets), memoryview(self.next_words), memoryview(self.cumulative_weights))
+
+    def _get_weights(self, follows: dict):
+        if len(self.word_weights) == 0:
+            return follows.values()
+
+        return [count * self.word_weights.get(word, 1.0) for word, count in follows.items()]
+
+    def _get_key(self, state: tuple):
+        key: int = 0
+        for word in state:
+            key: int = (key << self.bits) | self.word_ids[word]
+
+        return key
+
+    def _get_row(self, columns: tuple, key: int):
+        # Narrow down the rows one column at a time, each column is sorted within the rows left
+        start: int = 0
+        end: int = len(columns[0])
+        for index, column in enumerate(columns):
+            part: int = (key >> (64 * (len(columns) - 1 - index))) & KEY_COLUMN_MASK
+            start: int = bisect.bisect_left(column, part, start, end)
+            end: int = bisect.bisect_right(column, part, start, end)
+
+        if start == end:
+            raise KeyError(key)
+
+        return start
+
+    def _get_next_id(self, key: int):
+        columns, offsets, next_words, cumulative_weights = self.views
+
+        # Most chains fit in a single column, which is only searched once
+        if len(columns) == 1:
+            keys: memoryview = columns[0]
+            row: int = bisect.bisect_left(keys, key)
+            if row == len(keys) or keys[row] != key:
+                raise KeyError(key)
+        else:
+            row: int = self._get_row(columns=columns, key=key)
+
+        start: int = offsets[row]
+        end: int = offsets[row + 1]
+
+        r: float = random.random() * cumulative_weights[end - 1]
+        return next_words[bisect.bisect(cumulative_weights, r, start, end)]
+
+    def move(self, state: tuple):
+        """
+            Choose the next word at random
+        """
+
+        return self.words[self._get_next_id(key=self._get_key(state=state))]
+
+    def gen(self, init_state: tuple = None):
+        """
+            Generate words until the chain reaches the end of a sentence
+        """
+
+        key: int = self.begin_key if init_state is None else self._get_key(state=init_state)
+        while True:
+            next_id: int = self._get_next_id(key=key)
+            if next_id == self.end_id:
+                break
+
+            yield self.words[next_id]
+            key: int = ((key << self.bits) | next_id) & self.mask
+
+    def walk(self, init_state: tuple = None):
+        """
+            Get the words of a single sentence
+        """
+
+        return list(self.gen(init_state=init_state))
+
+    def get_memory_size(self):
+        """
+            Get the bytes used by the arrays
+        """
+
+        return self.keys.nbytes + self.offsets.nbytes + self.next_words.nbytes + self.cumulative_weights.nbytes
+
+def get_sentence_parser(state_size: int, well_formed: bool, reject_reg: object):
+    """
+        Get a markovify Text with a throwaway chain, only used for its sentence checks and word splitting
+    """
+
+    return markovify.Text(
+        input_text=None, state_size=state_size, chain=markovify.Chain(corpus=[[""]], state_size=state_size),
+        retain_original=False, well_formed=well_formed, reject_reg=reject_reg
+    )
+
+def _get_runs(parser: markovify.Text, sentences: list):
+    return [parser.word_split(sentence) for sentence in sentences if parser.test_sentence_input(sentence)]
+
+def _get_shard_model(piece: str, first: bool, last: bool, state_size: int, well_formed: bool, reject_reg: object, retain_original: bool):
+    """
+        Split a piece of the corpus into sentences in a worker and count the whole ones
+
+        A piece is cut at whitespace, so its first and last sentence may only be part of one,
+        they are given back as text for the parent to split again with its neighbours
+    """
+
+    parser: markovify.Text = get_sentence_parser(state_size=state_size, well_formed=well_formed, reject_reg=reject_reg)
+    sentences: list = parser.sentence_split(piece)
+
+    # The whitespace the piece starts with is kept, it is part of the sentence it continues
+    head: str = None
+    if not first:
+        head: str = piece[:len(piece) - len(piece.lstrip())] + sentences.pop(0)
+
+    tail: str = None
+    if not last and len(sentences) > 0:
+        tail: str = sentences.pop()
+
+    runs: list = _get_runs(parser=parser, sentences=sentences)
+    model: dict = parser.chain.build(runs, state_size)
+
+    # Unless the runs are kept, only their text is sent back as it is much quicker to unpickle
+    if retain_original:
+        return head, len(runs), runs, None, model, tail
+
+    return head, len(runs), None, parser.sentence_join(map(parser.word_join, runs)), model, tail
+
+def _get_cuts(corpus: str, pieces: int):
+    # Cut at the start of a run of whitespace, so no piece ends in whitespace which could end a sentence
+    cuts: list = [0]
+    for piece in range(1, pieces):
+        match: re.Match = CUT_PATTERN.search(corpus, max(piece * len(corpus) // pieces, cuts[-1]))
+        if match is None:
+            break
+
+        cuts.append(match.start() + 1)
+
+    return cuts + [len(corpus)]
+
+def get_split_corpus(corpus: str, length: int = 4096):
+    """
+        Split the last sentence off a corpus, as text added to the corpus later may continue it
+
+        The rest of the corpus splits into the same sentences whatever is added. Only the end of
+        the corpus is split, from a cut at whitespace, until a whole sentence comes before the last
+    """
+
+    while True:
+        start: int = 0
+        if length < len(corpus):
+            match: re.Match = CUT_PATTERN.search(corpus, len(corpus) - length)
+            start: int = match.start() + 1 if match is not None else 0
+
+        # The first sentence after a cut may only be part of one, so it doesn't count
+        sentences: list = markovify.split_into_sentences(corpus[start:])
+        if start == 0 or len(sentences) > 1:
+            break
+
+        length *= 2
+
+    tail: str = sentences[-1]
+    settled: str = corpus[:len(corpus.rstrip()) - len(tail)].rstrip()
+
+    return settled, tail
+
+def set_merged_model(model: dict, partial_model: dict):
+    """
+        Add the transition counts of a partial model to a model
+
+        Merging partial models in the order of their sentences keeps the model identical to
+        one built from every sentence at once, states and next words included
+    """
+
+    for state, follows in partial_model.items():
+        if state not in model:
+            model[state] = {}
+
+        merged_follows: dict = model[state]
+        for follow, count in follows.items():
+            merged_follows[follow] = merged_follows.get(follow, 0) + count
+
+def set_subtracted_model(model: dict, partial_model: dict):
+    """
+        Take the transition counts of the last sentences merged into a model back out of it
+
+        States and next words those sentences added come last, so removing them leaves the
+        model exactly as it was before they were merged, order included
+    """
+
+    for state, follows in partial_model.items():
+        subtracted_follows: dict = model[state]
+        for follow, count in follows.items():
+            subtracted_follows[follow] -= count
+            if subtracted_follows[follow] == 0:
+                del subtracted_follows[follow]
+
+        if len(subtracted_follows) == 0:
+            del model[state]
+
+def get_sharded_text(corpus: str, state_size: int, well_formed: bool = True, reject_reg: object = "", workers: int = 1, shard_size: int = 5000000, retain_original: bool = True):
+    """
+        Build a markovify Text from pieces of the corpus split and counted by a process pool
+
+        The corpus is cut at whitespace into pieces of about `shard_size` characters, which the
+        workers split into sentences and count. A sentence can run across a cut, so the sentences
+        either side of every cut are split again here. The counts are merged in order, so the
+        model is the same as `markovify.Text(corpus)` would build
+
+        Without `retain_original` the parsed sentences aren't sent back, only the rejoined text
+        which is needed to check generated sentences for overlap
+    """
+
+    # Not worth starting the workers for
+    if workers <= 1 or len(corpus) <= shard_size:
+        return markovify.Text(input_text=corpus, state_size=state_size, well_formed=well_formed, reject_reg=reject_reg)
+
+    parser: markovify.Text = get_sentence_parser(state_size=state_size, well_formed=well_formed, reject_reg=reject_reg)
+
+    cuts: list = _get_cuts(corpus=corpus, pieces=max(workers, -(-len(corpus) // shard_size)))
+    pieces: list = [corpus[start:end] for start, end in zip(cuts, cuts[1:])]
+    results: object = get_executor(workers=workers).map(
+        _get_shard_model, pieces, [index == 0 for index in range(len(pieces))], [index == len(pieces) - 1 for index in range(len(pieces))],
+        itertools.repeat(state_size), itertools.repeat(well_formed), itertools.repeat(reject_reg), itertools.repeat(retain_original)
+    )
+
+    count: int = 0
+    runs: list = []
+    rejoined_texts: list = []
+    model: dict = {}
+    carried: str = None
+    for index, (head, shard_count, shard_runs, shard_text, partial_model, tail) in enumerate(results):
+        if head is not None:
+            carried += head
+
+            # The whole piece is part of a sentence which carries on into the next one
+            if tail is None and index < len(pieces) - 1:
+                continue
+
+            # Split again the way the whole corpus would have been
+            cut_runs: list = _get_runs(parser=parser, sentences=parser.sentence_split(carried))
+            set_merged_model(model=model, partial_model=parser.chain.build(cut_runs, state_size))
+
+            count += len(cut_runs)
+            if retain_original:
+                runs.extend(cut_runs)
+            elif len(cut_runs) > 0:
+                rejoined_texts.append(parser.sentence_join(map(parser.word_join, cut_runs)))
+
+        carried: str = tail
+
+        count += shard_count
+        if retain_original:
+            runs.extend(shard_runs)
+        elif shard_count > 0:
+            rejoined_texts.append(shard_text)
+
+        # The first model is taken over as it is, the others are added to it
+        if len(model) == 0:
+            model: dict = partial_model
+        else:
+            set_merged_model(model=model, partial_model=partial_model)
+
+    # markovify would rebuild an empty model from scratch
+    if count == 0:
+        return markovify.Text(input_text=corpus, state_size=state_size, well_formed=well_formed, reject_reg=reject_reg)
+
+    chain: markovify.Chain = markovify.Chain(corpus=None, state_size=state_size, model=model)
+    if retain_original:
+        return markovify.Text(input_text=None, state_size=state_size, chain=chain, parsed_sentences=runs, well_formed=well_formed, reject_reg=reject_reg)
+
+    text: markovify.Text = markovify.Text(input_text=None, state_size=state_size, chain=chain, retain_original=False, well_formed=well_formed, reject_reg=reject_reg)
+
+    # Generated sentences are still checked for overlap with the corpus
+    text.rejoined_text = parser.sentence_join(rejoined_texts)
+
+    return text
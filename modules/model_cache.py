@@ -0,0 +1,168 @@
+import os
+import json
+import uuid
+import pickle
+import struct
+
+from .markov_chain import set_merged_model
+
+# The cache is two append-only files, so an update only writes what the new notes added
+# The chain file is the magic, which ends with the format version, then one record per build or update:
+# the lengths of a JSON header and of the pickled counts, the header, then the counts
+# A build writes the whole chain, every update after it only the counts of its new sentences
+# The last sentence of the corpus may go on in the next notes, so it isn't counted, every header keeps its text
+# The text file is an id, which the first header names, then the rejoined text of every counted sentence
+MAGIC: bytes = b"MRKVLOG2"
+RECORD: struct.Struct = struct.Struct("<QQ")
+TEXT_ID_LENGTH: int = 32
+
+def _get_text_path(file_path: str):
+    return f"{file_path}.text"
+
+def _get_record(header: dict, chain_model: dict):
+    encoded_header: bytes = json.dumps(header).encode(encoding="utf-8")
+    encoded_chain: bytes = pickle.dumps(chain_model, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return RECORD.pack(len(encoded_header), len(encoded_chain)) + encoded_header + encoded_chain
+
+def get_model_cache(file_path: str):
+    """
+        Read the record headers of a model cache, None when there is no cache
+
+        The counts aren't loaded, so checking the key is cheap. A record cut short by an
+        interrupted update is left out, the records before it still make up a whole model
+    """
+
+    if not os.path.exists(file_path):
+        return None
+
+    records: list = []
+    with open(file=file_path, mode="rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"`{file_path}` is not a Markov model cache")
+
+        size: int = os.fstat(f.fileno()).st_size
+        end: int = f.tell()
+        while end + RECORD.size <= size:
+            header_length, chain_length = RECORD.unpack(f.read(RECORD.size))
+            if end + RECORD.size + header_length + chain_length > size:
+                break
+
+            header: dict = json.loads(f.read(header_length))
+            header["chain_offset"] = f.tell()
+            header["chain_length"] = chain_length
+            records.append(header)
+
+            end: int = f.seek(chain_length, os.SEEK_CUR)
+
+    if len(records) == 0:
+        raise ValueError(f"`{file_path}` holds no Markov model")
+
+    cache: dict = {
+        "key": records[-1]["key"],
+        "state_size": records[0]["state_size"],
+        "text_id": records[0]["text_id"],
+        "text_length": records[-1]["text_length"],
+        "tail": records[-1]["tail"],
+        "records": records,
+        "end": end
+    }
+
+    # The text file is replaced separately, it has to be the one this chain was written with
+    text_path: str = _get_text_path(file_path=file_path)
+    with open(file=text_path, mode="rb") as f:
+        text_id: bytes = f.read(TEXT_ID_LENGTH)
+        size: int = os.fstat(f.fileno()).st_size
+
+    if text_id.decode(encoding="ascii", errors="replace") != cache["text_id"] or size < cache["text_length"]:
+        raise ValueError(f"`{text_path}` doesn't belong to the Markov model cache `{file_path}`")
+
+    return cache
+
+def get_cached_model(file_path: str, cache: dict):
+    """
+        Get the transition counts and rejoined text of a model cache, with every update merged in
+
+        The last sentence, kept in the cache as text, is left for the caller to count
+    """
+
+    model: dict = {}
+    with open(file=file_path, mode="rb") as f:
+        for record in cache["records"]:
+            f.seek(record["chain_offset"])
+
+            try:
+                partial_model: dict = pickle.loads(f.read(record["chain_length"]))
+            except (pickle.UnpicklingError, EOFError) as e:
+                raise ValueError(f"`{file_path}` has a corrupt record: {e}")
+
+            # Merging the updates in order gives the model a build of the whole corpus would
+            if len(model) == 0:
+                model: dict = partial_model
+            else:
+                set_merged_model(model=model, partial_model=partial_model)
+
+    with open(file=_get_text_path(file_path=file_path), mode="rb") as f:
+        rejoined_text: str = f.read(cache["text_length"])[TEXT_ID_LENGTH:].decode(encoding="utf-8", errors="surrogatepass")
+
+    return model, rejoined_text
+
+def set_model_cache_written(file_path: str, chain_model: dict, rejoined_text: str, state_size: int, key: str, tail: str):
+    """
+        Write a model cache holding the whole chain and the text it was built from, but for the last sentence
+    """
+
+    text_id: str = uuid.uuid4().hex
+    encoded_text: bytes = text_id.encode(encoding="ascii") + rejoined_text.encode(encoding="utf-8", errors="surrogatepass")
+
+    header: dict = {
+        "key": key,
+        "state_size": state_size,
+        "text_id": text_id,
+        "text_length": len(encoded_text),
+        "tail": tail
+    }
+
+    # Write to temporary files first so an interrupted run can't leave a corrupt cache
+    # Until both are replaced, the text id tells the chain and text of different builds apart
+    text_path: str = _get_text_path(file_path=file_path)
+    with open(file=f"{text_path}.tmp", mode="wb") as f:
+        f.write(encoded_text)
+
+    with open(file=f"{file_path}.tmp", mode="wb") as f:
+        f.write(MAGIC)
+        f.write(_get_record(header=header, chain_model=chain_model))
+
+    os.replace(f"{text_path}.tmp", text_path)
+    os.replace(f"{file_path}.tmp", file_path)
+
+def set_model_cache_appended(file_path: str, cache: dict, chain_model: dict, rejoined_text: str, key: str, tail: str):
+    """
+        Append the counts and rejoined text of new sentences to a model cache
+
+        Only the new notes are written, whatever the size of the cache
+    """
+
+    encoded_text: bytes = rejoined_text.encode(encoding="utf-8", errors="surrogatepass")
+
+    # markovify joins sentences with a space
+    if len(encoded_text) > 0 and cache["text_length"] > TEXT_ID_LENGTH:
+        encoded_text: bytes = b" " + encoded_text
+
+    # Anything past the last whole record was left by an interrupted update
+    with open(file=_get_text_path(file_path=file_path), mode="r+b") as f:
+        f.truncate(cache["text_length"])
+        f.seek(cache["text_length"])
+        f.write(encoded_text)
+
+    header: dict = {
+        "key": key,
+        "text_length": cache["text_length"] + len(encoded_text),
+        "tail": tail
+    }
+
+    # The text is written first, a record is only read once it is whole
+    with open(file=file_path, mode="r+b") as f:
+        f.truncate(cache["end"])
+        f.seek(cache["end"])
+        f.write(_get_record(header=header, chain_model=chain_model))
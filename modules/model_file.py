@@ -0,0 +1,284 @@
+import os
+import mmap
+import json
+import struct
+
+try:
+    import markovify
+except ImportError:
+    raise ImportError("Failed to import markovify, please run `pip3 install markovify`")
+
+try:
+    import numpy
+except ImportError:
+    # Only needed by the `array` chain backend
+    numpy = None
+
+from .markov_chain import ArrayChain
+
+# Flat little-endian file: the magic, which ends with the format version, the length of a JSON
+# header, the header, then every section
+# The header says where each section starts, sections start on 8 byte boundaries so they can be
+# used in place as arrays
+MAGIC: bytes = b"MRKVARR2"
+PREFIX: struct.Struct = struct.Struct("<8sQ")
+
+# Array sections, in the order they are written
+SECTIONS: list = [
+    ("keys", "<u8"),
+    ("offsets", "<i8"),
+    ("next_words", "<u4"),
+    ("cumulative_weights", "<f8"),
+    ("word_offsets", "<i8"),
+    ("word_bytes", "u1"),
+    ("text", "u1")
+]
+
+def _get_padding(length: int):
+    return -length % 8
+
+def set_model_file_written(file_path: str, chain: ArrayChain, rejoined_text: str, key: str):
+    """
+        Write an array chain and the text it was built from as a flat model file
+
+        The key is kept in the header, so a later run can tell if the file matches its corpus
+    """
+
+    encoded_words: list = [word.encode(encoding="utf-8", errors="surrogatepass") for word in chain.words]
+    word_offsets: object = numpy.zeros(len(encoded_words) + 1, dtype="<i8")
+    numpy.cumsum([len(word) for word in encoded_words], out=word_offsets[1:])
+
+    arrays: dict = {
+        "keys": chain.keys.reshape(-1),  # Column after column
+        "offsets": chain.offsets,
+        "next_words": chain.next_words,
+        "cumulative_weights": chain.cumulative_weights,
+        "word_offsets": word_offsets,
+        "word_bytes": numpy.frombuffer(b"".join(encoded_words), dtype="u1"),
+        "text": numpy.frombuffer(rejoined_text.encode(encoding="utf-8", errors="surrogatepass"), dtype="u1")
+    }
+
+    header: dict = {
+        "key": key,
+        "state_size": chain.state_size,
+        "bits": chain.bits,
+        "key_columns": chain.key_columns,
+        "begin_key": chain.begin_key,
+        "end_id": chain.end_id,
+        "word_count": len(encoded_words),
+        "weighted_words": len(chain.word_weights),
+        "sections": {}
+    }
+
+    # Section offsets depend on the header length, which depends on the offsets, so lay out until it settles
+    encoded_header: bytes = b""
+    while True:
+        position: int = PREFIX.size + len(encoded_header)
+        for name, dtype in SECTIONS:
+            position += _get_padding(length=position)
+            header["sections"][name] = [position, len(arrays[name]), dtype]
+            position += arrays[name].nbytes
+
+        laid_out_header: bytes = json.dumps(header).encode(encoding="utf-8")
+        if laid_out_header == encoded_header:
+            break
+
+        encoded_header: bytes = laid_out_header
+
+    # Write to a temporary file first, processes which already mapped the old file keep reading it
+    temporary_path: str = f"{file_path}.tmp"
+    with open(file=temporary_path, mode="wb") as f:
+        f.write(PREFIX.pack(MAGIC, len(encoded_header)))
+        f.write(encoded_header)
+
+        for name, dtype in SECTIONS:
+            f.write(b"\0" * _get_padding(length=f.tell()))
+            f.write(numpy.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+
+    os.replace(temporary_path, file_path)
+
+def _get_mapped_file(file_path: str, key: str = None):
+    # Map a model file and read its header, with a key the file has to still hold that model
+    with open(file=file_path, mode="rb") as f:
+        data: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, length = PREFIX.unpack(data[:PREFIX.size])
+    if magic != MAGIC:
+        raise ValueError(f"`{file_path}` is not a Markov model file")
+
+    header: dict = json.loads(data[PREFIX.size:PREFIX.size + length])
+    if key is not None and header["key"] != key:
+        raise ValueError(f"`{file_path}` was replaced by another model while it was in use, expected the model {key} but found {header['key']}")
+
+    return data, header
+
+def get_model_file_key(file_path: str):
+    """
+        Get the key a model file was written with, None when there is no usable file
+    """
+
+    try:
+        with open(file=file_path, mode="rb") as f:
+            magic, length = PREFIX.unpack(f.read(PREFIX.size))
+            if magic != MAGIC:
+                return None
+
+            return json.loads(f.read(length))["key"]
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+class MappedWords:
+    """
+        Words of a model file, decoded from the mapped file as they are asked for
+    """
+
+    # Non-Configurable
+    data: mmap.mmap = None
+    word_offsets: memoryview = None
+    start: int = 0
+
+    def __init__(self, data: mmap.mmap, word_offsets: object, start: int):
+        """
+            Read the words from the word bytes section starting at `start`
+        """
+
+        self.data: mmap.mmap = data
+        self.word_offsets: memoryview = memoryview(word_offsets)
+        self.start: int = start
+
+    def __len__(self):
+        return len(self.word_offsets) - 1
+
+    def __getitem__(self, index: int):
+        return self.data[self.start + self.word_offsets[index]:self.start + self.word_offsets[index + 1]].decode(encoding="utf-8", errors="surrogatepass")
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+class MappedText:
+    """
+        Text of a model file searched in the mapped file, for markovify's overlap check
+    """
+
+    # Required
+    file_path: str = None
+
+    # Non-Configurable
+    key: str = None
+    data: mmap.mmap = None
+    start: int = 0
+    end: int = 0
+
+    def __init__(self, file_path: str, key: str = None, data: mmap.mmap = None, header: dict = None):
+        """
+            Search the text section of a model file, mapping it unless it already is
+        """
+
+        if data is None:
+            data, header = _get_mapped_file(file_path=file_path, key=key)
+
+        self.file_path: str = file_path
+        self.key: str = header["key"]
+        self.data: mmap.mmap = data
+
+        # Where the text is comes from the header, as it moves when the file holds another model
+        text_offset, text_length, _ = header["sections"]["text"]
+        self.start: int = text_offset
+        self.end: int = text_offset + text_length
+
+    def __getstate__(self):
+        # Workers map the file themselves instead of being sent a copy, and it has to be the same model
+        return {"file_path": self.file_path, "key": self.key}
+
+    def __setstate__(self, state: dict):
+        self.__init__(file_path=state["file_path"], key=state["key"])
+
+    def __contains__(self, text: str):
+        # UTF-8 never matches part of a character, so searching the bytes is the same as searching the text
+        return self.data.find(text.encode(encoding="utf-8", errors="surrogatepass"), self.start, self.end) != -1
+
+    def __len__(self):
+        return self.end - self.start
+
+class MappedArrayChain(ArrayChain):
+    """
+        Array chain read in place from a memory mapped model file
+
+        Nothing is copied when it is loaded, so loading takes the same time whatever the size of
+        the model, and every process which maps the same file shares one copy in the page cache
+    """
+
+    # Required
+    file_path: str = None
+
+    # Non-Configurable
+    key: str = None
+    data: mmap.mmap = None
+    text: MappedText = None
+
+    def __init__(self, file_path: str, key: str = None):
+        """
+            Map a model file, with a key it has to hold that model
+        """
+
+        if numpy is None:
+            raise ImportError("Failed to import numpy, please run `pip3 install numpy`")
+
+        self.file_path: str = file_path
+
+        self.data, header = _get_mapped_file(file_path=file_path, key=key)
+        self.key: str = header["key"]
+
+        sections: dict = {name: numpy.frombuffer(self.data, dtype=dtype, count=count, offset=offset) for name, (offset, count, dtype) in header["sections"].items()}
+
+        self.state_size: int = header["state_size"]
+        self.bits: int = header["bits"]
+        self.key_columns: int = header["key_columns"]
+        self.mask: int = (1 << (self.bits * self.state_size)) - 1
+        self.begin_key: int = header["begin_key"]
+        self.end_id: int = header["end_id"]
+        self.word_weights: dict = {}  # Already counted into the cumulative weights
+
+        self.keys = sections["keys"].reshape(self.key_columns, -1)
+        self.offsets = sections["offsets"]
+        self.next_words = sections["next_words"]
+        self.cumulative_weights = sections["cumulative_weights"]
+        self.words: MappedWords = MappedWords(data=self.data, word_offsets=sections["word_offsets"], start=header["sections"]["word_bytes"][0])
+
+        self.text: MappedText = MappedText(file_path=file_path, data=self.data, header=header)
+
+        self._set_views()
+
+    def __getstate__(self):
+        # Workers map the file themselves instead of being sent a copy
+        # A newer model written to the same path in the meantime fails loudly instead of being walked
+        return {"file_path": self.file_path, "key": self.key}
+
+    def __setstate__(self, state: dict):
+        self.__init__(file_path=state["file_path"], key=state["key"])
+
+    def _get_key(self, state: tuple):
+        # Only walks from a given state need to look words up, so the lookup is made on first use
+        if self.word_ids is None:
+            self.word_ids: dict = {word: index for index, word in enumerate(self.words)}
+
+        return super()._get_key(state=state)
+
+def get_mapped_text(file_path: str, key: str = None, well_formed: bool = True, reject_reg: object = ""):
+    """
+        Get a markovify Text walking a mapped model file, without parsing any sentences
+
+        With a key, the file has to hold the model written with that key
+    """
+
+    chain: MappedArrayChain = MappedArrayChain(file_path=file_path, key=key)
+
+    model: markovify.Text = markovify.Text(
+        input_text=None, state_size=chain.state_size, chain=chain,
+        retain_original=False, well_formed=well_formed, reject_reg=reject_reg
+    )
+
+    # Generated sentences are still checked for overlap with the corpus
+    model.rejoined_text = chain.text
+
+    return model
@@ -0,0 +1,120 @@
+import copy
+import logging
+import threading
+
+try:
+    import nltk
+except ImportError:
+    raise ImportError("Failed to import nltk, please run `pip3 install nltk`")
+
+logger: logging.Logger = logging.getLogger(__name__)
+LESSERDEBUG: int = 15
+
+# Resources already found by this process, so the data paths are only searched once
+found_resources: set = set()
+
+# Loaded once per process and shared by every module
+sentiment_analyzers: dict = {}  # By the path and name of their lexicon
+punkt_languages: set = set()
+
+# Downloads give up instead of hanging when the network is unreachable
+download_timeout: float = 30.0
+
+lock: threading.RLock = threading.RLock()
+
+def set_resource_found(path: str, name: str, allow_download: bool = True):
+    """
+        Make sure an NLTK resource is installed, downloading it if allowed
+
+        Raises LookupError straight away when the resource is missing and can't be downloaded
+    """
+
+    with lock:
+        if path in found_resources:
+            return
+
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            if not allow_download:
+                raise LookupError(f"Failed to find the NLTK resource {name} and downloads are turned off, please run `python3 -m nltk.downloader {name}` or set NLTK_DATA") from None
+
+            logger.log(level=LESSERDEBUG, msg=f"Failed to find {name}. Downloading for you...")
+
+            downloaded: bool = _get_downloaded(name=name)
+            if not downloaded:
+                raise LookupError(f"Failed to download the NLTK resource {name}")
+
+            nltk.data.find(path)
+
+        found_resources.add(path)
+
+def _get_downloaded(name: str):
+    # nltk opens its connections without a timeout and doesn't take one, so the download runs in
+    # a thread which is given up on instead, leaving the timeout of every other socket alone
+    results: list = []
+
+    def download():
+        try:
+            results.append(nltk.download(name, quiet=True, raise_on_error=True))
+        except Exception as e:
+            # Raised again by the thread which waits on the download
+            results.append(e)
+
+    thread: threading.Thread = threading.Thread(target=download, name=f"nltk-download-{name}", daemon=True)
+    thread.start()
+    thread.join(timeout=download_timeout)
+
+    if thread.is_alive():
+        raise LookupError(f"Failed to download the NLTK resource {name} within {download_timeout} seconds")
+
+    if isinstance(results[0], (OSError, ValueError)):
+        raise LookupError(f"Failed to download the NLTK resource {name}: {results[0]}") from results[0]
+
+    if isinstance(results[0], Exception):
+        raise results[0]
+
+    return results[0]
+
+def get_sentiment_analyzer(words: dict = None, path: str = "sentiment/vader_lexicon.zip", name: str = "vader_lexicon", allow_download: bool = True):
+    """
+        Get a VADER sentiment analyzer with extra words added to its lexicon
+
+        The lexicon file is only parsed once per process, every analyzer gets its own copy of
+        the parsed lexicon so the extra words of one module don't leak into another
+    """
+
+    # Imported here so only the modules which score sentiment pay for it
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+    with lock:
+        if (path, name) not in sentiment_analyzers:
+            set_resource_found(path=path, name=name, allow_download=allow_download)
+            sentiment_analyzers[(path, name)] = SentimentIntensityAnalyzer(lexicon_file=f"{path}/{name}/{name}.txt")
+
+        sentiment_analyzer: SentimentIntensityAnalyzer = sentiment_analyzers[(path, name)]
+
+    analyzer: SentimentIntensityAnalyzer = copy.copy(sentiment_analyzer)
+    analyzer.lexicon = dict(sentiment_analyzer.lexicon)
+
+    if words is not None:
+        analyzer.lexicon.update(words)
+
+    return analyzer
+
+def set_punkt_loaded(language: str = "english", path: str = "tokenizers/punkt", name: str = "punkt", allow_download: bool = True):
+    """
+        Make sure the PUNKT sentence tokenizer for a language is installed and loaded
+
+        nltk keeps loaded models in its own cache, so loading it here means the first note
+        doesn't pay for unpickling it
+    """
+
+    with lock:
+        if language in punkt_languages:
+            return
+
+        set_resource_found(path=path, name=name, allow_download=allow_download)
+        nltk.data.load(f"{path}/{language}.pickle")
+
+        punkt_languages.add(language)
@@ -2,6 +2,11 @@ import re
 import random
 import logging
 
+from collections.abc import Iterator
+
+from .parallel import get_processed_texts
+from .rewrite_rules import get_trie_pattern
+
 class NormalizeText:
     # Required
     input: object = None
@@ -11,6 +16,8 @@ class NormalizeText:
     chance_execute: float = 1.0
     show_tag: bool = False
     hard_skip: bool = False
+    workers: int = 1
+    batch_size: int = 1024
     names: list[str] = [
         "becky",
         "prim",
@@ -31,11 +38,13 @@ class NormalizeText:
 
     # Non-Configurable
     skipped: bool = False
+    text_only: bool = True
     capitalize_i_pattern: re.Pattern = re.compile(pattern=r'(\s)i(\W)', flags=re.IGNORECASE|re.MULTILINE)
     capitalize_sentence_pattern: re.Pattern = re.compile(pattern=r'[.!?]([\s\n]*)(\w)', flags=re.IGNORECASE|re.MULTILINE)
     ending_punctuation_pattern: re.Pattern = re.compile(pattern=r'\s([,.?!;:\-)\]>]+)', flags=re.MULTILINE)
     starting_punctuation_pattern: re.Pattern = re.compile(pattern=r'([:\-(\[<]+)\s', flags=re.MULTILINE)
     emoji_pattern: re.Pattern = re.compile(pattern=r'(:)([a-z_\-]+)(:)', flags=re.IGNORECASE|re.MULTILINE)
+    names_patterns: list = None
     logger: logging.Logger = None
     LESSERDEBUG: int = 15
     VERBOSE: int = 5
@@ -47,6 +56,8 @@ class NormalizeText:
 
         self.logger: logging.Logger = logging.getLogger(type(self).__name__)
 
+        self._set_names_patterns()
+
     def set_settings(self, settings: dict):
         """
             Configure the settings for this module
@@ -54,6 +65,7 @@ class NormalizeText:
 
         if "names" in settings:
             self.names = settings["names"]
+            self._set_names_patterns()
 
         if "show_tag" in settings:
             self.show_tag = settings["show_tag"]
@@ -67,6 +79,44 @@ class NormalizeText:
         if "hard_skip" in settings:
             self.hard_skip = settings["hard_skip"]
 
+        if "workers" in settings:
+            self.workers = settings["workers"]
+
+        if "batch_size" in settings:
+            self.batch_size = settings["batch_size"]
+
+    def _set_names_patterns(self):
+        # Recasing a name only changes the letter after its space, so it doesn't matter which of two
+        # names matching at the same place wins and they can share one pattern, a name with a space
+        # in it could overlap the next name though, so it keeps its place on its own
+        self.names_patterns: list = []
+
+        names: dict = {}
+        for name in self.names:
+            old: str = f" {name.lower()}"
+            new: str = f" {name.capitalize()}"
+
+            # Names which look the same after capitalizing don't change anything
+            if old == new:
+                continue
+
+            if not any(character.isspace() for character in name):
+                names.setdefault(old, new)
+                continue
+
+            self._add_names_pattern(names=names)
+            self._add_names_pattern(names={old: new})
+            names: dict = {}
+
+        self._add_names_pattern(names=names)
+
+    def _add_names_pattern(self, names: dict):
+        if len(names) == 0:
+            return
+
+        pattern: re.Pattern = re.compile(pattern=" " + get_trie_pattern(words=[old[1:] for old in names]))
+        self.names_patterns.append((pattern, names))
+
     def set_input(self, input: object):
         """
             Set the input used by this module
@@ -74,65 +124,93 @@ class NormalizeText:
         
         self.input: object = input
 
-    def run(self):
+    def set_skipped(self):
         """
-            Execute this module as part of a chain of modules
+            Roll the chance of executing this module, True means it is left out entirely
         """
 
+        # A module can run more than once, such as for every request of the server
+        self.skipped: bool = False
+
         # Gives probability of executing module
         if self.chance_execute < random.random():
             self.logger.log(level=self.LESSERDEBUG, msg="Hit random chance of skipping normalizing notes...")
 
             if self.hard_skip:
-                return self.input
+                return True
 
             self.skipped: bool = True
         else:
             self.logger.info("Normalizing notes...")
 
+        return False
+
+    def run(self):
+        """
+            Execute this module as part of a chain of modules
+        """
+
+        if self.set_skipped():
+            return self.input
+
         if type(self.input) is str:
             return self._get_normalized_text(text=self.input)
         
-        if type(self.input) is not list:
+        if type(self.input) is not list and not isinstance(self.input, Iterator):
             return
 
-        notes: list = []
-        for note_data in self.input:
-            if "note" not in note_data:
-                continue
+        notes: Iterator = self._get_processed_notes(notes=self.input)
 
-            note: dict = note_data["note"][-1].copy()
+        # Streamed notes are handed on one at a time as they are requested
+        if type(self.input) is list:
+            return list(notes)
 
-            if "text" not in note:
-                continue
+        return notes
 
-            # Create Operation Tag
-            tag: dict = {
-                "name": "NormalizeText",
-                "operation": "modify",
-                "show": self.show_tag,
-                "skipped": self.skipped
-            }
+    def _get_processed_notes(self, notes: Iterator):
+        # With more than one worker the texts are modified in batches by the process pool
+        for note_data, modified_text in get_processed_texts(module=self, method_name="_get_normalized_text", notes=notes, workers=self.workers, batch_size=self.batch_size):
+            note_data: dict = self._get_processed_note(note_data=note_data, modified_text=modified_text)
 
-            text: str = note["text"]
-            if not self.skipped:
-                text: str = self._get_normalized_text(text=note["text"])
+            if note_data is not None:
+                yield note_data
 
-            # If modification did not take effect, then remove tag
-            if self.show_tag and note["text"] == text:
-                tag["show"] = False
+    def _get_processed_note(self, note_data: dict, modified_text: str = None):
+        if "note" not in note_data:
+            return
 
-            note["text"] = text.strip()
-            note["tag"] = tag
+        note: dict = note_data["note"][-1].copy()
 
-            # Add Note To List
-            note_data["note"].append(note)
+        if "text" not in note:
+            return
 
-            notes.append({
-                "note": note_data["note"]
-            })
+        # Create Operation Tag
+        tag: dict = {
+            "name": "NormalizeText",
+            "operation": "modify",
+            "show": self.show_tag,
+            "skipped": self.skipped
+        }
 
-        return notes
+        text: str = note["text"]
+        if not self.skipped and modified_text is not None:
+            text: str = modified_text
+        elif not self.skipped:
+            text: str = self._get_normalized_text(text=note["text"])
+
+        # If modification did not take effect, then remove tag
+        if self.show_tag and note["text"] == text:
+            tag["show"] = False
+
+        note["text"] = text.strip()
+        note["tag"] = tag
+
+        # Add Note To List
+        note_data["note"].append(note)
+
+        return {
+            "note": note_data["note"]
+        }
 
     def _get_normalized_text(self, text: str):
         # Validate text
@@ -144,6 +222,10 @@ class NormalizeText:
             text: str = text.capitalize()
         
         text: str = " ".join(text.split())  # Remove extra whitespace
+
+        # The fixed literal rules are left out of the names matcher on purpose, merged into one
+        # alternation they scanned about 3x slower than these C-level replaces and their number
+        # doesn't grow, they also have to run before the patterns below while the names run after
         text: str = text.replace("Hmmmmmmm", "hmmmmmmm...")
         text: str = text.replace(" uwu ", " UwU ")
         text: str = text.replace(" owo ", " OwO ")
@@ -155,7 +237,8 @@ class NormalizeText:
         text: str = re.sub(pattern=self.capitalize_sentence_pattern, repl=lambda m: f".{m.group(1)}{m.group(2).upper()}", string=text)
         text: str = re.sub(pattern=self.emoji_pattern, repl=r' \1\2\3 ', string=text)
 
-        for name in self.names:
-            text: str = text.replace(f" {name.lower()}", f" {name.capitalize()}")
+        # Only the names, which a user can make as long as they like, share one compiled matcher
+        for pattern, names in self.names_patterns:
+            text: str = pattern.sub(lambda match: names[match.group()], text)
 
         return text.strip()
\ No newline at end of file
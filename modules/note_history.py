@@ -0,0 +1,149 @@
+import bisect
+
+class NoteHistory:
+    """
+        Compact list of the versions of a note
+
+        Text and meta are only stored when they change between versions and
+        identical tags are shared between every note, any version can still be
+        rebuilt as the usual `{"text": ..., "meta": ..., "tag": ...}` dict
+
+        The tokens of the latest text can be kept alongside it, so modules which
+        tokenize the same text don't have to do it again
+    """
+
+    __slots__ = ("tags", "text_versions", "texts", "meta_versions", "metas", "tokens")
+
+    # Shared copies of every distinct tag
+    interned_tags: dict = {}
+
+    # Token cache lookups across every note
+    token_hits: int = 0
+    token_misses: int = 0
+
+    def __init__(self, notes: list = None):
+        """
+            Initialize the history, optionally with existing versions
+        """
+
+        self.tags: list = []
+        self.text_versions: list = []
+        self.texts: list = []
+        self.meta_versions: list = []
+        self.metas: list = []
+        self.tokens: tuple = None
+
+        if notes is not None:
+            for note in notes:
+                self.append(note)
+
+    def append(self, note: dict):
+        """
+            Add a new version of the note
+        """
+
+        version: int = len(self.tags)
+
+        text: str = note.get("text")
+        if len(self.texts) == 0 or self.texts[-1] != text:
+            self.text_versions.append(version)
+            self.texts.append(text)
+            self.tokens: tuple = None  # Only hold for the text they came from
+
+        meta: dict = note.get("meta")
+        if len(self.metas) == 0 or self.metas[-1] is not meta:
+            self.meta_versions.append(version)
+            self.metas.append(meta)
+
+        self.tags.append(self._get_interned_tag(tag=note.get("tag")))
+
+    def get_tags(self):
+        """
+            Get the tag of every version without rebuilding the versions
+        """
+
+        return self.tags
+
+    def get_tokens(self, text: str, key: tuple):
+        """
+            Get the cached tokens of the text, None if they have to be worked out again
+        """
+
+        if self.tokens is not None and self.tokens[1] == key and self.tokens[0] == text and len(self.texts) > 0 and self.texts[-1] == text:
+            NoteHistory.token_hits += 1
+            return self.tokens[2]
+
+        NoteHistory.token_misses += 1
+        return None
+
+    def set_tokens(self, text: str, key: tuple, tokens: list):
+        """
+            Cache the tokens of the latest text, the key says how they were tokenized
+        """
+
+        self.tokens: tuple = (text, key, tokens)
+
+    @classmethod
+    def get_token_statistics(cls):
+        """
+            Get the token cache hits and misses across every note
+        """
+
+        lookups: int = cls.token_hits + cls.token_misses
+
+        return {
+            "hits": cls.token_hits,
+            "misses": cls.token_misses,
+            "hit_rate": cls.token_hits / lookups if lookups > 0 else 0.0
+        }
+
+    def _get_interned_tag(self, tag: dict):
+        if tag is None:
+            return None
+
+        try:
+            key: tuple = tuple(tag.items())
+            if key not in self.interned_tags:
+                self.interned_tags[key] = dict(tag)
+
+            return self.interned_tags[key]
+        except TypeError:
+            # Tags with unhashable values are kept as they are
+            return tag
+
+    def _get_version(self, version: int):
+        note: dict = {}
+
+        text: str = self.texts[bisect.bisect_right(self.text_versions, version) - 1]
+        if text is not None:
+            note["text"] = text
+
+        meta: dict = self.metas[bisect.bisect_right(self.meta_versions, version) - 1]
+        if meta is not None:
+            note["meta"] = meta
+
+        note["tag"] = self.tags[version]
+
+        return note
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __getitem__(self, index: object):
+        if isinstance(index, slice):
+            return [self._get_version(version=version) for version in range(*index.indices(len(self.tags)))]
+
+        if index < 0:
+            index += len(self.tags)
+
+        if index < 0 or index >= len(self.tags):
+            raise IndexError("note history index out of range")
+
+        return self._get_version(version=index)
+
+    def __iter__(self):
+        for version in range(len(self.tags)):
+            yield self._get_version(version=version)
+
+    def __repr__(self):
+        return f"NoteHistory({list(self)!r})"
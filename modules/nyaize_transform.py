@@ -2,6 +2,11 @@ import re
 import random
 import logging
 
+from collections.abc import Iterator
+
+from .parallel import get_processed_texts
+from .rewrite_rules import RewriteRules
+
 class NyaizeText:
     # Required
     input: object = None
@@ -10,13 +15,22 @@ class NyaizeText:
     chance_execute: float = 1.0
     show_tag: bool = True
     hard_skip: bool = False
+    workers: int = 1
+    batch_size: int = 1024
 
     # Non-Configurable
     skipped: bool = False
-    snyack_pattern: re.Pattern = re.compile(pattern=r"(?<=n)(a)", flags=re.IGNORECASE|re.MULTILINE)  # snyack
-    mornyan_pattern: re.Pattern = re.compile(pattern=r"(?<=morn)(ing)", flags=re.IGNORECASE|re.MULTILINE)  # mornyan
-    everynyan_pattern: re.Pattern = re.compile(pattern=r"(?<=every)(one)", flags=re.IGNORECASE|re.MULTILINE)  # everynyan
-    nyansense_pattern: re.Pattern = re.compile(pattern=r"(non)(?=[bcdfghjklmnpqrstvwxyz])", flags=re.IGNORECASE|re.MULTILINE)  # nyansense
+    text_only: bool = True
+    # Same precedence as applying the rules one after another, the joined rules stand in
+    # for a rule which would have matched text written by an earlier rule
+    nyaize_rules: RewriteRules = RewriteRules(rules=[
+        (r"a(?<=na)", "ya"),  # snyack
+        (r"ing(?<=morning)on(?=[abcdfghjklmnpqrstvwxyz])", "yanyan"),  # mornyan, then nyansense
+        (r"ing(?<=morning)", "yan"),  # mornyan
+        (r"one(?<=everyone)on(?=[abcdfghjklmnpqrstvwxyz])", "nyanyan"),  # everynyan, then nyansense
+        (r"one(?<=everyone)", "nyan"),  # everynyan
+        (r"non(?=[abcdfghjklmnpqrstvwxyz])", "nyan")  # nyansense, an `a` becomes `ya` first
+    ], flags=re.IGNORECASE|re.MULTILINE)
     logger: logging.Logger = None
     LESSERDEBUG: int = 15
     VERBOSE: int = 5
@@ -42,6 +56,12 @@ class NyaizeText:
         if "hard_skip" in settings:
             self.hard_skip = settings["hard_skip"]
 
+        if "workers" in settings:
+            self.workers = settings["workers"]
+
+        if "batch_size" in settings:
+            self.batch_size = settings["batch_size"]
+
     def set_input(self, input: object):
         """
             Set the input used by this module
@@ -49,74 +69,100 @@ class NyaizeText:
         
         self.input: object = input
 
-    def run(self):
+    def set_skipped(self):
         """
-            Execute this module as part of a chain of modules
+            Roll the chance of executing this module, True means it is left out entirely
         """
 
+        # A module can run more than once, such as for every request of the server
+        self.skipped: bool = False
+
         # Gives probability of executing module
         if self.chance_execute < random.random():
             self.logger.log(level=self.LESSERDEBUG, msg="Hit random chance of skipping nyaizing notes...")
 
             if self.hard_skip:
-                return self.input
+                return True
 
             self.skipped: bool = True
         else:
             self.logger.info("Nyaizing notes...")
 
+        return False
+
+    def run(self):
+        """
+            Execute this module as part of a chain of modules
+        """
+
+        if self.set_skipped():
+            return self.input
+
         if type(self.input) is str:
             return self._get_nyaized_text(text=self.input)
         
-        if type(self.input) is not list:
+        if type(self.input) is not list and not isinstance(self.input, Iterator):
             return
 
-        notes: list = []
-        for note_data in self.input:
-            if "note" not in note_data:
-                continue
+        notes: Iterator = self._get_processed_notes(notes=self.input)
 
-            note: dict = note_data["note"][-1].copy()
+        # Streamed notes are handed on one at a time as they are requested
+        if type(self.input) is list:
+            return list(notes)
 
-            if "text" not in note:
-                continue
+        return notes
 
-            # Create Operation Tag
-            tag: dict = {
-                "name": "NyaizeText",
-                "operation": "modify",
-                "show": self.show_tag,
-                "skipped": self.skipped
-            }
+    def _get_processed_notes(self, notes: Iterator):
+        # With more than one worker the texts are modified in batches by the process pool
+        for note_data, modified_text in get_processed_texts(module=self, method_name="_get_nyaized_text", notes=notes, workers=self.workers, batch_size=self.batch_size):
+            note_data: dict = self._get_processed_note(note_data=note_data, modified_text=modified_text)
 
-            if not self.skipped:
-                text: str = self._get_nyaized_text(text=note["text"])
+            if note_data is not None:
+                yield note_data
 
-            # If modification did not take effect, then remove tag
-            if self.show_tag and note["text"] == text:
-                tag["show"] = False
+    def _get_processed_note(self, note_data: dict, modified_text: str = None):
+        if "note" not in note_data:
+            return
 
-            note["text"] = text.strip()
-            note["tag"] = tag
+        note: dict = note_data["note"][-1].copy()
 
-            # Add Note To List
-            note_data["note"].append(note)
+        if "text" not in note:
+            return
 
-            notes.append({
-                "note": note_data["note"]
-            })
+        # Create Operation Tag
+        tag: dict = {
+            "name": "NyaizeText",
+            "operation": "modify",
+            "show": self.show_tag,
+            "skipped": self.skipped
+        }
 
-        return notes
+        text: str = note["text"]
+        if not self.skipped and modified_text is not None:
+            text: str = modified_text
+        elif not self.skipped:
+            text: str = self._get_nyaized_text(text=note["text"])
+
+        # If modification did not take effect, then remove tag
+        if self.show_tag and note["text"] == text:
+            tag["show"] = False
+
+        note["text"] = text.strip()
+        note["tag"] = tag
+
+        # Add Note To List
+        note_data["note"].append(note)
+
+        return {
+            "note": note_data["note"]
+        }
 
     def _get_nyaized_text(self, text: str):
         # Validate text
         if text is None:
             text: str = ""
 
-        text: str = re.sub(pattern=self.snyack_pattern, repl="ya", string=text)
-        text: str = re.sub(pattern=self.mornyan_pattern, repl="yan", string=text)
-        text: str = re.sub(pattern=self.everynyan_pattern, repl="nyan", string=text)
-        text: str = re.sub(pattern=self.nyansense_pattern, repl="nyan", string=text)
+        text: str = self.nyaize_rules.sub(text=text)
 
         return text
 
@@ -128,15 +174,23 @@ class RevertNyaizeText:
     chance_execute: float = 1.0
     show_tag: bool = False
     hard_skip: bool = False
+    workers: int = 1
+    batch_size: int = 1024
 
     # Non-Configurable
     skipped: bool = False
-    banana_pattern: re.Pattern = re.compile(pattern=r"(?<=n)(yanya)", flags=re.IGNORECASE|re.MULTILINE)  # banana
-    nonsense_pattern: re.Pattern = re.compile(pattern=r"(nyan)(?=[bcdfghjklmnpqrstvwxyz])", flags=re.IGNORECASE|re.MULTILINE)  # nonsense
-    everyone_pattern: re.Pattern = re.compile(pattern=r"(?<=every)(nyan)", flags=re.IGNORECASE|re.MULTILINE)  # everyone
-    morning_pattern: re.Pattern = re.compile(pattern=r"(?<=morn)(yan)", flags=re.IGNORECASE|re.MULTILINE)  # morning
-    snack_pattern: re.Pattern = re.compile(pattern=r"(?<=n)(ya)", flags=re.IGNORECASE|re.MULTILINE)  # snack
+    text_only: bool = True
+    # Same precedence as applying the rules one after another, `nyanya` is left to banana
+    reverse_rules: RewriteRules = RewriteRules(rules=[
+        (r"yanya(?<=nyanya)", "ana"),  # banana
+        (r"nyan(?!ya)(?=[bcdfghjklmnpqrstvwxyz])", "non"),  # nonsense
+        (r"nyan(?<=everynyan)(?!ya)", "one"),  # everyone
+        (r"yan(?<=mornyan)", "ing"),  # morning
+        (r"ya(?<=nya)", "a")  # snack
+    ], flags=re.IGNORECASE|re.MULTILINE)
     logger: logging.Logger = None
+    LESSERDEBUG: int = 15
+    VERBOSE: int = 5
 
     def __init__(self):
         """
@@ -159,6 +213,12 @@ class RevertNyaizeText:
         if "hard_skip" in settings:
             self.hard_skip = settings["hard_skip"]
 
+        if "workers" in settings:
+            self.workers = settings["workers"]
+
+        if "batch_size" in settings:
+            self.batch_size = settings["batch_size"]
+
     def set_input(self, input: object):
         """
             Set the input used by this module
@@ -166,75 +226,99 @@ class RevertNyaizeText:
         
         self.input: object = input
 
-    def run(self):
+    def set_skipped(self):
         """
-            Execute this module as part of a chain of modules
+            Roll the chance of executing this module, True means it is left out entirely
         """
 
+        # A module can run more than once, such as for every request of the server
+        self.skipped: bool = False
+
         # Gives probability of executing module
         if self.chance_execute < random.random():
             self.logger.log(level=self.LESSERDEBUG, msg="Hit random chance of skipping reverting nyaizing notes...")
 
             if self.hard_skip:
-                return self.input
+                return True
 
             self.skipped: bool = True
         else:
             self.logger.info("Revert Nyaizing notes...")
 
+        return False
+
+    def run(self):
+        """
+            Execute this module as part of a chain of modules
+        """
+
+        if self.set_skipped():
+            return self.input
+
         if type(self.input) is str:
             return self._get_reverted_nyaized_text(text=self.input)
         
-        if type(self.input) is not list:
+        if type(self.input) is not list and not isinstance(self.input, Iterator):
             return
 
-        notes: list = []
-        for note_data in self.input:
-            if "note" not in note_data:
-                continue
+        notes: Iterator = self._get_processed_notes(notes=self.input)
 
-            note: dict = note_data["note"][-1].copy()
+        # Streamed notes are handed on one at a time as they are requested
+        if type(self.input) is list:
+            return list(notes)
 
-            if "text" not in note:
-                continue
+        return notes
 
-            # Create Operation Tag
-            tag: dict = {
-                "name": "RevertNyaizeText",
-                "operation": "modify",
-                "show": self.show_tag,
-                "skipped": self.skipped
-            }
+    def _get_processed_notes(self, notes: Iterator):
+        # With more than one worker the texts are modified in batches by the process pool
+        for note_data, modified_text in get_processed_texts(module=self, method_name="_get_reverted_nyaized_text", notes=notes, workers=self.workers, batch_size=self.batch_size):
+            note_data: dict = self._get_processed_note(note_data=note_data, modified_text=modified_text)
 
-            text: str = note["text"]
-            if not self.skipped:
-                text: str = self._get_reverted_nyaized_text(text=note["text"])
+            if note_data is not None:
+                yield note_data
 
-            # If modification did not take effect, then remove tag
-            if self.show_tag and note["text"] == text:
-                tag["show"] = False
+    def _get_processed_note(self, note_data: dict, modified_text: str = None):
+        if "note" not in note_data:
+            return
 
-            note["text"] = text.strip()
-            note["tag"] = tag
+        note: dict = note_data["note"][-1].copy()
 
-            # Add Note To List
-            note_data["note"].append(note)
+        if "text" not in note:
+            return
 
-            notes.append({
-                "note": note_data["note"]
-            })
+        # Create Operation Tag
+        tag: dict = {
+            "name": "RevertNyaizeText",
+            "operation": "modify",
+            "show": self.show_tag,
+            "skipped": self.skipped
+        }
 
-        return notes
+        text: str = note["text"]
+        if not self.skipped and modified_text is not None:
+            text: str = modified_text
+        elif not self.skipped:
+            text: str = self._get_reverted_nyaized_text(text=note["text"])
+
+        # If modification did not take effect, then remove tag
+        if self.show_tag and note["text"] == text:
+            tag["show"] = False
+
+        note["text"] = text.strip()
+        note["tag"] = tag
+
+        # Add Note To List
+        note_data["note"].append(note)
+
+        return {
+            "note": note_data["note"]
+        }
 
     def _get_reverted_nyaized_text(self, text: str):
         # Validate text
         if text is None:
             text: str = ""
 
-        text: str = re.sub(pattern=self.banana_pattern, repl="ana", string=text)
-        text: str = re.sub(pattern=self.nonsense_pattern, repl="non", string=text)
-        text: str = re.sub(pattern=self.everyone_pattern, repl="one", string=text)
-        text: str = re.sub(pattern=self.morning_pattern, repl="ing", string=text)
-        text: str = re.sub(pattern=self.snack_pattern, repl="a", string=text)
+        text: str = self.reverse_rules.sub(text=text)
 
         return text
\ No newline at end of file
@@ -0,0 +1,132 @@
+import copy
+import atexit
+import functools
+import itertools
+
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+# One pool per worker count, shared by every module in this process
+executors: dict = {}
+
+# Module installed in this process when it is a worker of a module pool
+worker_module: object = None
+
+def get_executor(workers: int):
+    """
+        Get the shared process pool for this number of workers
+    """
+
+    if workers not in executors:
+        executors[workers] = ProcessPoolExecutor(max_workers=workers)
+
+    return executors[workers]
+
+@atexit.register
+def set_executors_shutdown():
+    """
+        Stop every shared process pool
+    """
+
+    for executor in executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    executors.clear()
+
+def _get_worker_results(module: object, method_name: str, texts: list):
+    method: object = getattr(module, method_name)
+
+    return [method(text) for text in texts]
+
+def get_worker_copy(module: object):
+    """
+        Get a copy of the module which is small enough to send to the workers
+    """
+
+    worker_module: object = copy.copy(module)
+    worker_module.input = None  # The notes are sent separately
+
+    return worker_module
+
+def _set_worker_module(module: object):
+    global worker_module
+    worker_module = module
+
+def get_worker_result(method_name: str, *arguments):
+    """
+        Call a method of the module installed in this worker
+    """
+
+    return getattr(worker_module, method_name)(*arguments)
+
+def _get_installed_worker_results(method_name: str, texts: list):
+    return _get_worker_results(module=worker_module, method_name=method_name, texts=texts)
+
+def get_module_executor(module: object, workers: int):
+    """
+        Start a process pool with a copy of the module installed in every worker
+
+        Unlike the shared pool, large state such as a Markov model is only sent once per worker
+    """
+
+    return ProcessPoolExecutor(max_workers=workers, initializer=_set_worker_module, initargs=(get_worker_copy(module=module),))
+
+def get_mapped_texts(module: object, method_name: str, texts: list, workers: int, chunk_size: int, executor: ProcessPoolExecutor = None):
+    """
+        Run a text method of a module on every text, results come back in order
+
+        With a pool from `get_module_executor` the chunks use the copy installed in its workers,
+        otherwise a copy of the module is sent along with every chunk to the shared pool
+    """
+
+    if workers <= 1 or len(texts) <= chunk_size:
+        return _get_worker_results(module=module, method_name=method_name, texts=texts)
+
+    if executor is not None:
+        run: functools.partial = functools.partial(_get_installed_worker_results, method_name)
+    else:
+        executor: ProcessPoolExecutor = get_executor(workers=workers)
+        run: functools.partial = functools.partial(_get_worker_results, get_worker_copy(module=module), method_name)
+
+    chunks: list = [texts[position:position + chunk_size] for position in range(0, len(texts), chunk_size)]
+
+    return list(itertools.chain.from_iterable(executor.map(run, chunks)))
+
+def get_processed_texts(module: object, method_name: str, notes: Iterator, workers: int = 1, batch_size: int = 1024, chunk_size: int = 64, executor: ProcessPoolExecutor = None):
+    """
+        Pair every note with its modified text, worked out in batches by the process pool
+
+        With a single worker the text is left as None so the module can modify it itself
+    """
+
+    if workers <= 1 or module.skipped:
+        for note_data in notes:
+            yield note_data, None
+
+        return
+
+    notes: Iterator = iter(notes)
+    while True:
+        batch: list = list(itertools.islice(notes, batch_size))
+        if len(batch) == 0:
+            return
+
+        # Only notes which have text are sent to the workers
+        positions: list = []
+        texts: list = []
+        for position, note_data in enumerate(batch):
+            if "note" not in note_data:
+                continue
+
+            note: dict = note_data["note"][-1]
+            if "text" not in note:
+                continue
+
+            positions.append(position)
+            texts.append(note["text"])
+
+        modified_texts: list = [None] * len(batch)
+        for position, text in zip(positions, get_mapped_texts(module=module, method_name=method_name, texts=texts, workers=workers, chunk_size=chunk_size, executor=executor)):
+            modified_texts[position] = text
+
+        yield from zip(batch, modified_texts)
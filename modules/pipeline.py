@@ -0,0 +1,354 @@
+import os
+import json
+import time
+import logging
+import importlib
+import tracemalloc
+
+from collections.abc import Iterator
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+class FusedText:
+    """
+        Runs adjacent text-only modules as a single pass over the notes
+
+        Every module still adds its own version of each note, the notes are just
+        walked once instead of once per module
+    """
+
+    # Required
+    input: object = None
+    modules: list = None
+
+    # Non-Configurable
+    logger: logging.Logger = None
+    LESSERDEBUG: int = 15
+    VERBOSE: int = 5
+
+    def __init__(self, modules: list):
+        """
+            Initialize this module
+        """
+
+        self.logger: logging.Logger = logging.getLogger(type(self).__name__)
+        self.modules: list = modules
+
+    def set_settings(self, settings: dict):
+        """
+            Configure the settings for this module
+        """
+
+        # Every fused module keeps its own settings
+        pass
+
+    def set_input(self, input: object):
+        """
+            Set the input used by this module
+        """
+
+        self.input: object = input
+
+    def run(self):
+        """
+            Execute this module as part of a chain of modules
+        """
+
+        # Anything other than notes goes through the modules one after another
+        if type(self.input) is not list and not isinstance(self.input, Iterator):
+            output: object = self.input
+            for module in self.modules:
+                module.set_input(input=output)
+                output: object = module.run()
+
+            return output
+
+        # Hard skipped modules leave no version behind, so they are dropped from the pass
+        modules: list = [module for module in self.modules if not module.set_skipped()]
+        self.logger.log(level=self.LESSERDEBUG, msg=f"Running {', '.join(type(module).__name__ for module in modules)} in one pass...")
+
+        notes: Iterator = self._get_processed_notes(notes=self.input, modules=modules)
+
+        # Streamed notes are handed on one at a time as they are requested
+        if type(self.input) is list:
+            return list(notes)
+
+        return notes
+
+    def _get_processed_notes(self, notes: Iterator, modules: list):
+        for note_data in notes:
+            for module in modules:
+                note_data: dict = module._get_processed_note(note_data=note_data)
+
+                # Notes without text are dropped by the first module that sees them
+                if note_data is None:
+                    break
+            else:
+                yield note_data
+
+        # Modules which wrap up after their last note, such as saving a cache
+        for module in modules:
+            if hasattr(module, "set_finished"):
+                module.set_finished()
+
+    def set_closed(self):
+        """
+            Close every fused module which holds on to something, such as a process pool or a cache
+        """
+
+        for module in self.modules:
+            if hasattr(module, "set_closed"):
+                module.set_closed()
+
+def get_is_fusable(module: object):
+    """
+        Check if a module can share a pass over the notes with its neighbours
+    """
+
+    # Modules with their own process pool already work on whole batches at a time
+    return getattr(module, "text_only", False) and getattr(module, "workers", 1) <= 1
+
+def get_modules(steps: list):
+    """
+        Create and configure the module of every step
+    """
+
+    modules: list = []
+    for step in steps:
+        # Steps can name their module, which is then imported on first use
+        module_class: type = step["module"]
+        if type(module_class) is str:
+            module_class: type = getattr(importlib.import_module(name=__package__), module_class)
+
+        # Instantiate Module
+        module: object = module_class()
+
+        # Set Settings
+        module.set_settings(settings=step["settings"])
+
+        modules.append(module)
+
+    return modules
+
+def get_fused_modules(modules: list):
+    """
+        Replace every run of two or more fusable modules with a single fused module
+    """
+
+    fused_modules: list = []
+    fusable_modules: list = []
+    for module in modules + [None]:
+        if module is not None and get_is_fusable(module=module):
+            fusable_modules.append(module)
+            continue
+
+        if len(fusable_modules) > 1:
+            fused_modules.append(FusedText(modules=fusable_modules))
+        else:
+            fused_modules.extend(fusable_modules)
+
+        fusable_modules: list = []
+        if module is not None:
+            fused_modules.append(module)
+
+    return fused_modules
+
+def _get_module_name(module: object):
+    if isinstance(module, FusedText):
+        return "+".join(type(fused_module).__name__ for fused_module in module.modules)
+
+    return type(module).__name__
+
+def _get_metered_notes(notes: Iterator, metrics: dict):
+    # Notes are only worked on as they are pulled through, so the time spent pulling is what the step costs
+    # This includes the streamed steps before it, which is taken off once every step is done
+    iterator: Iterator = iter(notes)
+    while True:
+        start: float = time.perf_counter()
+        cpu_start: float = time.process_time()
+        try:
+            note_data: dict = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            metrics["stream_seconds"] += time.perf_counter() - start
+            metrics["stream_cpu_seconds"] += time.process_time() - cpu_start
+
+        metrics["notes_out"] += 1
+
+        yield note_data
+
+def _get_reported_notes(notes: Iterator, metrics: list, metrics_path: str, metrics_format: str):
+    # A streamed run is only finished once the last note has been read
+    yield from notes
+
+    set_metrics_reported(metrics=metrics, metrics_path=metrics_path, metrics_format=metrics_format)
+
+def _set_exclusive_times(metrics: list):
+    # A streamed step's time includes pulling the notes through the streamed step before it
+    previous: dict = None
+    for step_metrics in metrics:
+        step_metrics["wall_seconds"] = step_metrics["run_seconds"] + step_metrics["stream_seconds"]
+        step_metrics["cpu_seconds"] = step_metrics["run_cpu_seconds"] + step_metrics["stream_cpu_seconds"]
+
+        if previous is not None and previous["streamed"]:
+            step_metrics["wall_seconds"] -= previous["stream_seconds"]
+            step_metrics["cpu_seconds"] -= previous["stream_cpu_seconds"]
+
+            # The notes it was handed are the ones the step before let through
+            step_metrics["notes_in"] = previous["notes_out"]
+
+        step_metrics["wall_seconds"] = max(step_metrics["wall_seconds"], 0.0)
+        step_metrics["cpu_seconds"] = max(step_metrics["cpu_seconds"], 0.0)
+
+        previous: dict = step_metrics
+
+def get_metrics_table(metrics: list):
+    """
+        Format the metrics of every step as a table
+    """
+
+    lines: list = [f"{'#':>2} {'step':<40} {'wall (s)':>9} {'cpu (s)':>9} {'in':>8} {'out':>8} {'peak (MiB)':>10}"]
+    for step_metrics in metrics:
+        notes_in: str = "-" if step_metrics["notes_in"] is None else str(step_metrics["notes_in"])
+        notes_out: str = "-" if step_metrics["notes_out"] is None else str(step_metrics["notes_out"])
+        memory: str = "-" if step_metrics["memory_peak_bytes"] is None else f"{step_metrics['memory_peak_bytes'] / 1048576:.1f}"
+
+        lines.append(f"{step_metrics['index']:>2} {step_metrics['step']:<40} {step_metrics['wall_seconds']:>9.3f} {step_metrics['cpu_seconds']:>9.3f} {notes_in:>8} {notes_out:>8} {memory:>10}")
+
+    lines.append(f"{'':>2} {'total':<40} {sum(step_metrics['wall_seconds'] for step_metrics in metrics):>9.3f} {sum(step_metrics['cpu_seconds'] for step_metrics in metrics):>9.3f}")
+
+    return "\n".join(lines)
+
+def _get_prometheus_text(metrics: list):
+    # Textfile collector format, one gauge per measurement labelled by step
+    gauges: list = [
+        ("pipeline_step_wall_seconds", "Wall time spent in each step", "wall_seconds"),
+        ("pipeline_step_cpu_seconds", "CPU time spent in each step, worker processes not included", "cpu_seconds"),
+        ("pipeline_step_notes_in", "Notes handed to each step", "notes_in"),
+        ("pipeline_step_notes_out", "Notes each step handed on", "notes_out"),
+        ("pipeline_step_memory_peak_bytes", "Peak memory allocated by each step above what it started with", "memory_peak_bytes")
+    ]
+
+    lines: list = []
+    for name, description, key in gauges:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} gauge")
+
+        for step_metrics in metrics:
+            if step_metrics[key] is None:
+                continue
+
+            lines.append(f"{name}{{index=\"{step_metrics['index']}\",step=\"{step_metrics['step']}\"}} {step_metrics[key]}")
+
+    return "\n".join(lines) + "\n"
+
+def set_metrics_written(metrics: list, metrics_path: str, metrics_format: str = "json"):
+    """
+        Write the metrics of every step as JSON or as a Prometheus textfile
+    """
+
+    if metrics_format == "json":
+        text: str = json.dumps(metrics, indent=4)
+    elif metrics_format == "prometheus":
+        text: str = _get_prometheus_text(metrics=metrics)
+    else:
+        raise ValueError(f"Unknown metrics format `{metrics_format}`, use json or prometheus")
+
+    # Write to a temporary file first so a collector never reads half a file
+    temporary_path: str = f"{metrics_path}.tmp"
+    with open(file=temporary_path, mode="w") as f:
+        f.write(text)
+
+    os.replace(temporary_path, metrics_path)
+
+def set_metrics_reported(metrics: list, metrics_path: str = None, metrics_format: str = "json"):
+    """
+        Log the table of step metrics, and write them out when there is a path
+    """
+
+    _set_exclusive_times(metrics=metrics)
+
+    logger.info("Step metrics:\n" + get_metrics_table(metrics=metrics))
+
+    if metrics_path is not None:
+        set_metrics_written(metrics=metrics, metrics_path=metrics_path, metrics_format=metrics_format)
+
+def run_pipeline(steps: list, input: object = None, fuse: bool = True, metrics: bool = False, trace_memory: bool = False, metrics_path: str = None, metrics_format: str = "json"):
+    """
+        Run every step with the output of the step before it
+
+        With metrics, the wall time, CPU time, notes in and out and (with trace_memory) the
+        peak memory of every step are logged as a table at the end of the run
+    """
+
+    modules: list = get_modules(steps=steps)
+    if fuse:
+        modules: list = get_fused_modules(modules=modules)
+
+    if not metrics:
+        output: object = input
+        for module in modules:
+            # Set Input
+            module.set_input(input=output)
+
+            # Run
+            output: object = module.run()
+
+        return output
+
+    # Tracing slows every allocation down, so it is only on when asked for
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    step_metrics_list: list = []
+    output: object = input
+    for index, module in enumerate(modules):
+        step_metrics: dict = {
+            "index": index,
+            "step": _get_module_name(module=module),
+            "streamed": False,
+            "notes_in": len(output) if type(output) is list else None,
+            "notes_out": None,
+            "run_seconds": 0.0,
+            "run_cpu_seconds": 0.0,
+            "stream_seconds": 0.0,
+            "stream_cpu_seconds": 0.0,
+            "memory_peak_bytes": None
+        }
+        step_metrics_list.append(step_metrics)
+
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            memory_start: int = tracemalloc.get_traced_memory()[0]
+
+        start: float = time.perf_counter()
+        cpu_start: float = time.process_time()
+
+        # Set Input
+        module.set_input(input=output)
+
+        # Run
+        output: object = module.run()
+
+        step_metrics["run_seconds"] = time.perf_counter() - start
+        step_metrics["run_cpu_seconds"] = time.process_time() - cpu_start
+
+        if isinstance(output, Iterator):
+            # Memory used while streaming can't be told apart from the steps around it
+            step_metrics["streamed"] = True
+            step_metrics["notes_out"] = 0
+            output: Iterator = _get_metered_notes(notes=output, metrics=step_metrics)
+        else:
+            if type(output) is list:
+                step_metrics["notes_out"] = len(output)
+
+            if tracemalloc.is_tracing():
+                step_metrics["memory_peak_bytes"] = max(tracemalloc.get_traced_memory()[1] - memory_start, 0)
+
+    if isinstance(output, Iterator):
+        return _get_reported_notes(notes=output, metrics=step_metrics_list, metrics_path=metrics_path, metrics_format=metrics_format)
+
+    set_metrics_reported(metrics=step_metrics_list, metrics_path=metrics_path, metrics_format=metrics_format)
+
+    return output
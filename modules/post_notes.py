@@ -1,12 +1,20 @@
 import json
+import time
 import random
 import logging
 
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
 try:
     import requests
+    from urllib3.exceptions import NewConnectionError
 except ImportError:
     raise ImportError("Failed to import requests, please run `pip3 install requests`")
 
+from .rate_limit import TokenBucket, get_rate_limit_reset, get_retry_delay
+
 class PostNotes:
     # Required
     input: object = None
@@ -21,10 +29,19 @@ class PostNotes:
     content_warning: str = None
     visibility: str = "public"  # public, home, followers, specified, hidden
     session: requests.Session = requests.Session()
+    workers: int = 1
+    rate_limit: float = None  # Posts per second, None for no limit
+    burst: int = 1
+    max_retries: int = 5
+    backoff_base: float = 1.0
+    backoff_max: float = 60.0
+    timeout: float = 30.0
 
     # Non-Configurable
     skipped: bool = False
     setup: bool = False
+    unauthorized: bool = False
+    rate_limiter: TokenBucket = None
     logger: logging.Logger = None
     LESSERDEBUG: int = 15
     VERBOSE: int = 5
@@ -68,6 +85,27 @@ class PostNotes:
         if "hard_skip" in settings:
             self.hard_skip = settings["hard_skip"]
 
+        if "workers" in settings:
+            self.workers = settings["workers"]
+
+        if "rate_limit" in settings:
+            self.rate_limit = settings["rate_limit"]
+
+        if "burst" in settings:
+            self.burst = settings["burst"]
+
+        if "max_retries" in settings:
+            self.max_retries = settings["max_retries"]
+
+        if "backoff_base" in settings:
+            self.backoff_base = settings["backoff_base"]
+
+        if "backoff_max" in settings:
+            self.backoff_max = settings["backoff_max"]
+
+        if "timeout" in settings:
+            self.timeout = settings["timeout"]
+
         if "show_tag" in settings:
             self.show_tag = settings["show_tag"]
 
@@ -90,6 +128,9 @@ class PostNotes:
             self.logger.error("Module not configured...")
             return
 
+        # A module can run more than once, such as for every request of the server
+        self.skipped: bool = False
+
         # Gives probability of executing module
         if self.chance_execute < random.random():
             self.logger.log(level=self.LESSERDEBUG, msg="Hit random chance of skipping posting notes...")
@@ -101,10 +142,13 @@ class PostNotes:
         else:
             self.logger.info("Posting notes...")
 
+        self.rate_limiter: TokenBucket = TokenBucket(rate=self.rate_limit, capacity=self.burst)
+        self.unauthorized: bool = False
+
         if type(self.input) is str:
-            return self._post_note(text=self.input)
+            return self._post_note_with_retries(text=self.input)
         
-        if type(self.input) is not list:
+        if type(self.input) is not list and not isinstance(self.input, Iterator):
             return
 
         tag: dict = {
@@ -114,43 +158,157 @@ class PostNotes:
             "skipped": self.skipped
         }
 
-        notes: list = []
-        for note_data in self.input:
-            if "note" not in note_data:
+        notes: Iterator = self._get_processed_notes(notes=self.input, tag=tag)
+
+        # Streamed notes are handed on one at a time as they are requested
+        if type(self.input) is list:
+            notes: list = list(notes)
+            self.logger.log(level=self.VERBOSE, msg=f"Post Notes Data: `{json.dumps(notes, default=list)}`")
+
+        return notes
+
+    def _get_processed_notes(self, notes: Iterator, tag: dict):
+        posted: int = 0
+        failed: int = 0
+
+        executor: ThreadPoolExecutor = None
+        if self.workers <= 1 or self.skipped:
+            processed_notes: Iterator = (self._get_processed_note(note_data=note_data, tag=tag) for note_data in notes)
+        else:
+            executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=self.workers)
+            processed_notes: Iterator = self._get_posted_notes(executor=executor, notes=notes, tag=tag)
+
+        try:
+            for note_data in processed_notes:
+                if note_data is None:
+                    continue
+
+                result: dict = note_data["note"].get_tags()[-1]
+                if result["posted"]:
+                    posted += 1
+                elif result["status"] is not None:
+                    failed += 1
+
+                yield note_data
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        if posted > 0 or failed > 0:
+            self.logger.info(f"Posted {posted} notes, {failed} failed...")
+
+    def _get_posted_notes(self, executor: ThreadPoolExecutor, notes: Iterator, tag: dict):
+        # Only a few notes per worker are taken from the input at a time, so streamed notes stay streamed
+        # Results come back in the order the notes were given
+        pending: deque = deque()
+        for note_data in notes:
+            pending.append(executor.submit(self._get_processed_note, note_data=note_data, tag=tag))
+
+            if len(pending) >= self.workers * 2:
+                yield pending.popleft().result()
+
+        while len(pending) > 0:
+            yield pending.popleft().result()
+
+    def _get_processed_note(self, note_data: dict, tag: dict):
+        if "note" not in note_data:
+            return
+
+        note: dict = note_data["note"][-1].copy()
+
+        response: requests.Response = None
+        if not self.skipped and not self.unauthorized:
+            response: requests.Response = self._post_note_with_retries(text=note["text"])
+
+            # Not JSON Serializable
+            # if "meta" in note:
+            #     note["meta"]["response"] = response
+            # else:
+            #     note["meta"] = {"response": response}
+
+        # Keep the result of every note so one failure doesn't lose the others
+        status: int = response.status_code if response is not None else None
+        note["tag"] = dict(tag, status=status, posted=status == 200)
+
+        note_data["note"].append(note)
+
+        return note_data
+
+    def _post_note_with_retries(self, text: str):
+        response: requests.Response = None
+        for attempt in range(self.max_retries + 1):
+            if self.unauthorized:
+                return response
+
+            self.rate_limiter.acquire()
+
+            try:
+                response: requests.Response = self._post_note(text=text)
+            except requests.RequestException as e:
+                # Posting isn't idempotent, only errors from before the request was sent are retried
+                # Anything else, such as a read timeout or a dropped connection, may have created the note
+                if not self._get_is_unsent(error=e):
+                    self.logger.warning(f"Failed to post note ({e})... it may have been posted, not posting it again...")
+                    return response
+
+                if attempt == self.max_retries:
+                    self.logger.warning(f"Failed to post note ({e})...")
+                    continue
+
+                delay: float = get_retry_delay(response=None, attempt=attempt, backoff_base=self.backoff_base, backoff_max=self.backoff_max)
+                self.logger.warning(f"Failed to post note ({e})... retrying in {delay:.2f} seconds...")
+                time.sleep(delay)
                 continue
 
-            note: dict = note_data["note"][-1].copy()
-            note["tag"] = tag
+            # Dry run
+            if response is None:
+                return response
 
-            if not self.skipped:
-                response: requests.Response = self._post_note(text=note["text"])
+            # Slow down before the server has to tell us to
+            reset: float = get_rate_limit_reset(response=response)
+            if reset is not None:
+                self.rate_limiter.set_paused(seconds=reset)
 
-                # Not JSON Serializable
-                # if "meta" in note:
-                #     note["meta"]["response"] = response
-                # else:
-                #     note["meta"] = {"response": response}
+            if response.status_code == 403:
+                self.logger.error(f"Posting notes is unauthorized... not posting the rest...")
+                self.unauthorized: bool = True
+                return response
 
-            note_data["note"].append(note)
-            notes.append(note_data)
+            if response.status_code == 429:
+                delay: float = get_retry_delay(response=response, attempt=attempt, backoff_base=self.backoff_base, backoff_max=self.backoff_max)
 
-            if response is not None and response.status_code == 429:
-                self.logger.error(f"Hit rate limit... returning...")
-                return
+                # Everyone waits on a rate limit, not just this post, even when it isn't retried
+                self.rate_limiter.set_paused(seconds=delay)
+                if attempt < self.max_retries:
+                    self.logger.warning(f"Status code is {response.status_code}... retrying in {delay:.2f} seconds...")
 
-            if response is not None and response.status_code == 403:
-                self.logger.error(f"Posting notes is unauthorized... returning...")
-                return
+                continue
 
-            if response is not None and response.status_code == 500:
-                self.logger.error(f"Hit server with internal error... returning...")
-                return
+            if response.status_code >= 500:
+                # The note may have been created before the server failed
+                self.logger.warning(f"Status code is {response.status_code}... it may have been posted, not posting it again...")
+                return response
 
-            if response is not None and response.status_code != 200:
-                self.logger.warning(f"Status code is {status}...")
+            if response.status_code != 200:
+                self.logger.warning(f"Status code is {response.status_code}...")
 
-        self.logger.log(level=self.VERBOSE, msg=f"Post Notes Data: `{json.dumps(notes)}`")
-        return notes
+            return response
+
+        self.logger.error(f"Giving up on posting note after {self.max_retries + 1} attempts...")
+        return response
+
+    def _get_is_unsent(self, error: requests.RequestException):
+        # The connection couldn't be opened, or the name resolved, so nothing reached the server
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+
+        if not isinstance(error, requests.ConnectionError) or error.response is not None or len(error.args) == 0:
+            return False
+
+        # Requests wraps the reason urllib3 gave up in a MaxRetryError, a name resolution error is a connection error too
+        reason: object = getattr(error.args[0], "reason", error.args[0])
+
+        return isinstance(reason, NewConnectionError)
 
     def _post_note(self, text: str):
         # Validate text
@@ -173,4 +331,4 @@ class PostNotes:
         if self.content_warning is not None:
             params["cw"] = self.content_warning
 
-        return self.session.post(url=base_url, json=params)
\ No newline at end of file
+        return self.session.post(url=base_url, json=params, timeout=self.timeout)
\ No newline at end of file
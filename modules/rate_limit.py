@@ -0,0 +1,118 @@
+import time
+import random
+import threading
+import email.utils
+
+# Kept apart from the global generator so retries don't change seeded runs
+jitter: random.Random = random.Random()
+
+class TokenBucket:
+    """
+        Thread-safe token bucket, every request takes a token
+
+        Everyone waiting on the bucket can also be paused, such as when a server
+        says to retry after a while
+    """
+
+    # Default
+    rate: float = None  # Tokens per second, None for no limit
+    capacity: float = 1.0
+
+    # Non-Configurable
+    tokens: float = 1.0
+    updated: float = 0.0
+    paused_until: float = 0.0
+    lock: threading.Lock = None
+
+    def __init__(self, rate: float = None, capacity: float = 1.0):
+        """
+            Initialize the bucket full
+        """
+
+        self.rate: float = rate
+        self.capacity: float = max(capacity, 1.0)
+        self.tokens: float = self.capacity
+        self.updated: float = time.monotonic()
+        self.paused_until: float = 0.0
+        self.lock: threading.Lock = threading.Lock()
+
+    def set_paused(self, seconds: float):
+        """
+            Hold back every request for a while
+        """
+
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        """
+            Wait until a request is allowed
+        """
+
+        while True:
+            with self.lock:
+                now: float = time.monotonic()
+                wait: float = self.paused_until - now
+
+                if wait <= 0:
+                    if self.rate is None:
+                        return
+
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+
+                    wait: float = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+def _get_header_seconds(value: str):
+    # Either a number of seconds, an epoch timestamp or an HTTP date
+    try:
+        seconds: float = float(value)
+        if seconds > 1e9:
+            seconds -= time.time()
+
+        return max(seconds, 0.0)
+    except ValueError:
+        pass
+
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def get_rate_limit_reset(response: object):
+    """
+        Get how long to wait when the server says no requests are left, otherwise None
+    """
+
+    if response is None:
+        return None
+
+    if response.headers.get("X-RateLimit-Remaining") != "0":
+        return None
+
+    if "X-RateLimit-Reset" not in response.headers:
+        return None
+
+    return _get_header_seconds(value=response.headers["X-RateLimit-Reset"])
+
+def get_retry_delay(response: object, attempt: int, backoff_base: float = 1.0, backoff_max: float = 60.0):
+    """
+        Get how long to wait before retrying, preferring what the server asked for
+    """
+
+    if response is not None:
+        for header in ("Retry-After", "X-RateLimit-Reset"):
+            if header in response.headers:
+                seconds: float = _get_header_seconds(value=response.headers[header])
+                if seconds is not None:
+                    return seconds
+
+    # Exponential backoff with jitter so retries don't line up
+    delay: float = min(backoff_max, backoff_base * (2 ** attempt))
+    return jitter.uniform(delay / 2, delay)
@@ -2,16 +2,21 @@ import re
 import random
 import logging
 
-try:
-    import nltk
-except ImportError:
-    raise ImportError("Failed to import nltk, please run `pip3 install nltk`")
+from collections.abc import Iterator
+
+from .parallel import get_processed_texts
+from .detokenizer import Detokenizer
+from .tokens import get_tokenized_sentences
+from .nltk_resources import set_punkt_loaded
 
 try:
     from mosestokenizer import MosesDetokenizer
 except ImportError:
-    # Look at opus-fast-mosestokenizer
-    raise ImportError("Failed to import mosestokenizer, please run `pip3 install mosestokenizer`")
+    # Only needed by the `moses` detokenizer backend
+    MosesDetokenizer = None
+
+# Detokenizers already started by this process
+detokenizers: dict = {}
 
 class RebuildText:
     # Required
@@ -21,15 +26,20 @@ class RebuildText:
     chance_execute: float = 1.0
     show_tag: bool = False
     detokenizer_language: str = "en"
+    detokenizer_backend: str = "python"  # python, moses
     tokenizer_language: str = "english"
     hard_skip: bool = False
+    allow_download: bool = True  # Otherwise missing NLTK data fails straight away
+    workers: int = 1
+    batch_size: int = 1024
 
     # Non-Configurable
     skipped: bool = False
+    text_only: bool = True
     dont_pattern: re.Pattern = re.compile(pattern=r'(do) (n\'t)', flags=re.IGNORECASE|re.MULTILINE)
     nltk_tokenizer_lexicon: str = "punkt"
     nltk_tokenizer_lexicon_path: str = "tokenizers/punkt"
-    detokenizer: MosesDetokenizer = None
+    detokenizer: object = None
     logger: logging.Logger = None
     LESSERDEBUG: int = 15
     VERBOSE: int = 5
@@ -52,6 +62,9 @@ class RebuildText:
         if "detokenizer_language" in settings:
             self.detokenizer_language = settings["detokenizer_language"]
 
+        if "detokenizer_backend" in settings:
+            self.detokenizer_backend = settings["detokenizer_backend"]
+
         if "tokenizer_language" in settings:
             self.tokenizer_language = settings["tokenizer_language"]
 
@@ -61,15 +74,46 @@ class RebuildText:
         if "hard_skip" in settings:
             self.hard_skip = settings["hard_skip"]
 
-        # Download PUNKT lexicon for rebuilding sentences
+        if "allow_download" in settings:
+            self.allow_download = settings["allow_download"]
+
+        if "workers" in settings:
+            self.workers = settings["workers"]
+
+        if "batch_size" in settings:
+            self.batch_size = settings["batch_size"]
+
+        # Load PUNKT lexicon for rebuilding sentences, once per process
         # PUNKT is designed for tokenizing words
-        try:
-            nltk.data.find(self.nltk_tokenizer_lexicon_path)
-        except LookupError:
-            self.logger.log(level=self.LESSERDEBUG, msg="Failed to find {self.nltk_tokenizer_lexicon}. Downloading for you...")
-            nltk.download(self.nltk_tokenizer_lexicon)
+        set_punkt_loaded(language=self.tokenizer_language, path=self.nltk_tokenizer_lexicon_path, name=self.nltk_tokenizer_lexicon, allow_download=self.allow_download)
+
+        self.detokenizer: object = self._get_detokenizer()
 
-        self.detokenizer: MosesDetokenizer = MosesDetokenizer(self.detokenizer_language)
+    def __getstate__(self):
+        # The Moses detokenizer talks to a subprocess, so workers start their own
+        state: dict = self.__dict__.copy()
+        state["detokenizer"] = None
+
+        return state
+
+    def _get_detokenizer(self):
+        # Each process keeps one detokenizer per backend and language
+        key: tuple = (self.detokenizer_backend, self.detokenizer_language)
+        if key in detokenizers:
+            return detokenizers[key]
+
+        if self.detokenizer_backend == "python":
+            detokenizers[key] = Detokenizer(language=self.detokenizer_language)
+        elif self.detokenizer_backend == "moses":
+            if MosesDetokenizer is None:
+                # Look at opus-fast-mosestokenizer
+                raise ImportError("Failed to import mosestokenizer, please run `pip3 install mosestokenizer`")
+
+            detokenizers[key] = MosesDetokenizer(self.detokenizer_language)
+        else:
+            raise ValueError(f"Unknown detokenizer backend `{self.detokenizer_backend}`, expected `python` or `moses`")
+
+        return detokenizers[key]
 
     def set_input(self, input: object):
         """
@@ -78,81 +122,111 @@ class RebuildText:
         
         self.input: object = input
 
-    def run(self):
+    def set_skipped(self):
         """
-            Execute this module as part of a chain of modules
+            Roll the chance of executing this module, True means it is left out entirely
         """
 
+        # A module can run more than once, such as for every request of the server
+        self.skipped: bool = False
+
         # Gives probability of executing module
         if self.chance_execute < random.random():
             self.logger.log(level=self.LESSERDEBUG, msg="Hit random chance of skipping rebuilding notes...")
 
             if self.hard_skip:
-                return self.input
+                return True
 
             self.skipped: bool = True
         else:
             self.logger.info("Rebuilding notes...")
 
+        return False
+
+    def run(self):
+        """
+            Execute this module as part of a chain of modules
+        """
+
+        if self.set_skipped():
+            return self.input
+
         if type(self.input) is str:
             return self._get_nyaized_text(text=self.input)
         
-        if type(self.input) is not list:
+        if type(self.input) is not list and not isinstance(self.input, Iterator):
             return
 
-        notes: list = []
-        for note_data in self.input:
-            if "note" not in note_data:
-                continue
+        notes: Iterator = self._get_processed_notes(notes=self.input)
 
-            note: dict = note_data["note"][-1].copy()
+        # Streamed notes are handed on one at a time as they are requested
+        if type(self.input) is list:
+            return list(notes)
 
-            if "text" not in note:
-                continue
+        return notes
 
-            # Create Operation Tag
-            tag: dict = {
-                "name": "RebuildText",
-                "operation": "modify",
-                "show": self.show_tag,
-                "skipped": self.skipped
-            }
+    def _get_processed_notes(self, notes: Iterator):
+        # With more than one worker the texts are modified in batches by the process pool
+        for note_data, modified_text in get_processed_texts(module=self, method_name="_get_rebuilt_text", notes=notes, workers=self.workers, batch_size=self.batch_size):
+            note_data: dict = self._get_processed_note(note_data=note_data, modified_text=modified_text)
 
-            text: str = note["text"]
-            if not self.skipped:
-                text: str = self._get_rebuilt_text(text=note["text"])
+            if note_data is not None:
+                yield note_data
 
-            # If modification did not take effect, then remove tag
-            if self.show_tag and note["text"] == text:
-                tag["show"] = False
+    def _get_processed_note(self, note_data: dict, modified_text: str = None):
+        if "note" not in note_data:
+            return
+
+        note: dict = note_data["note"][-1].copy()
 
-            note["text"] = text.strip()
-            note["tag"] = tag
+        if "text" not in note:
+            return
 
-            # Add Note To List
-            note_data["note"].append(note)
+        # Create Operation Tag
+        tag: dict = {
+            "name": "RebuildText",
+            "operation": "modify",
+            "show": self.show_tag,
+            "skipped": self.skipped
+        }
 
-            notes.append({
-                "note": note_data["note"]
-            })
+        text: str = note["text"]
+        if not self.skipped and modified_text is not None:
+            text: str = modified_text
+        elif not self.skipped:
+            text: str = self._get_rebuilt_text(text=note["text"], history=note_data["note"])
 
-        return notes
+        # If modification did not take effect, then remove tag
+        if self.show_tag and note["text"] == text:
+            tag["show"] = False
+
+        note["text"] = text.strip()
+        note["tag"] = tag
+
+        # Add Note To List
+        note_data["note"].append(note)
+
+        return {
+            "note": note_data["note"]
+        }
 
     def _get_fixed_words(self, text: str):
         text: str = re.sub(pattern=self.dont_pattern, repl=r'\1\2', string=text)
 
         return text
 
-    def _get_rebuilt_text(self, text: str):
+    def _get_rebuilt_text(self, text: str, history: object = None):
         # Validate text
         if text is None:
             text: str = ""
 
         # Breaks word, `don't` as `do n't`
         sentences: list[str] = []
-        for sentence in nltk.sent_tokenize(text=text, language=self.tokenizer_language):
-            words: list[str] = nltk.word_tokenize(sentence)
+        for words in get_tokenized_sentences(text=text, language=self.tokenizer_language, word_language="english", history=history):
             # words: list[str] = sentence.split()
+            if self.detokenizer is None:
+                self.detokenizer: object = self._get_detokenizer()
+
             sentence: str = self.detokenizer(words)
             sentence: str = self._get_fixed_words(text=sentence)
 
@@ -0,0 +1,71 @@
+import re
+
+class RewriteRules:
+    """
+        Ordered list of regex rules compiled into a single pattern, so a text is scanned once
+
+        Every rule becomes a branch of one alternation, branches listed first win where two
+        rules could match at the same place, and the branch which matched picks the replacement
+    """
+
+    # Non-Configurable
+    pattern: re.Pattern = None
+    replacements: list = None
+
+    def __init__(self, rules: list, flags: int = 0):
+        """
+            Compile the rules, each is a `(pattern, replacement)` pair
+        """
+
+        # When every rule starts with a plain character, positions which can't start a match are skipped quickly
+        prefix: str = ""
+        if all(pattern[:1].isalnum() for pattern, _ in rules):
+            prefix: str = f"(?=[{''.join(sorted(set(pattern[0] for pattern, _ in rules)))}])"
+
+        # Branches are the only groups, so the group which matched is the index of the rule
+        self.pattern: re.Pattern = re.compile(pattern=prefix + "(?:" + "|".join(f"({pattern})" for pattern, _ in rules) + ")", flags=flags)
+        self.replacements: list = [None] + [replacement for _, replacement in rules]
+
+        if self.pattern.groups != len(rules):
+            raise ValueError("Rewrite rules can't have groups of their own, use (?:...) instead")
+
+    def _get_replacement(self, match: re.Match):
+        return self.replacements[match.lastindex]
+
+    def sub(self, text: str):
+        """
+            Apply every rule to the text in a single scan
+        """
+
+        return self.pattern.sub(self._get_replacement, text)
+
+def _get_trie_branches(node: dict):
+    branches: list = [re.escape(character) + _get_trie_branches(node=child) for character, child in sorted(node.items()) if character != ""]
+    if len(branches) == 0:
+        return ""
+
+    pattern: str = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+    # A word can end here, but a longer word is tried first
+    if "" in node:
+        return f"{pattern}?" if len(branches) > 1 else f"(?:{pattern})?"
+
+    return pattern
+
+def get_trie_pattern(words: list):
+    """
+        Get a regex matching any of the words, shared prefixes are only checked once
+
+        The longest word which matches at a position wins, so the cost of a match
+        depends on the length of the words rather than how many there are
+    """
+
+    trie: dict = {}
+    for word in words:
+        node: dict = trie
+        for character in word:
+            node: dict = node.setdefault(character, {})
+
+        node[""] = {}  # End of a word
+
+    return _get_trie_branches(node=trie)
@@ -0,0 +1,239 @@
+import json
+import math
+import time
+import logging
+import threading
+
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .pipeline import get_modules, get_fused_modules
+
+def _get_step_name(step: dict):
+    # Steps name their module either directly or by its class
+    module: object = step["module"]
+
+    return module if type(module) is str else module.__name__
+
+def get_percentile(values: list, percentile: float):
+    """
+        Get the nearest-rank percentile of some values, None when there are none
+    """
+
+    if len(values) == 0:
+        return None
+
+    values: list = sorted(values)
+    rank: int = max(math.ceil(percentile / 100 * len(values)) - 1, 0)
+
+    return values[rank]
+
+class GeneratorServer:
+    """
+        Keeps the corpus, Markov model and sentiment analyzer loaded and generates notes on request
+
+        The steps before `GenerateMarkov` run once when the server warms up, the steps after it
+        run for every request, so a request only pays for generating and transforming its notes
+
+        Endpoints:
+            GET /generate?count=N  Generate N notes through the transform steps
+            GET /stats             Request count and p50/p99 latency in milliseconds
+            GET /health            Whether the model is loaded
+    """
+
+    # Required
+    steps: list = None
+
+    # Default
+    host: str = "127.0.0.1"
+    port: int = 8080
+    fuse: bool = True
+    post: bool = False  # Whether the generated notes also go through PostNotes
+    max_count: int = 100
+    latency_window: int = 1000  # Latest requests the percentiles are taken from
+
+    # Non-Configurable
+    generator: object = None
+    modules: list = None
+    latencies: deque = None
+    requests: int = 0
+    lock: threading.Lock = None
+    logger: logging.Logger = None
+    LESSERDEBUG: int = 15
+    VERBOSE: int = 5
+
+    def __init__(self, steps: list, host: str = "127.0.0.1", port: int = 8080, fuse: bool = True, post: bool = False, max_count: int = 100):
+        """
+            Initialize the server, nothing is loaded until it warms up
+        """
+
+        self.logger: logging.Logger = logging.getLogger(type(self).__name__)
+
+        self.steps: list = steps
+        self.host: str = host
+        self.port: int = port
+        self.fuse: bool = fuse
+        self.post: bool = post
+        self.max_count: int = max_count
+        self.latencies: deque = deque(maxlen=self.latency_window)
+        self.requests: int = 0
+
+        # The modules keep their input on themselves, so requests take turns
+        self.lock: threading.Lock = threading.Lock()
+
+    def set_warm(self):
+        """
+            Load the corpus and build the model once, ready for requests
+        """
+
+        names: list = [_get_step_name(step=step) for step in self.steps]
+        if "GenerateMarkov" not in names:
+            raise ValueError("The server needs a GenerateMarkov step to generate notes with")
+
+        index: int = names.index("GenerateMarkov")
+        steps: list = [step for step in self.steps[index + 1:] if self.post or _get_step_name(step=step) != "PostNotes"]
+
+        start: float = time.time()
+
+        # Download and clean the corpus
+        output: object = None
+        modules: list = get_modules(steps=self.steps[:index])
+        if self.fuse:
+            modules: list = get_fused_modules(modules=modules)
+
+        for module in modules:
+            module.set_input(input=output)
+            output: object = module.run()
+
+        # Build the model from it
+        self.generator: object = get_modules(steps=[self.steps[index]])[0]
+        self.generator.set_input(input=output)
+        self.generator.set_model_built()
+        self.generator.set_input(input=None)  # The corpus isn't needed anymore
+
+        # The transforms are reused by every request
+        self.modules: list = get_modules(steps=steps)
+        if self.fuse:
+            self.modules: list = get_fused_modules(modules=self.modules)
+
+        self.logger.info(f"Warmed up in {time.time() - start:.2f} seconds...")
+
+    def get_generated_texts(self, count: int):
+        """
+            Generate notes and run them through the transform steps, giving back their texts
+        """
+
+        start: float = time.perf_counter()
+
+        with self.lock:
+            output: object = self.generator.get_generated_notes(count=count)
+            for module in self.modules:
+                module.set_input(input=output)
+                output: object = module.run()
+
+            texts: list = [note_data["note"][-1]["text"] for note_data in output]
+
+            self.latencies.append(time.perf_counter() - start)
+            self.requests += 1
+
+        return texts
+
+    def get_statistics(self):
+        """
+            Get the number of requests served and their latency percentiles in milliseconds
+        """
+
+        with self.lock:
+            latencies: list = list(self.latencies)
+            requests: int = self.requests
+
+        p50: float = get_percentile(values=latencies, percentile=50)
+        p99: float = get_percentile(values=latencies, percentile=99)
+
+        return {
+            "requests": requests,
+            "p50_ms": round(p50 * 1000, 3) if p50 is not None else None,
+            "p99_ms": round(p99 * 1000, 3) if p99 is not None else None
+        }
+
+    def set_closed(self):
+        """
+            Stop the model's process pool and save the caches of the transform steps
+        """
+
+        modules: list = [self.generator] + self.modules if self.generator is not None else []
+        for module in modules:
+            if hasattr(module, "set_closed"):
+                module.set_closed()
+
+    def serve_forever(self):
+        """
+            Warm up if needed, then answer requests until interrupted
+        """
+
+        if self.generator is None:
+            self.set_warm()
+
+        handler: type = type("GeneratorRequestHandler", (_GeneratorRequestHandler,), {"server_module": self})
+        http_server: ThreadingHTTPServer = ThreadingHTTPServer((self.host, self.port), handler)
+
+        self.logger.info(f"Serving notes on http://{self.host}:{http_server.server_address[1]}/generate...")
+
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            http_server.server_close()
+            self.set_closed()
+
+            statistics: dict = self.get_statistics()
+            self.logger.info(f"Served {statistics['requests']} requests, p50 {statistics['p50_ms']} ms, p99 {statistics['p99_ms']} ms...")
+
+class _GeneratorRequestHandler(BaseHTTPRequestHandler):
+    # Set on the subclass made for each server
+    server_module: GeneratorServer = None
+
+    def do_GET(self):
+        url: object = urlparse(self.path)
+        query: dict = parse_qs(url.query)
+
+        if url.path == "/generate":
+            try:
+                count: int = int(query.get("count", ["1"])[0])
+            except ValueError:
+                return self._set_response(status=400, body={"error": "count must be a number"})
+
+            if count < 1 or count > self.server_module.max_count:
+                return self._set_response(status=400, body={"error": f"count must be between 1 and {self.server_module.max_count}"})
+
+            start: float = time.perf_counter()
+            try:
+                texts: list = self.server_module.get_generated_texts(count=count)
+            except Exception as e:
+                self.server_module.logger.exception("Failed to generate notes...")
+                return self._set_response(status=500, body={"error": str(e)})
+
+            return self._set_response(status=200, body={"notes": texts, "ms": round((time.perf_counter() - start) * 1000, 3)})
+
+        if url.path == "/stats":
+            return self._set_response(status=200, body=self.server_module.get_statistics())
+
+        if url.path == "/health":
+            return self._set_response(status=200, body={"warm": self.server_module.generator is not None})
+
+        return self._set_response(status=404, body={"error": f"Unknown path {url.path}"})
+
+    def _set_response(self, status: int, body: dict):
+        data: bytes = json.dumps(body).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *arguments):
+        # Every request would otherwise be printed to stderr
+        self.server_module.logger.log(level=self.server_module.VERBOSE, msg=format % arguments)
@@ -0,0 +1,27 @@
+try:
+    import nltk
+except ImportError:
+    raise ImportError("Failed to import nltk, please run `pip3 install nltk`")
+
+def get_tokenized_sentences(text: str, language: str = "english", word_language: str = None, history: object = None):
+    """
+        Split a text into sentences of words, reusing the tokens cached on the note's history
+
+        The sentences are shared with the cache, so copy a sentence before changing it
+    """
+
+    if word_language is None:
+        word_language: str = language
+
+    key: tuple = (language, word_language)
+    if hasattr(history, "get_tokens"):
+        sentences: list = history.get_tokens(text=text, key=key)
+        if sentences is not None:
+            return sentences
+
+    sentences: list = [nltk.word_tokenize(text=sentence, language=word_language) for sentence in nltk.sent_tokenize(text=text, language=language)]
+
+    if hasattr(history, "set_tokens"):
+        history.set_tokens(text=text, key=key, tokens=sentences)
+
+    return sentences